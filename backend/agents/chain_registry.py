@@ -0,0 +1,156 @@
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from agents.llm_gateway import get_llm_gateway
+
+logger = logging.getLogger(__name__)
+
+
+class CompiledChain:
+    """
+    A prompt template + output parser compiled once per process.
+    `format_instructions` (if the template uses it) is rendered at compile time,
+    and the LLM is supplied by the shared gateway at call time.
+    """
+    def __init__(self, name: str, template: str, parser_factory: Callable[[], Any],
+                 temperature: float = 0.0, cache: Optional[bool] = None):
+        self.name = name
+        self.template = template
+        self.parser_factory = parser_factory
+        self.temperature = temperature
+        self.cache = cache
+
+        self._prompt = None
+        self._parser = None
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "errors": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+
+    def compile(self):
+        if self._prompt is None:
+            with self._lock:
+                if self._prompt is None:
+                    # LangChain is only imported once a chain is compiled (warm-up or first call)
+                    from langchain_core.prompts import ChatPromptTemplate
+                    parser = self.parser_factory()
+                    prompt = ChatPromptTemplate.from_template(self.template)
+                    if "format_instructions" in prompt.input_variables:
+                        prompt = prompt.partial(format_instructions=parser.get_format_instructions())
+                    self._parser = parser
+                    self._prompt = prompt
+        return self._prompt, self._parser
+
+    async def ainvoke(self, inputs: dict):
+        prompt, parser = self.compile()
+        started = time.perf_counter()
+        try:
+            return await get_llm_gateway().ainvoke(
+                self.name, prompt, parser, inputs,
+                temperature=self.temperature, cache=self.cache
+            )
+        except Exception:
+            self._stats["errors"] += 1
+            raise
+        finally:
+            self._record(time.perf_counter() - started)
+
+    def invoke(self, inputs: dict):
+        prompt, parser = self.compile()
+        started = time.perf_counter()
+        try:
+            return get_llm_gateway().invoke(
+                self.name, prompt, parser, inputs,
+                temperature=self.temperature, cache=self.cache
+            )
+        except Exception:
+            self._stats["errors"] += 1
+            raise
+        finally:
+            self._record(time.perf_counter() - started)
+
+    def _record(self, seconds: float):
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["total_seconds"] += seconds
+            self._stats["max_seconds"] = max(self._stats["max_seconds"], seconds)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            calls = self._stats["calls"]
+            latency = {
+                "calls": calls,
+                "errors": self._stats["errors"],
+                "avg_ms": round(1000 * self._stats["total_seconds"] / calls, 1) if calls else 0.0,
+                "max_ms": round(1000 * self._stats["max_seconds"], 1),
+            }
+        usage = get_llm_gateway().site_usage(self.name)
+        return {
+            **latency,
+            "temperature": self.temperature,
+            "compiled": self._prompt is not None,
+            "llm_calls": usage["llm_calls"],
+            "input_tokens": usage["input_tokens"],
+            "output_tokens": usage["output_tokens"],
+            "avg_llm_ms": round(1000 * usage["llm_seconds"] / usage["llm_calls"], 1) if usage["llm_calls"] else 0.0,
+        }
+
+
+# ===== Parser factories =====
+# Agents pass these instead of LangChain classes so importing an agent does not import LangChain.
+
+def json_parser(pydantic_object=None) -> Callable[[], Any]:
+    def factory():
+        from langchain_core.output_parsers import JsonOutputParser
+        return JsonOutputParser(pydantic_object=pydantic_object) if pydantic_object else JsonOutputParser()
+    return factory
+
+def str_parser() -> Callable[[], Any]:
+    def factory():
+        from langchain_core.output_parsers import StrOutputParser
+        return StrOutputParser()
+    return factory
+
+
+# ===== Module-level registry =====
+_chains: Dict[str, CompiledChain] = {}
+_chains_lock = threading.Lock()
+
+def register_chain(name: str, template: str, parser: Callable[[], Any],
+                   temperature: float = 0.0, cache: Optional[bool] = None) -> CompiledChain:
+    """
+    Registers (or returns the already registered) chain for a call site.
+
+    Args:
+        name: Call-site name, also used for gateway limits and cache metrics.
+        template: ChatPromptTemplate source. `{format_instructions}` is filled from the parser.
+        parser: Zero-arg factory for the output parser.
+        cache: See LLMGateway.ainvoke; None caches temperature-0 chains only.
+    """
+    with _chains_lock:
+        chain = _chains.get(name)
+        if chain is None:
+            chain = CompiledChain(name, template, parser, temperature=temperature, cache=cache)
+            _chains[name] = chain
+        return chain
+
+def get_chain(name: str) -> CompiledChain:
+    return _chains[name]
+
+def warm_chains() -> Dict[str, float]:
+    """
+    Compiles every registered chain and builds the gateway clients they need.
+    Called once at startup so the first interview turn does no construction work.
+    Returns compile time per chain in milliseconds.
+    """
+    timings = {}
+    for name, chain in list(_chains.items()):
+        started = time.perf_counter()
+        chain.compile()
+        timings[name] = round(1000 * (time.perf_counter() - started), 2)
+    get_llm_gateway().prepare({chain.temperature for chain in _chains.values()})
+    logger.info(f"Warmed {len(timings)} LLM chains")
+    return timings
+
+def chain_stats() -> Dict[str, Dict]:
+    return {name: chain.stats() for name, chain in list(_chains.items())}
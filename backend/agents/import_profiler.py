@@ -0,0 +1,147 @@
+"""
+Import-time profile of server startup, as a per-module tree.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter and
+folds its log into a tree of cumulative / self import times.
+
+Run from backend/:
+    python -m agents.import_profiler                      # profile `import server`
+    python -m agents.import_profiler server --min-ms 5 --depth 4
+    python -m agents.import_profiler server --out import_tree.txt --json import_tree.json
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+from typing import Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S.*)$")
+
+
+class ImportNode:
+    """One imported module: its own time, its time including children, and its children."""
+    __slots__ = ("name", "self_us", "cumulative_us", "children")
+
+    def __init__(self, name: str, self_us: int, cumulative_us: int, children: List["ImportNode"] = None):
+        self.name = name
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+        self.children = children or []
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "self_ms": round(self.self_us / 1000, 2),
+            "cumulative_ms": round(self.cumulative_us / 1000, 2),
+            "children": [child.to_dict() for child in self.children],
+        }
+
+
+def parse_importtime(log: str) -> List[ImportNode]:
+    """
+    Builds the import tree from `-X importtime` output.
+    Python logs a module after all of its imports (post-order), indented by
+    two spaces per level, so each line adopts the pending lines one level deeper.
+    """
+    pending: Dict[int, List[ImportNode]] = {}
+    for line in log.splitlines():
+        match = _LINE_RE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        depth = len(indent) // 2
+        node = ImportNode(name.strip(), int(self_us), int(cumulative_us), pending.pop(depth + 1, []))
+        pending.setdefault(depth, []).append(node)
+    return pending.get(0, [])
+
+
+def profile_imports(module: str = "server", python: str = sys.executable, cwd: str = BACKEND_DIR,
+                    env: Optional[Dict[str, str]] = None):
+    """Imports `module` in a fresh interpreter; returns (roots, wall seconds, error output or None)."""
+    script = f"import time; _t = time.perf_counter(); import {module}; print(time.perf_counter() - _t)"
+    run_env = dict(os.environ, **(env or {}))
+    run_env["PYTHONPATH"] = os.pathsep.join(p for p in (cwd, run_env.get("PYTHONPATH")) if p)
+    result = subprocess.run([python, "-X", "importtime", "-c", script], cwd=cwd, env=run_env,
+                            capture_output=True, text=True)
+    roots = parse_importtime(result.stderr)
+    if result.returncode != 0:
+        errors = "\n".join(l for l in result.stderr.splitlines() if not l.startswith("import time:"))
+        return roots, None, errors.strip()
+    return roots, float(result.stdout.strip().splitlines()[-1]), None
+
+
+def total_ms(roots: List[ImportNode]) -> float:
+    return sum(node.cumulative_us for node in roots) / 1000
+
+
+def top_level(roots: List[ImportNode]) -> Dict[str, float]:
+    """Cumulative milliseconds per top-level package (e.g. 'cv2', 'langchain_core')."""
+    packages: Dict[str, float] = {}
+
+    def visit(node: ImportNode):
+        package = node.name.split(".")[0]
+        packages[package] = packages.get(package, 0.0) + node.self_us / 1000
+        for child in node.children:
+            visit(child)
+
+    for root in roots:
+        visit(root)
+    return dict(sorted(packages.items(), key=lambda item: -item[1]))
+
+
+def format_tree(roots: List[ImportNode], min_ms: float = 1.0, max_depth: Optional[int] = None) -> str:
+    """Indented tree, children sorted by cumulative time; subtrees under `min_ms` are folded."""
+    lines = [f"{'cumulative':>11} {'self':>9}  module"]
+
+    def visit(node: ImportNode, depth: int):
+        if node.cumulative_us / 1000 < min_ms:
+            return
+        lines.append(f"{node.cumulative_us / 1000:9.1f}ms {node.self_us / 1000:7.1f}ms  {'  ' * depth}{node.name}")
+        if max_depth is not None and depth + 1 >= max_depth:
+            return
+        for child in sorted(node.children, key=lambda c: -c.cumulative_us):
+            visit(child, depth + 1)
+
+    for root in sorted(roots, key=lambda r: -r.cumulative_us):
+        visit(root, 0)
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-module import-time tree for server startup.")
+    parser.add_argument("module", nargs="?", default="server", help="Module to import (default: server)")
+    parser.add_argument("--min-ms", type=float, default=1.0, help="Hide subtrees faster than this")
+    parser.add_argument("--depth", type=int, default=None, help="Maximum tree depth to print")
+    parser.add_argument("--top", type=int, default=15, help="Heaviest top-level packages to list")
+    parser.add_argument("--out", default=None, help="Also write the tree to this file")
+    parser.add_argument("--json", default=None, help="Write the full tree as JSON")
+    args = parser.parse_args(argv)
+
+    roots, wall_seconds, error = profile_imports(args.module)
+    if error:
+        print(f"Import of {args.module} failed:\n{error}")
+    tree = format_tree(roots, args.min_ms, args.depth)
+    print(tree)
+    print()
+    print(f"Top-level packages (self time summed):")
+    for package, ms in list(top_level(roots).items())[:args.top]:
+        print(f"  {ms:9.1f}ms  {package}")
+    if wall_seconds is not None:
+        print(f"import {args.module}: {wall_seconds * 1000:.0f}ms wall, {total_ms(roots):.0f}ms in imports")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(tree + "\n")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"module": args.module, "wall_ms": wall_seconds * 1000 if wall_seconds is not None else None,
+                       "tree": [root.to_dict() for root in roots]}, f, indent=2)
+    return 1 if error else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
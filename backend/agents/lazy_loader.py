@@ -7,12 +7,16 @@ class LazyModule:
     """
     Thread-safe lazy loader for heavy modules
     Delays import until first access, then caches
+    `preload()` starts the import on a background thread ahead of first use.
     """
     def __init__(self, module_name: str):
         self._module_name = module_name
         self._module = None
         self._lock = threading.Lock()
         self._loading = False
+        self._preload_thread: Optional[threading.Thread] = None
+        self.load_seconds: Optional[float] = None
+        self.error: Optional[str] = None
     
     def _load(self):
         """Load module thread-safely"""
@@ -21,14 +25,47 @@ class LazyModule:
                 # Double-check locking pattern
                 if self._module is None:
                     self._loading = True
+                    started = time.perf_counter()
                     try:
                         self._module = importlib.import_module(self._module_name)
+                        self.error = None
                         print(f"✅ Lazy loaded: {self._module_name}")
                     except ImportError as e:
                         print(f"❌ Failed to load {self._module_name}: {e}")
                         self._module = None
+                        self.error = str(e)
                     finally:
+                        self.load_seconds = time.perf_counter() - started
                         self._loading = False
+
+    def preload(self) -> threading.Thread:
+        """Imports the module on a background thread; returns that thread."""
+        with self._lock:
+            if self._preload_thread is None:
+                self._preload_thread = threading.Thread(
+                    target=self._load, name=f"preload_{self._module_name}", daemon=True
+                )
+                self._preload_thread.start()
+            return self._preload_thread
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Waits for a started preload; True once the module is loaded."""
+        thread = self._preload_thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.loaded
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self.loaded,
+            "loading": self._loading,
+            "load_seconds": round(self.load_seconds, 3) if self.load_seconds is not None else None,
+            "error": self.error,
+        }
     
     def __getattr__(self, attr: str) -> Any:
         """Load module on first attribute access"""
@@ -43,3 +80,16 @@ lazy_deepface = LazyModule('deepface')
 lazy_librosa = LazyModule('librosa')
 lazy_keybert = LazyModule('keybert')
 lazy_spacy = LazyModule('spacy')
+
+LAZY_MODULES = {
+    'deepface': lazy_deepface,
+    'librosa': lazy_librosa,
+    'keybert': lazy_keybert,
+    'spacy': lazy_spacy,
+}
+
+
+def lazy_module_stats() -> dict:
+    """Load state and import time of every lazy module that has been touched."""
+    return {name: module.stats() for name, module in LAZY_MODULES.items()
+            if module.loaded or module.load_seconds is not None or module._loading}
@@ -0,0 +1,157 @@
+import os
+import copy
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Defaults can be overridden per deployment through the environment
+DEFAULT_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+DEFAULT_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(6 * 3600)))
+DEFAULT_DISK_DIR = os.getenv("LLM_CACHE_DIR")  # Unset -> memory tier only
+
+
+def make_cache_key(model: str, temperature: Optional[float], prompt_text: str) -> str:
+    """
+    Content address for an LLM call: model + temperature + rendered prompt.
+    """
+    temp = "none" if temperature is None else repr(float(temperature))
+    payload = f"{model}\x00{temp}\x00{prompt_text}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Two-tier cache for parsed LLM responses.
+    Tier 1 is an in-memory LRU with a TTL, tier 2 an optional directory of JSON files.
+    Values must be JSON-serialisable (parser outputs: dicts, lists, strings).
+    """
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 disk_dir: Optional[str] = DEFAULT_DISK_DIR):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = disk_dir
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0}
+        self._site_stats: Dict[str, Dict[str, int]] = {}
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    # --- Public API ---
+
+    def get(self, key: str, site: str = "default") -> Tuple[bool, Any]:
+        """Returns (hit, value). A copy is returned so callers can mutate it freely."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created, value = entry
+                if now - created <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self._record(site, "hits")
+                    return True, copy.deepcopy(value)
+                del self._entries[key]
+                self._stats["expired"] += 1
+
+        # Tier 2 (outside the lock, file I/O)
+        found, created, value = self._disk_read(key)
+        if found and now - created <= self.ttl_seconds:
+            with self._lock:
+                self._insert(key, created, value)
+                self._record(site, "disk_hits")
+            return True, copy.deepcopy(value)
+
+        with self._lock:
+            self._record(site, "misses")
+        return False, None
+
+    def set(self, key: str, value: Any, site: str = "default"):
+        created = time.time()
+        with self._lock:
+            self._insert(key, created, copy.deepcopy(value))
+            self._record(site, "stores")
+        self._disk_write(key, created, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["disk_hits"] + self._stats["misses"]
+            hit_rate = (self._stats["hits"] + self._stats["disk_hits"]) / lookups if lookups else 0.0
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "disk_tier": bool(self.disk_dir),
+                "hit_rate": round(hit_rate, 3),
+                "sites": copy.deepcopy(self._site_stats),
+            }
+
+    # --- Internals ---
+
+    def _record(self, site: str, counter: str):
+        self._stats[counter] += 1
+        site_stats = self._site_stats.setdefault(site, {"hits": 0, "disk_hits": 0, "misses": 0, "stores": 0})
+        site_stats[counter] += 1
+
+    def _insert(self, key: str, created: float, value: Any):
+        self._entries[key] = (created, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def _disk_read(self, key: str):
+        if not self.disk_dir:
+            return False, 0.0, None
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+            return True, float(record["created"]), record["value"]
+        except FileNotFoundError:
+            return False, 0.0, None
+        except Exception as e:
+            logger.warning(f"LLM cache: unreadable disk entry {path}: {e}")
+            return False, 0.0, None
+
+    def _disk_write(self, key: str, created: float, value: Any):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"created": created, "value": value}, f)
+            os.replace(tmp_path, path)  # Atomic, so readers never see half a file
+        except Exception as e:
+            logger.warning(f"LLM cache: failed to persist {key[:12]}: {e}")
+
+
+# Process-wide instance shared by all agents
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+def get_llm_cache() -> LLMResponseCache:
+    global _llm_cache
+    if _llm_cache is None:
+        with _llm_cache_lock:
+            if _llm_cache is None:
+                _llm_cache = LLMResponseCache()
+    return _llm_cache
+
@@ -0,0 +1,302 @@
+import os
+import copy
+import asyncio
+import concurrent.futures
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from agents.llm_cache import get_llm_cache, make_cache_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+DEFAULT_SITE_CONCURRENCY = int(os.getenv("LLM_SITE_CONCURRENCY_DEFAULT", "4"))
+DEFAULT_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+DEFAULT_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+
+
+def _parse_site_limits(raw: Optional[str]) -> Dict[str, int]:
+    """Parses 'site=limit,site=limit' (LLM_SITE_CONCURRENCY) into a dict."""
+    limits = {}
+    for part in (raw or "").split(","):
+        if "=" not in part:
+            continue
+        site, limit = part.split("=", 1)
+        try:
+            limits[site.strip()] = max(1, int(limit))
+        except ValueError:
+            logger.warning(f"Ignoring invalid LLM site limit: {part!r}")
+    return limits
+
+
+class LLMGateway:
+    """
+    Process-wide entry point for every LLM call made by the agents.
+
+    All requests run on one private event loop thread, which owns:
+      - a pooled `httpx.AsyncClient` shared by every ChatGroq client,
+      - a global concurrency semaphore plus one semaphore per call site,
+      - the table of in-flight requests used to coalesce identical calls.
+    Callers can be sync (executor threads) or async (any event loop).
+    """
+    def __init__(self, api_key: Optional[str] = None, model_name: str = DEFAULT_MODEL,
+                 base_url: Optional[str] = None,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 site_limits: Optional[Dict[str, int]] = None,
+                 default_site_limit: int = DEFAULT_SITE_CONCURRENCY,
+                 max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                 timeout: float = DEFAULT_TIMEOUT_SECONDS,
+                 llm_factory: Optional[Callable[[float], Any]] = None):
+        self.api_key = api_key if api_key is not None else os.getenv("GROQ_API_KEY")
+        self.model_name = model_name
+        self.base_url = base_url if base_url is not None else os.getenv("GROQ_BASE_URL")
+        self.max_concurrency = max_concurrency
+        self.site_limits = site_limits if site_limits is not None else _parse_site_limits(os.getenv("LLM_SITE_CONCURRENCY"))
+        self.default_site_limit = default_site_limit
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._llm_factory = llm_factory
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+        # Loop-owned state (only touched from the gateway loop)
+        self._http_client = None
+        self._llms: Dict[float, Any] = {}
+        self._global_sem: Optional[asyncio.Semaphore] = None
+        self._site_sems: Dict[str, asyncio.Semaphore] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+        self._stats = {"requests": 0, "llm_calls": 0, "cache_hits": 0, "coalesced": 0, "errors": 0}
+        self._site_active: Dict[str, int] = {}
+        self._site_usage: Dict[str, Dict] = {}
+
+    @property
+    def available(self) -> bool:
+        """False when no API key is configured; agents then use their offline fallbacks."""
+        return bool(self.api_key) or self._llm_factory is not None
+
+    # --- Public API ---
+
+    async def ainvoke(self, site: str, prompt, parser, inputs: dict,
+                      temperature: float = 0.0, cache: Optional[bool] = None):
+        """
+        Async equivalent of `(prompt | llm | parser).invoke(inputs)`.
+
+        Args:
+            site: Call-site name, used for per-site limits and metrics.
+            temperature: Sampling temperature of the ChatGroq client to use.
+            cache: Force the response cache on/off. None caches temperature-0 calls only.
+        """
+        loop = self._ensure_loop()
+        coro = self._run(site, prompt, parser, inputs, temperature, cache)
+        if asyncio.get_running_loop() is loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    def invoke(self, site: str, prompt, parser, inputs: dict,
+               temperature: float = 0.0, cache: Optional[bool] = None):
+        """Blocking variant for executor threads and scripts."""
+        loop = self._ensure_loop()
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("LLMGateway.invoke() cannot block the gateway loop; use ainvoke()")
+        coro = self._run(site, prompt, parser, inputs, temperature, cache)
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    def site_usage(self, site: str) -> Dict:
+        """Upstream calls, token counts and LLM seconds for one call site."""
+        return dict(self._site_usage.get(site, {"llm_calls": 0, "input_tokens": 0, "output_tokens": 0, "llm_seconds": 0.0}))
+
+    def prepare(self, temperatures):
+        """Builds the chat clients for the given temperatures ahead of the first request."""
+        loop = self._ensure_loop()
+
+        async def _build():
+            for temperature in temperatures:
+                self._get_llm(temperature)
+
+        if self.available:
+            asyncio.run_coroutine_threadsafe(_build(), loop).result()
+
+    def submit(self, coro) -> "concurrent.futures.Future":
+        """
+        Schedules a coroutine on the gateway loop without waiting for it.
+        The returned future can be awaited from any loop via `asyncio.wrap_future`.
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def run(self, coro):
+        """
+        Runs a coroutine on the gateway loop and blocks until it finishes.
+        Used by the sync wrappers of async agent APIs.
+        """
+        self._ensure_loop()
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("LLMGateway.run() cannot block the gateway loop; await the coroutine instead")
+        return self.submit(coro).result()
+
+    def stats(self) -> Dict:
+        return {
+            **self._stats,
+            "in_flight": len(self._inflight),
+            "max_concurrency": self.max_concurrency,
+            "site_active": dict(self._site_active),
+            "site_usage": copy.deepcopy(self._site_usage),
+            "site_limits": {**{s: self.default_site_limit for s in self._site_active}, **self.site_limits},
+        }
+
+    def close(self):
+        """Closes the pooled HTTP client and stops the gateway loop."""
+        if self._loop is None:
+            return
+        if self._http_client is not None:
+            asyncio.run_coroutine_threadsafe(self._http_client.aclose(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop = None
+        self._thread = None
+        self._llms.clear()
+        self._http_client = None
+        self._global_sem = None
+        self._site_sems.clear()
+
+    # --- Internals ---
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            with self._start_lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    thread = threading.Thread(target=loop.run_forever, name="llm_gateway", daemon=True)
+                    thread.start()
+                    self._thread = thread
+                    self._loop = loop
+        return self._loop
+
+    def _get_llm(self, temperature: float):
+        """One chat client per temperature, all sharing the pooled HTTP client."""
+        temperature = float(temperature)
+        llm = self._llms.get(temperature)
+        if llm is not None:
+            return llm
+
+        if self._llm_factory is not None:
+            llm = self._llm_factory(temperature)
+        else:
+            import httpx
+            from langchain_groq import ChatGroq
+
+            if self._http_client is None:
+                self._http_client = httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_connections
+                    ),
+                    timeout=self.timeout
+                )
+            kwargs = {}
+            if self.base_url:
+                kwargs["base_url"] = self.base_url
+            llm = ChatGroq(
+                temperature=temperature,
+                model_name=self.model_name,
+                api_key=self.api_key,
+                http_async_client=self._http_client,
+                **kwargs
+            )
+        self._llms[temperature] = llm
+        return llm
+
+    def _site_sem(self, site: str) -> asyncio.Semaphore:
+        sem = self._site_sems.get(site)
+        if sem is None:
+            sem = asyncio.Semaphore(self.site_limits.get(site, self.default_site_limit))
+            self._site_sems[site] = sem
+        return sem
+
+    def _record_usage(self, site: str, message, seconds: float):
+        usage = self._site_usage.setdefault(site, {"llm_calls": 0, "input_tokens": 0, "output_tokens": 0, "llm_seconds": 0.0})
+        usage["llm_calls"] += 1
+        usage["llm_seconds"] += seconds
+        metadata = getattr(message, "usage_metadata", None) or {}
+        usage["input_tokens"] += int(metadata.get("input_tokens", 0) or 0)
+        usage["output_tokens"] += int(metadata.get("output_tokens", 0) or 0)
+
+    async def _run(self, site, prompt, parser, inputs, temperature, cache):
+        self._stats["requests"] += 1
+        if self._global_sem is None:
+            self._global_sem = asyncio.Semaphore(self.max_concurrency)
+
+        llm = self._get_llm(temperature)
+        prompt_value = prompt.format_prompt(**inputs)
+        use_cache = cache if cache is not None else float(temperature) == 0.0
+        model = getattr(llm, "model_name", None) or self.model_name
+        key = make_cache_key(model, temperature, prompt_value.to_string())
+
+        if use_cache:
+            hit, value = get_llm_cache().get(key, site)
+            if hit:
+                self._stats["cache_hits"] += 1
+                return value
+
+        # Identical request already on the wire -> share its result
+        pending = self._inflight.get(key)
+        while pending is not None:
+            self._stats["coalesced"] += 1
+            try:
+                return copy.deepcopy(await asyncio.shield(pending))
+            except asyncio.CancelledError:
+                # Only the caller that owned the request was cancelled: run it ourselves
+                # (or join whoever took it over first) instead of failing with it
+                if not pending.cancelled() or asyncio.current_task().cancelling():
+                    raise
+            pending = self._inflight.get(key)
+
+        future = asyncio.get_running_loop().create_future()
+        # Avoid "exception was never retrieved" when nobody coalesced onto a failed call
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        try:
+            async with self._global_sem, self._site_sem(site):
+                self._site_active[site] = self._site_active.get(site, 0) + 1
+                started = time.perf_counter()
+                try:
+                    self._stats["llm_calls"] += 1
+                    message = await llm.ainvoke(prompt_value)
+                finally:
+                    self._site_active[site] -= 1
+                self._record_usage(site, message, time.perf_counter() - started)
+            result = parser.invoke(message)
+            if use_cache:
+                get_llm_cache().set(key, result, site)
+            future.set_result(result)
+            return copy.deepcopy(result)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            self._stats["errors"] += 1
+            future.set_exception(e)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+
+# Process-wide instance shared by all agents
+_llm_gateway = None
+_llm_gateway_lock = threading.Lock()
+
+def get_llm_gateway() -> LLMGateway:
+    global _llm_gateway
+    if _llm_gateway is None:
+        with _llm_gateway_lock:
+            if _llm_gateway is None:
+                _llm_gateway = LLMGateway()
+                if not _llm_gateway.available:
+                    logger.warning("GROQ_API_KEY not found. LLM features will use offline fallbacks.")
+    return _llm_gateway
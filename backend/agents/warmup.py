@@ -0,0 +1,172 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# WARMUP_ENABLED=0 skips warm-up (the server reports ready immediately)
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1").lower() not in ("0", "false", "no", "off")
+
+# Default per-agent budget; WARMUP_TIMEOUTS="non_verbal=120,tts=30" overrides single agents
+WARMUP_TIMEOUT_S = float(os.getenv("WARMUP_TIMEOUT_S", "60"))
+
+
+def parse_timeouts(spec: str) -> Dict[str, float]:
+    timeouts = {}
+    for item in (spec or "").split(","):
+        name, _, seconds = item.partition("=")
+        if name.strip() and seconds.strip():
+            try:
+                timeouts[name.strip()] = float(seconds)
+            except ValueError:
+                logger.warning(f"Ignoring warm-up timeout {item!r}")
+    return timeouts
+
+
+WARMUP_TIMEOUTS = parse_timeouts(os.getenv("WARMUP_TIMEOUTS", ""))
+
+PENDING = "pending"
+RUNNING = "running"
+OK = "ok"
+FAILED = "failed"
+TIMEOUT = "timeout"
+
+
+class WarmupTask:
+    """One agent to warm: `load()` builds it (imports, model files), `exercise(agent)` runs a dummy inference."""
+    __slots__ = ("name", "load", "exercise", "timeout", "status", "import_seconds",
+                 "first_inference_seconds", "error")
+
+    def __init__(self, name: str, load: Callable[[], Any], exercise: Optional[Callable[[Any], Any]] = None,
+                 timeout: Optional[float] = None):
+        self.name = name
+        self.load = load
+        self.exercise = exercise
+        self.timeout = timeout
+        self.status = PENDING
+        self.import_seconds: Optional[float] = None
+        self.first_inference_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def run(self):
+        """Runs on a warm-up thread; timings are recorded even if the caller already gave up."""
+        started = time.perf_counter()
+        agent = self.load()
+        self.import_seconds = time.perf_counter() - started
+        if self.exercise is not None:
+            started = time.perf_counter()
+            self.exercise(agent)
+            self.first_inference_seconds = time.perf_counter() - started
+
+    def to_dict(self) -> Dict:
+        return {
+            "status": self.status,
+            "timeout_s": self.timeout,
+            "import_s": round(self.import_seconds, 3) if self.import_seconds is not None else None,
+            "first_inference_s": (round(self.first_inference_seconds, 3)
+                                  if self.first_inference_seconds is not None else None),
+            "error": self.error,
+        }
+
+
+class Warmup:
+    """
+    Startup warm-up: every registered agent is loaded and exercised on a
+    dummy input concurrently, each on its own thread and within its own
+    timeout. `ready` turns True once every task has finished, failed or timed
+    out, so one slow model cannot keep the worker out of rotation forever.
+    A timed-out task keeps running in the background and still records its
+    timings.
+    """
+    def __init__(self, default_timeout: float = WARMUP_TIMEOUT_S, timeouts: Dict[str, float] = None,
+                 enabled: bool = WARMUP_ENABLED):
+        self.default_timeout = default_timeout
+        self.timeouts = dict(WARMUP_TIMEOUTS if timeouts is None else timeouts)
+        self.enabled = enabled
+        self.tasks: Dict[str, WarmupTask] = {}
+        self.modules: Dict[str, Any] = {}  # name -> LazyModule preloaded in the background
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._ready = threading.Event()
+
+    def add(self, name: str, load: Callable[[], Any], exercise: Optional[Callable[[Any], Any]] = None,
+            timeout: Optional[float] = None):
+        timeout = self.timeouts.get(name, timeout if timeout is not None else self.default_timeout)
+        self.tasks[name] = WarmupTask(name, load, exercise, timeout)
+
+    def preload(self, name: str, module):
+        """Starts a LazyModule import in the background alongside the agent tasks."""
+        self.modules[name] = module
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    async def run(self) -> Dict:
+        self.started_at = time.perf_counter()
+        if not self.enabled:
+            logger.info("Warm-up disabled")
+            return self._finish()
+
+        for module in self.modules.values():
+            module.preload()
+        executor = ThreadPoolExecutor(max_workers=max(1, len(self.tasks)), thread_name_prefix="warmup_")
+        try:
+            await asyncio.gather(*(self._run_task(task, executor) for task in self.tasks.values()))
+        finally:
+            # Timed-out tasks are left to finish on their threads
+            executor.shutdown(wait=False)
+        return self._finish()
+
+    async def _run_task(self, task: WarmupTask, executor: ThreadPoolExecutor):
+        loop = asyncio.get_running_loop()
+        task.status = RUNNING
+        try:
+            await asyncio.wait_for(loop.run_in_executor(executor, task.run), timeout=task.timeout)
+            task.status = OK
+            logger.info(f"🔥 Warmed up {task.name} (import {task.import_seconds:.2f}s"
+                        + (f", first inference {task.first_inference_seconds:.2f}s)"
+                           if task.first_inference_seconds is not None else ")"))
+        except asyncio.TimeoutError:
+            task.status = TIMEOUT
+            task.error = f"not warm after {task.timeout:g}s"
+            logger.warning(f"⚠️ Warm-up of {task.name} timed out after {task.timeout:g}s")
+        except Exception as e:
+            task.status = FAILED
+            task.error = str(e)
+            logger.error(f"❌ Warm-up of {task.name} failed: {e}")
+
+    def _finish(self) -> Dict:
+        self.finished_at = time.perf_counter()
+        self._ready.set()
+        logger.info(f"✅ Warm-up finished in {self.finished_at - self.started_at:.1f}s")
+        return self.status()
+
+    def status(self) -> Dict:
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = round((self.finished_at or time.perf_counter()) - self.started_at, 3)
+        return {
+            "ready": self.ready,
+            "enabled": self.enabled,
+            "elapsed_s": elapsed,
+            "agents": {name: task.to_dict() for name, task in self.tasks.items()},
+            "modules": {name: module.stats() for name, module in self.modules.items()},
+        }
+
+
+_warmup = None
+_warmup_lock = threading.Lock()
+
+
+def get_warmup() -> Warmup:
+    global _warmup
+    if _warmup is None:
+        with _warmup_lock:
+            if _warmup is None:
+                _warmup = Warmup()
+    return _warmup
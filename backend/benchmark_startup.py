@@ -0,0 +1,122 @@
+"""
+Cold-start benchmark: time to `import server` in a fresh interpreter, which
+heavy packages that import drags in, and the import cost of each agent.
+
+    python benchmark_startup.py
+    python benchmark_startup.py --runs 7 --json startup.json
+
+Exits non-zero if a target below is missed. Use
+`python -m agents.import_profiler server` to see where the time goes.
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# ===== TARGETS =====
+# Median wall time of `import server` (fresh interpreter, warm OS file cache)
+SERVER_IMPORT_TARGET_MS = float(os.getenv("STARTUP_IMPORT_TARGET_MS", "1000"))
+
+# Must not be imported by `import server`; they load behind their agent/endpoint or during warm-up
+DEFERRED_PACKAGES = [
+    "cv2", "deepface", "tensorflow", "onnxruntime", "librosa", "soundfile",
+    "langchain_core", "langchain_groq", "langsmith", "speech_recognition",
+    "motor", "pymongo", "reportlab", "pypdf", "keybert", "spacy",
+]
+
+# Agent modules timed individually (import only, after the server's own imports)
+AGENT_MODULES = [
+    "non_verbal_agent.video_analyzer",
+    "vocal_agent.vocal_analyzer",
+    "scoring_agent.keyword_scorer",
+    "verbal_agent.verbal_analyzer",
+    "tts_agent.tts_engine",
+    "store",
+    "report_generator",
+    "resume_parser",
+]
+
+_PROBE = """
+import sys, time, json
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"ms": elapsed * 1000, "modules": sorted({{m.split('.')[0] for m in sys.modules}})}}))
+"""
+
+
+def probe(module: str, preload: str = None) -> dict:
+    """Imports `module` (after `preload`, untimed) in a fresh interpreter."""
+    script = (f"import {preload}\n" if preload else "") + _PROBE.format(module=module)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(p for p in (BACKEND_DIR, os.getenv("PYTHONPATH")) if p))
+    result = subprocess.run([sys.executable, "-c", script], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        error = (result.stderr.strip().splitlines() or ["unknown error"])[-1]
+        return {"ms": None, "modules": [], "error": error}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold-start import benchmark for the server.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters for `import server`")
+    parser.add_argument("--json", default=None, help="Write the results to this file")
+    parser.add_argument("--skip-agents", action="store_true", help="Only time `import server`")
+    args = parser.parse_args(argv)
+
+    print("⏱️  COLD-START BENCHMARK")
+    print("==========================================")
+
+    failures = []
+    runs = [probe("server") for _ in range(max(1, args.runs))]
+    errors = [run["error"] for run in runs if run.get("error")]
+    results = {"server": {}, "agents": {}}
+    if errors:
+        print(f"❌ import server failed: {errors[0]}")
+        failures.append("import server")
+    else:
+        timings = [run["ms"] for run in runs]
+        median = statistics.median(timings)
+        loaded = [p for p in DEFERRED_PACKAGES if p in runs[-1]["modules"]]
+        results["server"] = {"median_ms": round(median, 1), "min_ms": round(min(timings), 1),
+                             "max_ms": round(max(timings), 1), "deferred_loaded": loaded}
+        ok = median <= SERVER_IMPORT_TARGET_MS
+        print(f"{'✅' if ok else '❌'} import server: median {median:.0f}ms "
+              f"(min {min(timings):.0f}, max {max(timings):.0f}; target {SERVER_IMPORT_TARGET_MS:.0f}ms)")
+        if not ok:
+            failures.append("server import time")
+        if loaded:
+            print(f"❌ Heavy packages imported eagerly: {', '.join(loaded)}")
+            failures.append("deferred packages")
+        else:
+            print(f"✅ None of {len(DEFERRED_PACKAGES)} deferred packages imported at startup")
+
+    if not args.skip_agents:
+        print("\nAgent import cost (on top of `import server`):")
+        for module in AGENT_MODULES:
+            run = probe(module, preload="server")
+            results["agents"][module] = {"ms": round(run["ms"], 1) if run["ms"] is not None else None,
+                                         "error": run.get("error")}
+            if run["ms"] is None:
+                print(f"  {'n/a':>8}    {module} ({run['error']})")
+            else:
+                print(f"  {run['ms']:6.0f}ms    {module}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    print("\n==========================================")
+    if failures:
+        print(f"❌ FAILED: {', '.join(failures)}")
+        return 1
+    print("✅ ALL TARGETS MET")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+import os
+import re
+import difflib
+import logging
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Below this confidence the LLM classifier is consulted
+DEFAULT_THRESHOLD = float(os.getenv("BRANCH_CLASSIFIER_THRESHOLD", "0.8"))
+
+# Fuzzy/n-gram matches weaker than this are ignored
+FUZZY_MIN_SCORE = 0.75
+
+# Canonical branch -> spoken/written aliases
+BRANCH_ALIASES = {
+    "CSE": ["cse", "cs", "computer science", "computer science engineering", "computer", "computers",
+            "computer engineering", "software", "software engineering", "comp sci"],
+    "AI": ["ai", "aiml", "ai ml", "artificial intelligence", "machine learning", "data science"],
+    "CIVIL": ["civil", "civil engineering", "construction", "structural"],
+    "MECHANICAL": ["mechanical", "mech", "mechanical engineering", "automobile", "automotive"],
+    "EC": ["ec", "ece", "electronics", "electronics and communication", "communication", "telecommunication"],
+    "EEE": ["eee", "electrical", "electrical engineering", "electrical and electronics", "power"],
+    "ISE": ["ise", "information science", "information science engineering", "information technology", "is", "it"],
+}
+
+# Aliases that are also ordinary English words: only trusted when they are the whole answer
+STANDALONE_ONLY = {"is", "it", "power", "computer", "communication", "software"}
+
+# Words shared by many aliases; they would make every "... engineering" answer look alike
+FILLER_WORDS = {"engineering", "engg", "eng", "branch", "department", "dept", "and", "of", "in", "the"}
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _words(text: str) -> List[str]:
+    """Lowercase tokens without filler words; spelled-out letters ("E C E") are joined."""
+    words = []
+    run = ""
+    for word in _WORD_RE.findall((text or "").lower().replace("&", " and ")):
+        if len(word) == 1 and word.isalpha():
+            run += word
+            continue
+        if run:
+            words.append(run)
+            run = ""
+        if word not in FILLER_WORDS:
+            words.append(word)
+    if run:
+        words.append(run)
+    return words
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _ngram_similarity(a: str, b: str) -> float:
+    """Dice coefficient over character trigrams."""
+    ta, tb = _trigrams(a), _trigrams(b)
+    if not ta or not tb:
+        return 0.0
+    return 2 * len(ta & tb) / (len(ta) + len(tb))
+
+
+class BranchClassifier:
+    """
+    Deterministic branch classifier for the branch-selection turn.
+
+    Matches the answer against branch ids and aliases (exact phrase, then fuzzy
+    token/character-trigram similarity for typos and transcription errors) and
+    returns (branch, confidence). Confidence is the best branch score minus the
+    best score of any other branch, so "CSE or maybe EEE" stays below threshold
+    and is left to the LLM.
+    """
+    def __init__(self, branches: Sequence[str], threshold: float = DEFAULT_THRESHOLD):
+        self.branches = list(branches)
+        self.threshold = threshold
+        # alias phrase -> branch, restricted to branches that actually exist
+        self.aliases: Dict[str, str] = {}
+        for branch in self.branches:
+            self.aliases[" ".join(_words(branch)) or branch.lower()] = branch
+        for canonical, aliases in BRANCH_ALIASES.items():
+            target = self._resolve(canonical)
+            if target is None:
+                continue
+            for alias in aliases:
+                alias = " ".join(_words(alias))
+                if alias:
+                    self.aliases.setdefault(alias, target)
+        self._by_length = sorted(self.aliases.items(), key=lambda kv: len(kv[0].split()), reverse=True)
+
+    def _resolve(self, canonical: str) -> Optional[str]:
+        """Maps an alias-table key onto the bank's branch id ("EC" -> "EC" or "EC-VLSI")."""
+        for branch in self.branches:
+            if branch.upper() == canonical:
+                return branch
+        for branch in self.branches:
+            if canonical.lower() in _WORD_RE.findall(branch.lower()):
+                return branch
+        return None
+
+    def _scores(self, words: List[str]) -> Dict[str, float]:
+        scores: Dict[str, float] = {}
+        text = " ".join(words)
+        consumed = [False] * len(words)
+
+        # 1. Exact phrases, longest first, so "electrical and electronics" is not
+        #    also read as "electronics"
+        for alias, branch in self._by_length:
+            if alias in STANDALONE_ONLY:
+                if text == alias:
+                    scores[branch] = 1.0
+                continue
+            alias_words = alias.split()
+            n = len(alias_words)
+            for i in range(len(words) - n + 1):
+                if words[i:i + n] == alias_words and not any(consumed[i:i + n]):
+                    consumed[i:i + n] = [True] * n
+                    scores[branch] = 1.0
+
+        # 2. Fuzzy matches (typos, transcription errors) on the words left over
+        for alias, branch in self._by_length:
+            # Short ids ("cs", "ec") are too easy to hit by accident fuzzily
+            if alias in STANDALONE_ONLY or len(alias) < 4 or scores.get(branch, 0.0) >= 1.0:
+                continue
+            n = len(alias.split())
+            best = 0.0
+            for i in range(len(words) - n + 1):
+                if any(consumed[i:i + n]):
+                    continue
+                window = " ".join(words[i:i + n])
+                if abs(len(window) - len(alias)) > max(2, len(alias) // 3):
+                    continue
+                ratio = difflib.SequenceMatcher(None, window, alias).ratio()
+                best = max(best, ratio, _ngram_similarity(window, alias))
+            if best >= FUZZY_MIN_SCORE:
+                scores[branch] = max(scores.get(branch, 0.0), 0.95 * best)
+        return scores
+
+    def classify(self, text: str) -> Tuple[str, float]:
+        """Returns (branch or "UNKNOWN", confidence in [0, 1])."""
+        words = _words(text)
+        if not words:
+            return "UNKNOWN", 0.0
+        ranked = sorted(self._scores(words).items(), key=lambda kv: kv[1], reverse=True)
+        ranked = [(branch, score) for branch, score in ranked if score > 0.0]
+        if not ranked:
+            return "UNKNOWN", 0.0
+        best_branch, best = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        return best_branch, round(max(0.0, best - runner_up), 3)
+
+
+# ===== Process-wide classifiers and metrics =====
+_classifiers: Dict[Tuple[str, ...], BranchClassifier] = {}
+_classifiers_lock = threading.Lock()
+_stats = {"calls": 0, "fast_path": 0, "llm": 0, "local_seconds": 0.0}
+
+def get_branch_classifier(branches: Sequence[str]) -> BranchClassifier:
+    """One classifier per branch list (the list only changes on a question bank reload)."""
+    key = tuple(branches)
+    classifier = _classifiers.get(key)
+    if classifier is None:
+        with _classifiers_lock:
+            classifier = _classifiers.get(key)
+            if classifier is None:
+                classifier = BranchClassifier(key)
+                _classifiers[key] = classifier
+    return classifier
+
+def record_classification(fast_path: bool, local_seconds: float):
+    with _classifiers_lock:
+        _stats["calls"] += 1
+        _stats["fast_path" if fast_path else "llm"] += 1
+        _stats["local_seconds"] += local_seconds
+
+def branch_classifier_stats() -> Dict:
+    """Fast-path hit rate and the LLM latency it avoided (estimated from the LLM call average)."""
+    from agents.llm_gateway import get_llm_gateway
+
+    with _classifiers_lock:
+        stats = dict(_stats)
+    usage = get_llm_gateway().site_usage("brain.classify_branch")
+    avg_llm = usage["llm_seconds"] / usage["llm_calls"] if usage["llm_calls"] else 0.0
+    calls = stats["calls"]
+    return {
+        "threshold": DEFAULT_THRESHOLD,
+        "calls": calls,
+        "fast_path": stats["fast_path"],
+        "llm": stats["llm"],
+        "hit_rate": round(stats["fast_path"] / calls, 3) if calls else 0.0,
+        "avg_local_ms": round(1000 * stats["local_seconds"] / calls, 3) if calls else 0.0,
+        "avg_llm_ms": round(1000 * avg_llm, 1),
+        "estimated_ms_saved": round(1000 * avg_llm * stats["fast_path"], 1),
+    }
@@ -1,163 +1,188 @@
-import os
-import json
-from langchain_groq import ChatGroq
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
+import time
+import asyncio
 from pydantic import BaseModel, Field
-from dataset_loader import InterviewDatasetLoader
+from question_bank import get_question_bank, QuestionCursor
+from agents.llm_gateway import get_llm_gateway
+from agents.chain_registry import register_chain, json_parser, str_parser
+from brain_agent.resume_questions import MAX_RESUME_QUESTIONS, get_resume_prefetcher
+from brain_agent.branch_classifier import get_branch_classifier, record_classification
 
 # Define structured output for Branch Classification
 class BranchClassification(BaseModel):
     branch: str = Field(description="The engineering branch identified (e.g., 'CSE', 'ECE', 'MECHANICAL') or 'UNKNOWN'")
     confidence: float = Field(description="Confidence score between 0 and 1")
 
-# Define structured output for Resume Question Generation
-class ResumeQuestion(BaseModel):
-    text: str = Field(description="The technical interview question text")
-    ideal_answer: str = Field(description="A concise ideal answer or key points expected")
+# Sampling temperature for the conversational prompts
+BRAIN_TEMPERATURE = 0.3
+
+# ===== Fixed prompts (pre-rendered to speech by tts_agent/prerender.py) =====
+FALLBACK_GREETING = "Hello! I am your AI Interviewer. To begin, could you please confirm your engineering branch?"
+BRANCH_REPROMPT = "I didn't quite catch that. Please specify one of our supported branches: {branches}."
+QUESTION_PREFIX = "Question {number}:"
+RESUME_QUESTION_PREFIX = "(Resume Context)"
+END_OF_QUESTIONS = "That concludes the technical round. Thank you for your time!"
+INTERVIEW_COMPLETE = "The interview is complete. Thank you!"
+
+# ===== Compiled chains (see agents/chain_registry.py) =====
+# Same branch list -> same greeting; safe to reuse across sessions
+INTRO_CHAIN = register_chain(
+    "brain.intro",
+    "You are a friendly professional AI Interviewer. "
+    "The user just connected. "
+    "Greet them warmly and ask them to confirm their engineering branch "
+    "(Available: {branches}). Keep it concise.",
+    parser=str_parser(),
+    temperature=BRAIN_TEMPERATURE,
+    cache=True
+)
+
+# Classification is a pure function of (branches, answer), so it is cached
+# even though the brain LLM runs above temperature 0.
+CLASSIFY_BRANCH_CHAIN = register_chain(
+    "brain.classify_branch",
+    "Classify the user's input into one of the following engineering branches: {branches}.\n"
+    "User Input: '{user_text}'\n"
+    "If the input matches a branch (even vaguely, like 'CS' for 'CSE', or 'EC' for 'ECE'), return that branch ID exactly as listed.\n"
+    "If it does not match anything, return 'UNKNOWN'.\n"
+    "\n{format_instructions}",
+    parser=json_parser(BranchClassification),
+    temperature=BRAIN_TEMPERATURE,
+    cache=True
+)
 
 class BrainAgent:
     def __init__(self, resume_text=None):
-        self.api_key = os.getenv("GROQ_API_KEY")
         self.resume_text = resume_text
         
-        # Initialize LLM
-        if self.api_key:
-            self.llm = ChatGroq(
-                temperature=0.3, 
-                model_name="llama-3.3-70b-versatile", 
-                api_key=self.api_key
-            )
-        else:
+        # Shared LLM gateway (one pooled client for every session)
+        self.gateway = get_llm_gateway()
+        if not self.gateway.available:
             print("Warning: GROQ_API_KEY not found. LLM features will fail.")
-            self.llm = None
 
         # Interview State
         self.stage = "introduction"  # introduction -> branch_selection -> interview -> feedback
         
-        # Dataset & Logic
-        self.loader = InterviewDatasetLoader()
-        self.available_branches = self.loader.get_all_branches()
+        # Dataset & Logic (shared, pre-indexed bank; the session only holds a cursor)
+        self.bank = get_question_bank()
+        self.available_branches = self.bank.get_all_branches()
+        self.branch_classifier = get_branch_classifier(self.available_branches)
         
         self.selected_branch = None
-        self.questions_list = []
+        self.cursor = None  # QuestionCursor over the selected branch
         self.k = 0  # Question counter
         
         # Resume Specifics
         self.resume_questions_asked = 0
-        self.MAX_RESUME_QUESTIONS = 2
+        self.MAX_RESUME_QUESTIONS = MAX_RESUME_QUESTIONS
+        if self.resume_text:
+            # Generate every resume question in the background right away;
+            # by the time the interview stage starts they are usually ready.
+            get_resume_prefetcher().prefetch(self.resume_text, self.MAX_RESUME_QUESTIONS)
         
         self.current_question = None  # {id, text, ideal_answer}
 
+        # Serialises turns: transcription and text turns of one session may overlap
+        self._turn_lock = asyncio.Lock()
+
+    # ===== Sync API (wrappers for scripts and executor threads) =====
+
     def get_response(self, user_text):
+        """
+        Blocking wrapper around `aget_response`. Do not call from an event loop.
+        """
+        return self.gateway.run(self.aget_response(user_text))
+
+    def get_next_question(self, user_last_response=""):
+        """Blocking wrapper around `aget_next_question`."""
+        return self.gateway.run(self.aget_next_question(user_last_response))
+
+    def _classify_branch(self, user_text):
+        """Blocking wrapper around `_aclassify_branch`."""
+        return self.gateway.run(self._aclassify_branch(user_text))
+
+    def _generate_resume_question(self):
+        """Blocking wrapper around `_agenerate_resume_question`."""
+        return self.gateway.run(self._agenerate_resume_question())
+
+    # ===== Async API =====
+
+    async def aget_response(self, user_text):
         """
         Determines the next step in the interview flow using LangChain logic.
+        LLM I/O is awaited, so the calling event loop keeps serving other sessions.
         """
-        user_text = user_text.strip()
+        async with self._turn_lock:
+            return await self._advance(user_text.strip())
+
+    async def _advance(self, user_text):
+        """Runs one turn of the stage machine (caller holds the turn lock)."""
 
         # 1. Introduction Stage
         if self.stage == "introduction":
             self.stage = "branch_selection"
             # Use LLM to generate a welcoming message
-            if self.llm:
+            if self.gateway.available:
                 try:
-                    chain = (
-                        ChatPromptTemplate.from_template(
-                            "You are a friendly professional AI Interviewer. "
-                            "The user just connected. "
-                            "Greet them warmly and ask them to confirm their engineering branch "
-                            "(Available: {branches}). Keep it concise."
-                        )
-                        | self.llm 
-                        | StrOutputParser()
-                    )
-                    return chain.invoke({"branches": ", ".join(self.available_branches)})
+                    return await INTRO_CHAIN.ainvoke({"branches": ", ".join(self.available_branches)})
                 except Exception as e:
                     print(f"LLM Error (Intro): {e}")
             
-            return "Hello! I am your AI Interviewer. To begin, could you please confirm your engineering branch?"
+            return FALLBACK_GREETING
 
         # 2. Branch Selection Stage
         if self.stage == "branch_selection":
-            detected_branch = self._classify_branch(user_text)
+            detected_branch = await self._aclassify_branch(user_text)
             
             if detected_branch and detected_branch != "UNKNOWN":
                 self.selected_branch = detected_branch
-                self.questions_list = self.loader.get_questions_for_branch(self.selected_branch)
+                self.cursor = QuestionCursor(self.bank, self.selected_branch)
                 self.stage = "interview"
                 
                 # Retrieve first question
-                return self.get_next_question(user_last_response=user_text)
+                return await self.aget_next_question(user_last_response=user_text)
             else:
-                return f"I didn't quite catch that. Please specify one of our supported branches: {', '.join(self.available_branches)}."
+                return BRANCH_REPROMPT.format(branches=", ".join(self.available_branches))
 
         # 3. Interview Stage
         if self.stage == "interview":
-            return self.get_next_question(user_last_response=user_text)
+            return await self.aget_next_question(user_last_response=user_text)
 
-        return "The interview is complete. Thank you!"
+        return INTERVIEW_COMPLETE
 
-    def _classify_branch(self, user_text):
+    def _fallback_branch(self, text):
         """
-        Uses LangChain to classify the user's input into a valid branch.
+        Local classification used when the LLM is missing or fails:
+        the best local match at any confidence.
         """
-        # Common Fallback/Pre-check Logic (Robust Mapping)
-        # This runs if LLM is missing OR if LLM fails, OR as a fast-path
-        def run_fallback(text):
-            text_lower = text.lower()
-            # 1. Comprehensive Mapping
-            branch_map = {
-                "cse": "CSE", "computer science": "CSE", "cs": "CSE", "computer": "CSE",
-                "ai": "AI", "artificial intelligence": "AI", "aiml": "AI",
-                "civil": "CIVIL", "construction": "CIVIL",
-                "mechanical": "MECHANICAL", "mech": "MECHANICAL",
-                "ec": "EC", "electronics": "EC", "ece": "EC", "communication": "EC",
-                "eee": "EEE", "electrical": "EEE",
-                "ise": "ISE", "information science": "ISE", "is": "ISE"
-            }
-            
-            # Check map keys in text
-            for key, val in branch_map.items():
-                if key in text_lower:
-                    # Validate against actually available branches from DB/JSON
-                    # (Logic: if mapped val is likely close to a real branch)
-                    for av in self.available_branches:
-                        if val == av or val in av:
-                            return av
-            
-            # 2. Direct containment check
-            for b in self.available_branches:
-                if b.lower() in text_lower:
-                    return b
-            
-            return "UNKNOWN"
-
-        if not self.llm:
-            return run_fallback(user_text)
-
-        parser = JsonOutputParser(pydantic_object=BranchClassification)
-        prompt = ChatPromptTemplate.from_template(
-            "Classify the user's input into one of the following engineering branches: {branches}.\n"
-            "User Input: '{user_text}'\n"
-            "If the input matches a branch (even vaguely, like 'CS' for 'CSE', or 'EC' for 'ECE'), return that branch ID exactly as listed.\n"
-            "If it does not match anything, return 'UNKNOWN'.\n"
-            "\n{format_instructions}"
-        )
-        
-        chain = prompt | self.llm | parser
-        
+        branch, confidence = self.branch_classifier.classify(text)
+        return branch if confidence > 0 else "UNKNOWN"
+
+    async def _aclassify_branch(self, user_text):
+        """
+        Classifies the user's input into a valid branch.
+        Confident local matches skip the LLM; ambiguous answers go to LangChain.
+        """
+        started = time.perf_counter()
+        branch, confidence = self.branch_classifier.classify(user_text)
+        fast_path = confidence >= self.branch_classifier.threshold
+        record_classification(fast_path, time.perf_counter() - started)
+        if fast_path:
+            return branch
+
+        if not self.gateway.available:
+            return branch if confidence > 0 else "UNKNOWN"
+
         try:
-            result = chain.invoke({
+            result = await CLASSIFY_BRANCH_CHAIN.ainvoke({
                 "branches": self.available_branches,
-                "user_text": user_text,
-                "format_instructions": parser.get_format_instructions()
+                "user_text": user_text
             })
             return result.get("branch", "UNKNOWN")
         except Exception as e:
             print(f"Branch Classification Error: {e}")
-            return run_fallback(user_text)
+            return self._fallback_branch(user_text)
 
-    def get_next_question(self, user_last_response=""):
+    async def aget_next_question(self, user_last_response=""):
         """
         Determines the next question (Resume-based or Dataset-based).
         Optionally acknowledges the previous answer.
@@ -165,56 +190,37 @@ class BrainAgent:
         
         # A. Resume Based Questions
         if self.resume_text and self.resume_questions_asked < self.MAX_RESUME_QUESTIONS:
-            question_data = self._generate_resume_question()
+            question_data = await self._agenerate_resume_question()
             if question_data:
                 self.resume_questions_asked += 1
                 self.current_question = question_data
-                return f"(Resume Context) {question_data['text']}"
+                return f"{RESUME_QUESTION_PREFIX} {question_data['text']}"
         
         # B. Dataset Questions
-        if self.k < len(self.questions_list):
-            q_data = self.questions_list[self.k]
+        q_data = self.cursor.next() if self.cursor else None
+        if q_data:
             self.k += 1
             self.current_question = q_data
-            return f"Question {self.k + self.resume_questions_asked}: {q_data['text']}"
+            return f"{QUESTION_PREFIX.format(number=self.k + self.resume_questions_asked)} {q_data['text']}"
         
         # End of Interview
         self.stage = "feedback"
         self.current_question = None
-        return "That concludes the technical round. Thank you for your time!"
+        return END_OF_QUESTIONS
 
-    def _generate_resume_question(self):
+    def upcoming_question(self):
+        """The dataset question that will be asked next, if already known (used for prefetching)."""
+        return self.cursor.peek() if self.cursor else None
+
+    async def _agenerate_resume_question(self):
         """
-        Uses LangChain to generate a technical question from the resume.
+        Returns the next resume-based question from the background batch,
+        waiting only if its generation is still in progress.
         """
-        if not self.llm:
+        if not self.gateway.available or not self.resume_text:
             return None
 
-        parser = JsonOutputParser(pydantic_object=ResumeQuestion)
-        prompt = ChatPromptTemplate.from_template(
-            "You are an expert technical interviewer.\n"
-            "Candidate's Resume Context: {resume_snippet}\n\n"
-            "Task: Generate 1 hard technical interview question based on a specific project or skill mentioned in the resume.\n"
-            "Also provide a short 'Ideal Answer' for scoring purposes.\n"
-            "\n{format_instructions}"
-        )
-        
-        chain = prompt | self.llm | parser
-        
-        try:
-            # We truncate resume to avoid context limits if necessary
-            snippet = self.resume_text[:3000] if self.resume_text else "No resume provided."
-            
-            result = chain.invoke({
-                "resume_snippet": snippet,
-                "format_instructions": parser.get_format_instructions()
-            })
-            
-            return {
-                "id": f"resume_{self.resume_questions_asked + 1}",
-                "text": result.get("text", "Tell me about your best project."),
-                "ideal_answer": result.get("ideal_answer", "Candidate should describe challenges and solutions.")
-            }
-        except Exception as e:
-            print(f"Resume Question Gen Error: {e}")
-            return None
+        questions = await get_resume_prefetcher().aget(self.resume_text, self.MAX_RESUME_QUESTIONS)
+        if self.resume_questions_asked < len(questions):
+            return questions[self.resume_questions_asked]
+        return None
@@ -0,0 +1,143 @@
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+import concurrent.futures
+from collections import OrderedDict
+from typing import Dict, List
+from pydantic import BaseModel, Field
+from agents.llm_gateway import get_llm_gateway
+from agents.chain_registry import register_chain, json_parser
+
+logger = logging.getLogger(__name__)
+
+# Resume questions asked before switching to the dataset questions
+MAX_RESUME_QUESTIONS = 2
+
+# Resume text beyond this is not sent to the LLM (context limits)
+RESUME_SNIPPET_CHARS = 3000
+
+# Define structured output for Resume Question Generation
+class ResumeQuestion(BaseModel):
+    text: str = Field(description="The technical interview question text")
+    ideal_answer: str = Field(description="A concise ideal answer or key points expected")
+
+class ResumeQuestionSet(BaseModel):
+    questions: List[ResumeQuestion] = Field(description="Distinct questions, each about a different project or skill")
+
+RESUME_QUESTIONS_CHAIN = register_chain(
+    "brain.resume_questions",
+    "You are an expert technical interviewer.\n"
+    "Candidate's Resume Context: {resume_snippet}\n\n"
+    "Task: Generate {count} distinct hard technical interview questions, each based on a different project or skill mentioned in the resume.\n"
+    "For each question also provide a short 'Ideal Answer' for scoring purposes.\n"
+    "\n{format_instructions}",
+    parser=json_parser(ResumeQuestionSet),
+    temperature=0.3
+)
+
+
+def resume_key(resume_text: str, count: int) -> str:
+    """Content hash of the part of the resume the prompt actually sees."""
+    snippet = (resume_text or "")[:RESUME_SNIPPET_CHARS]
+    return hashlib.sha256(f"{count}\x00{snippet}".encode("utf-8")).hexdigest()
+
+
+class ResumeQuestionPrefetcher:
+    """
+    Generates all resume questions for a candidate in the background, as soon as
+    the resume is known (registration or session open), in one LLM call.
+
+    Results are kept by resume content hash, so a retake with the same resume reuses
+    them. Interview turns only wait if generation is still in flight.
+    """
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, concurrent.futures.Future]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"generated": 0, "reused": 0, "failed": 0, "waited": 0, "wait_seconds": 0.0}
+
+    def prefetch(self, resume_text: str, count: int = MAX_RESUME_QUESTIONS) -> concurrent.futures.Future:
+        """Starts generation (if not already started/cached) and returns its future."""
+        return self._future(resume_text, count, count_reuse=True)
+
+    def _future(self, resume_text: str, count: int, count_reuse: bool) -> concurrent.futures.Future:
+        key = resume_key(resume_text, count)
+        with self._lock:
+            future = self._entries.get(key)
+            if future is not None:
+                self._entries.move_to_end(key)
+                if count_reuse:
+                    self._stats["reused"] += 1
+                return future
+
+            gateway = get_llm_gateway()
+            if not resume_text or not gateway.available:
+                future = concurrent.futures.Future()
+                future.set_result([])
+                return future
+
+            future = gateway.submit(self._generate(resume_text, count))
+            self._entries[key] = future
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        # Outside the lock: a generation that already finished runs the callback inline,
+        # and _on_done takes the lock itself
+        future.add_done_callback(lambda f, key=key: self._on_done(key, f))
+        return future
+
+    async def aget(self, resume_text: str, count: int = MAX_RESUME_QUESTIONS) -> List[Dict]:
+        """Returns the generated questions, awaiting only if generation is still running."""
+        future = self._future(resume_text, count, count_reuse=False)
+        if not future.done():
+            started = time.perf_counter()
+            await asyncio.wrap_future(future)
+            with self._lock:
+                self._stats["waited"] += 1
+                self._stats["wait_seconds"] += time.perf_counter() - started
+        return [dict(q) for q in future.result()]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries)}
+
+    async def _generate(self, resume_text: str, count: int) -> List[Dict]:
+        try:
+            result = await RESUME_QUESTIONS_CHAIN.ainvoke({
+                "resume_snippet": resume_text[:RESUME_SNIPPET_CHARS],
+                "count": count
+            })
+            questions = []
+            for i, q in enumerate((result or {}).get("questions", [])[:count]):
+                questions.append({
+                    "id": f"resume_{i + 1}",
+                    "text": q.get("text", "Tell me about your best project."),
+                    "ideal_answer": q.get("ideal_answer", "Candidate should describe challenges and solutions.")
+                })
+            return questions
+        except Exception as e:
+            print(f"Resume Question Gen Error: {e}")
+            return []
+
+    def _on_done(self, key: str, future: concurrent.futures.Future):
+        with self._lock:
+            if future.cancelled() or future.exception() is not None or not future.result():
+                # Do not pin a failed generation; the next session retries
+                self._stats["failed"] += 1
+                if self._entries.get(key) is future:
+                    del self._entries[key]
+            else:
+                self._stats["generated"] += 1
+
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+def get_resume_prefetcher() -> ResumeQuestionPrefetcher:
+    global _prefetcher
+    if _prefetcher is None:
+        with _prefetcher_lock:
+            if _prefetcher is None:
+                _prefetcher = ResumeQuestionPrefetcher()
+    return _prefetcher
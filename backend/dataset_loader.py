@@ -1,12 +1,13 @@
-import json
 import random
-import os
 from typing import Dict, List, Optional, Any
+from question_bank import get_question_bank
 
 class InterviewDatasetLoader:
     """
     Load and manage interview question datasets for different branches.
     Handles greeting questions and branch-specific technical questions.
+    Thin view over the shared, indexed QuestionBank: construction does not
+    re-read the file, and lookups use the bank's indexes.
     """
     
     def __init__(self, json_file_path: str = None):
@@ -17,30 +18,10 @@ class InterviewDatasetLoader:
             json_file_path: Path to the questions.json file.
                             If None, attempts to find it in the same directory.
         """
-        if json_file_path is None:
-            base_dir = os.path.dirname(os.path.abspath(__file__))
-            json_file_path = os.path.join(base_dir, "questions.json")
-            
-        self.file_path = json_file_path
-        self.data = self._load_json(json_file_path)
-        self.branches = list(self.data.get("branches", {}).keys())
-        self.common_questions = self.data.get("common", [])
-        
-    def _load_json(self, file_path: str) -> Dict:
-        """Load JSON dataset from file."""
-        try:
-            if not os.path.exists(file_path):
-                print(f"[DatasetLoader] Error: File '{file_path}' not found.")
-                return {"common": [], "branches": {}}
-                
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except json.JSONDecodeError as e:
-            print(f"[DatasetLoader] Error: Invalid JSON in '{file_path}': {e}")
-            return {"common": [], "branches": {}}
-        except Exception as e:
-            print(f"[DatasetLoader] Error loading file: {e}")
-            return {"common": [], "branches": {}}
+        self.bank = get_question_bank(json_file_path)
+        self.file_path = self.bank.source_path
+        self.branches = self.bank.get_all_branches()
+        self.common_questions = list(self.bank.common)
     
     def get_all_branches(self) -> List[str]:
         """Get list of all available branches."""
@@ -63,18 +44,12 @@ class InterviewDatasetLoader:
         Returns:
             List of questions for the branch
         """
-        if not self.data or "branches" not in self.data:
-            return []
-            
-        # Case-insensitive lookup attempt if exact match fails
-        if branch not in self.data["branches"]:
-            # Try upper case
-            if branch.upper() in self.data["branches"]:
-                return self.data["branches"][branch.upper()]
+        # Case-insensitive lookup is handled by the bank
+        if self.bank.resolve_branch(branch) is None:
             print(f"[DatasetLoader] Error: Branch '{branch}' not found. Available: {self.branches}")
             return []
             
-        return self.data["branches"][branch]
+        return list(self.bank.get_branch_questions(branch))
     
     def get_random_greeting_question(self, exclude_ids: List[str] = None) -> Optional[Dict]:
         """Get a random greeting question, optionally excluding specific IDs."""
@@ -104,35 +79,11 @@ class InterviewDatasetLoader:
 
     def get_question_by_id(self, question_id: str) -> Optional[Dict]:
         """Find a question by its unique ID (searches common and all branches)."""
-        # Check common
-        for q in self.common_questions:
-            if q['id'] == question_id:
-                return q
-        
-        # Check branches
-        if "branches" in self.data:
-            for branch_qs in self.data["branches"].values():
-                for q in branch_qs:
-                    if q['id'] == question_id:
-                        return q
-        return None
+        return self.bank.get_question_by_id(question_id)
 
     def get_dataset_stats(self) -> Dict[str, Any]:
         """Return statistics about the loaded dataset."""
-        stats = {
-            "total_greeting": len(self.common_questions),
-            "branches": {},
-            "total_technical": 0
-        }
-        
-        if "branches" in self.data:
-            for branch, qs in self.data["branches"].items():
-                count = len(qs)
-                stats["branches"][branch] = count
-                stats["total_technical"] += count
-                
-        stats["total_questions"] = stats["total_greeting"] + stats["total_technical"]
-        return stats
+        return self.bank.get_stats()
 
 # Example Usage
 if __name__ == "__main__":
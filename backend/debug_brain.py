@@ -22,7 +22,7 @@ def debug_brain_logic():
     
     try:
         agent = BrainAgent()
-        print(f"BrainAgent initialized. LLM present? {agent.llm is not None}")
+        print(f"BrainAgent initialized. LLM present? {agent.gateway.available}")
         
         # Simulate Flow
         # 1. Intro
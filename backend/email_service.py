@@ -5,46 +5,92 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-def send_email_with_report(to_email, candidate_name, pdf_path):
-    """
-    Sends the Interview Report PDF via email.
-    """
-    user = os.getenv("GMAIL_USER")
-    password = os.getenv("GMAIL_APP_PASSWORD")
+# Mail relay. Defaults to Gmail over SSL; point SMTP_HOST/SMTP_PORT at a local
+# relay (SMTP_SSL=0, optionally SMTP_STARTTLS=1) for other setups and tests.
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "465"))
+SMTP_SSL = os.getenv("SMTP_SSL", "1").lower() not in ("0", "false", "no", "off")
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "0").lower() in ("1", "true", "yes", "on")
+SMTP_TIMEOUT_S = float(os.getenv("SMTP_TIMEOUT_S", "30"))
 
-    if not user or not password:
-        logger.warning("GMAIL_USER or GMAIL_APP_PASSWORD not set. Skipping email.")
-        print(f"Mock Email Sent to {to_email} with attachment {pdf_path}")
-        return
 
+class PermanentEmailError(Exception):
+    """The relay rejected the message for good (bad credentials, refused recipient); do not retry."""
+
+
+def smtp_credentials():
+    user = os.getenv("SMTP_USER") or os.getenv("GMAIL_USER")
+    password = os.getenv("SMTP_PASSWORD") or os.getenv("GMAIL_APP_PASSWORD")
+    return user, password
+
+
+def build_report_email(to_email, candidate_name, pdf_bytes, file_name, sender):
     msg = EmailMessage()
     msg['Subject'] = f'Interview Report - {candidate_name}'
-    msg['From'] = user
+    msg['From'] = sender
     msg['To'] = to_email
     msg.set_content(f"""
     Hello {candidate_name},
 
     Thank you for completing the AI Interview.
-    
+
     Please find your detailed performance report attached.
 
     Best regards,
     AI Interviewer Team
     """)
+    msg.add_attachment(pdf_bytes, maintype='application', subtype='pdf', filename=file_name)
+    return msg
+
 
+def deliver_report(to_email, candidate_name, pdf_path, host=None, port=None, use_ssl=None):
+    """
+    Sends the report PDF and raises on failure (used by the job queue, which retries).
+    Returns False if sending is not configured (no credentials and the default relay).
+    Raises PermanentEmailError for rejections that a retry cannot fix; any other
+    smtplib/socket error is transient.
+    """
+    host = host or SMTP_HOST
+    port = port or SMTP_PORT
+    use_ssl = SMTP_SSL if use_ssl is None else use_ssl
+    user, password = smtp_credentials()
+    if (not user or not password) and host == "smtp.gmail.com":
+        logger.warning("SMTP credentials not set. Skipping email.")
+        print(f"Mock Email Sent to {to_email} with attachment {pdf_path}")
+        return False
+
+    with open(pdf_path, 'rb') as f:
+        file_data = f.read()
+    msg = build_report_email(to_email, candidate_name, file_data, os.path.basename(pdf_path),
+                             user or f"noreply@{host}")
+
+    smtp_class = smtplib.SMTP_SSL if use_ssl else smtplib.SMTP
     try:
-        with open(pdf_path, 'rb') as f:
-            file_data = f.read()
-            file_name = os.path.basename(pdf_path)
-        
-        msg.add_attachment(file_data, maintype='application', subtype='pdf', filename=file_name)
-
-        with smtplib.SMTP_SSL('smtp.gmail.com', 465) as smtp:
-            smtp.login(user, password)
+        with smtp_class(host, port, timeout=SMTP_TIMEOUT_S) as smtp:
+            if not use_ssl and SMTP_STARTTLS:
+                smtp.starttls()
+            if user and password:
+                smtp.login(user, password)
             smtp.send_message(msg)
-            
-        print(f"Email sent successfully to {to_email}")
-        
+    except (smtplib.SMTPAuthenticationError, smtplib.SMTPRecipientsRefused) as e:
+        raise PermanentEmailError(str(e)) from e
+    except smtplib.SMTPResponseException as e:
+        # 5xx is a permanent rejection; 4xx (e.g. 421/451 rate limiting) is worth retrying
+        if 500 <= e.smtp_code < 600:
+            raise PermanentEmailError(f"{e.smtp_code} {e.smtp_error!r}") from e
+        raise
+    return True
+
+
+def send_email_with_report(to_email, candidate_name, pdf_path):
+    """
+    Sends the Interview Report PDF via email.
+    """
+    try:
+        if deliver_report(to_email, candidate_name, pdf_path):
+            print(f"Email sent successfully to {to_email}")
+            return True
     except Exception as e:
         print(f"Failed to send email: {e}")
         logger.error(f"Email failed: {e}")
+    return False
@@ -0,0 +1,280 @@
+import os
+import time
+import random
+import asyncio
+import logging
+import smtplib
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "6"))
+# Retry n waits about JOB_BACKOFF_BASE_S * 2^(n-1) (with jitter), capped at JOB_BACKOFF_MAX_S
+JOB_BACKOFF_BASE_S = float(os.getenv("JOB_BACKOFF_BASE_S", "5"))
+JOB_BACKOFF_MAX_S = float(os.getenv("JOB_BACKOFF_MAX_S", "600"))
+# A job whose worker died is picked up again after this long
+JOB_LEASE_S = float(os.getenv("JOB_LEASE_S", "300"))
+JOB_POLL_S = float(os.getenv("JOB_POLL_S", "2"))
+
+# Upper bound on emails per minute; the queue slows down further when the relay pushes back
+EMAIL_RATE_PER_MINUTE = float(os.getenv("EMAIL_RATE_PER_MINUTE", "30"))
+
+REPORTS_DIR = os.getenv("REPORTS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "reports"))
+
+QUEUED = "queued"
+RUNNING = "running"
+RETRY = "retry"
+DONE = "done"
+FAILED = "failed"
+
+
+class PermanentJobError(Exception):
+    """Retrying will not help; the job is marked failed straight away."""
+
+
+def report_job_id(session_id: str) -> str:
+    """Idempotency key: one report job per interview session."""
+    return f"report:{session_id}"
+
+
+def backoff_seconds(attempt: int, base: float = JOB_BACKOFF_BASE_S, cap: float = JOB_BACKOFF_MAX_S) -> float:
+    """Exponential backoff with +-50% jitter, so failed jobs do not retry in lockstep."""
+    return min(cap, base * 2 ** max(0, attempt - 1)) * random.uniform(0.5, 1.5)
+
+
+def is_throttle(error: Exception) -> bool:
+    """Relay-side pressure (4xx replies, dropped connections) rather than a problem with the job."""
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError))
+
+
+class SendRateLimiter:
+    """
+    Spaces out emails to at most `per_minute`. One send holds the slot at a
+    time and the next may start 1/rate after it finished, so deliveries (not
+    just their start) are spaced out however many workers there are.
+    When the relay throttles, the rate halves (down to 1/16 of the maximum);
+    each accepted email adds back a tenth of the maximum.
+    """
+    def __init__(self, per_minute: float = EMAIL_RATE_PER_MINUTE):
+        self.max_rate = per_minute / 60.0 if per_minute > 0 else None
+        self.rate = self.max_rate
+        self._next_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    @asynccontextmanager
+    async def slot(self):
+        """Held for the duration of one send."""
+        if self.rate is None:
+            yield
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            wait = self._next_at - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                yield
+            finally:
+                self._next_at = time.monotonic() + 1.0 / self.rate
+
+    def slow_down(self):
+        if self.rate is not None:
+            self.rate = max(self.max_rate / 16, self.rate / 2)
+
+    def speed_up(self):
+        if self.rate is not None:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
+    @property
+    def per_minute(self) -> Optional[float]:
+        return round(self.rate * 60, 2) if self.rate is not None else None
+
+
+def render_report(job: Dict, reports_dir: str = REPORTS_DIR) -> str:
+    """Writes the session's PDF report (ReportLab, blocking); returns its path."""
+    from report_generator import generate_pdf_report
+    payload = job["payload"]
+    os.makedirs(reports_dir, exist_ok=True)
+    path = os.path.join(reports_dir, f"report_{job['session_id']}.pdf")
+    if not generate_pdf_report(payload.get("candidate") or {}, payload.get("session") or {}, path):
+        raise RuntimeError("PDF generation failed")
+    return path
+
+
+def send_report(job: Dict, report_path: str) -> bool:
+    """Emails the report (blocking SMTP); False if mail is not configured."""
+    from email_service import deliver_report, PermanentEmailError
+    candidate = job["payload"].get("candidate") or {}
+    try:
+        return deliver_report(candidate["email"], candidate.get("name", "Candidate"), report_path)
+    except PermanentEmailError as e:
+        raise PermanentJobError(str(e)) from e
+
+
+class JobQueue:
+    """
+    Persistent queue for post-interview work (PDF report, then email).
+
+    Jobs are stored through InterviewStore (MongoDB `jobs` collection, or in
+    memory without a database) under an idempotency key per session, so a
+    session is reported at most once. Workers are asyncio tasks that claim due
+    jobs with a lease; ReportLab and SMTP run on a small thread pool, off the
+    event loop. Each step is recorded on the job, so a retry after a failed
+    email does not render the PDF again and a sent email is never resent.
+    Failures retry with exponential backoff up to `max_attempts`; emails are
+    paced by a SendRateLimiter that backs off when the relay throttles.
+    """
+    def __init__(self, store, workers: int = JOB_WORKERS, max_attempts: int = JOB_MAX_ATTEMPTS,
+                 rate_limiter: SendRateLimiter = None, reports_dir: str = REPORTS_DIR,
+                 poll_seconds: float = JOB_POLL_S, lease_seconds: float = JOB_LEASE_S):
+        self.store = store
+        self.workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.rate_limiter = rate_limiter or SendRateLimiter()
+        self.reports_dir = reports_dir
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._tasks: List[asyncio.Task] = []
+        self._wake: Optional[asyncio.Event] = None
+        self._stats = {"enqueued": 0, "duplicates": 0, "completed": 0, "retried": 0, "failed": 0,
+                       "emails_sent": 0, "throttled": 0, "reports_rendered": 0}
+
+    async def start(self):
+        if self._tasks:
+            return
+        await self.store.ensure_job_indexes()
+        self._wake = asyncio.Event()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job_worker_")
+        self._tasks = [asyncio.create_task(self._worker(f"worker-{os.getpid()}-{i}")) for i in range(self.workers)]
+        logger.info(f"📨 Job queue started ({self.workers} workers)")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def enqueue_report(self, session_data: Dict, candidate: Dict) -> Dict:
+        """Queues report + email for a saved session; a second call for the same session returns the first job."""
+        now = time.time()
+        job = {
+            "_id": report_job_id(session_data["session_id"]),
+            "kind": "report",
+            "session_id": session_data["session_id"],
+            "candidate_id": session_data.get("candidate_id"),
+            "status": QUEUED,
+            "attempts": 0,
+            "max_attempts": self.max_attempts,
+            "next_attempt_at": now,
+            "created_at": now,
+            "updated_at": now,
+            "steps": {},
+            "last_error": None,
+            "payload": {
+                "candidate": {k: candidate.get(k) for k in ("name", "email", "branch") if candidate.get(k)},
+                "session": session_data,
+            },
+        }
+        stored, inserted = await self.store.insert_job(job)
+        self._stats["enqueued" if inserted else "duplicates"] += 1
+        if self._wake is not None:
+            self._wake.set()
+        return public_job(stored)
+
+    async def get_jobs(self, session_id: str) -> List[Dict]:
+        return [public_job(job) for job in await self.store.get_jobs(session_id)]
+
+    async def status_counts(self) -> Dict:
+        return await self.store.count_jobs()
+
+    def stats(self) -> Dict:
+        return {**self._stats, "workers": len(self._tasks), "email_rate_per_minute": self.rate_limiter.per_minute}
+
+    async def _worker(self, name: str):
+        while True:
+            try:
+                job = await self.store.claim_job(time.time(), name, self.lease_seconds)
+            except Exception as e:
+                logger.error(f"Job claim failed: {e}")
+                job = None
+            if job is None:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _run(self, job: Dict):
+        job_id = job["_id"]
+        steps = dict(job.get("steps") or {})
+        loop = asyncio.get_running_loop()
+        try:
+            report_path = steps.get("report_path")
+            if not report_path or not os.path.exists(report_path):
+                report_path = await loop.run_in_executor(self._executor, render_report, job, self.reports_dir)
+                steps["report_path"] = report_path
+                self._stats["reports_rendered"] += 1
+                await self.store.update_job(job_id, {"steps": steps, "updated_at": time.time()})
+
+            if "email" not in steps:
+                if not (job["payload"].get("candidate") or {}).get("email"):
+                    steps["email"] = "skipped: no address"
+                else:
+                    async with self.rate_limiter.slot():
+                        sent = await loop.run_in_executor(self._executor, send_report, job, report_path)
+                    self.rate_limiter.speed_up()
+                    steps["email"] = "sent" if sent else "skipped: mail not configured"
+                    steps["emailed_at"] = time.time()
+                    if sent:
+                        self._stats["emails_sent"] += 1
+
+            await self.store.update_job(job_id, {"status": DONE, "steps": steps, "last_error": None,
+                                                 "lease_until": None, "updated_at": time.time()})
+            self._stats["completed"] += 1
+            logger.info(f"Job {job_id} done ({steps.get('email')})")
+        except Exception as e:
+            await self._fail(job, steps, e)
+
+    async def _fail(self, job: Dict, steps: Dict, error: Exception):
+        job_id = job["_id"]
+        attempts = job.get("attempts", 1)
+        if is_throttle(error):
+            self._stats["throttled"] += 1
+            self.rate_limiter.slow_down()
+        fields = {"steps": steps, "last_error": f"{type(error).__name__}: {error}",
+                  "lease_until": None, "updated_at": time.time()}
+        if isinstance(error, PermanentJobError) or attempts >= job.get("max_attempts", self.max_attempts):
+            fields["status"] = FAILED
+            self._stats["failed"] += 1
+            logger.error(f"Job {job_id} failed after {attempts} attempt(s): {error}")
+        else:
+            delay = backoff_seconds(attempts)
+            fields["status"] = RETRY
+            fields["next_attempt_at"] = time.time() + delay
+            self._stats["retried"] += 1
+            logger.warning(f"Job {job_id} attempt {attempts} failed ({error}); retrying in {delay:.1f}s")
+        try:
+            await self.store.update_job(job_id, fields)
+        except Exception as e:
+            logger.error(f"Could not record failure of job {job_id}: {e}")
+
+
+def public_job(job: Dict) -> Dict:
+    """Job document for the status endpoint (no payload)."""
+    keys = ("_id", "kind", "session_id", "status", "attempts", "max_attempts", "next_attempt_at",
+            "created_at", "updated_at", "steps", "last_error")
+    view = {k: job.get(k) for k in keys}
+    view["job_id"] = view.pop("_id")
+    return view
@@ -0,0 +1,248 @@
+import os
+import time
+import logging
+import threading
+import concurrent.futures
+from typing import Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Output order of DeepFace's emotion model
+EMOTION_LABELS = ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
+
+# The model takes 48x48 grayscale faces scaled to 0..1
+INPUT_SIZE = 48
+
+EMOTION_MAX_BATCH = int(os.getenv("EMOTION_MAX_BATCH", "16"))
+EMOTION_MAX_WAIT_MS = float(os.getenv("EMOTION_MAX_WAIT_MS", "15"))
+
+# Written by `python -m non_verbal_agent.export_onnx`
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+EMOTION_ONNX_PATH = os.getenv("EMOTION_ONNX_PATH", os.path.join(MODELS_DIR, "emotion_int8.onnx"))
+
+# After the model fails to load, requests fail at once for this long before loading is retried
+EMOTION_LOAD_RETRY_S = float(os.getenv("EMOTION_LOAD_RETRY_S", "60"))
+
+# onnxruntime intra-op threads; batches are small, more threads mostly add contention
+EMOTION_ORT_THREADS = int(os.getenv("EMOTION_ORT_THREADS", "1"))
+
+
+def preprocess_face(face: np.ndarray) -> np.ndarray:
+    """
+    BGR or gray face crop -> (48, 48, 1) float32 in 0..1, matching DeepFace:
+    letterboxed to a square with black bars, converted to gray, resized.
+    Crops that are already 48x48 gray are only rescaled.
+    """
+    if face.ndim == 3:
+        face = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
+    h, w = face.shape[:2]
+    if (h, w) != (INPUT_SIZE, INPUT_SIZE):
+        side = max(h, w)
+        if h != w:
+            top, left = (side - h) // 2, (side - w) // 2
+            face = cv2.copyMakeBorder(face, top, side - h - top, left, side - w - left, cv2.BORDER_CONSTANT, value=0)
+        face = cv2.resize(face, (INPUT_SIZE, INPUT_SIZE))
+    if face.dtype == np.uint8:
+        return (face.astype(np.float32) / 255.0)[:, :, None]
+    return face.astype(np.float32)[:, :, None]
+
+
+def to_emotions(probabilities: np.ndarray) -> Dict[str, float]:
+    """Model output row -> {label: probability (0..1)}, renormalised like DeepFace."""
+    total = float(probabilities.sum()) or 1.0
+    return {label: float(p) / total for label, p in zip(EMOTION_LABELS, probabilities)}
+
+
+def load_keras_emotion_model():
+    """DeepFace's Keras emotion CNN; returns predict(batch (n,48,48,1)) -> (n,7)."""
+    from deepface import DeepFace
+    try:
+        client = DeepFace.build_model(task="facial_attribute", model_name="Emotion")
+    except TypeError:
+        client = DeepFace.build_model("Emotion")  # deepface < 0.0.93
+    model = getattr(client, "model", client)
+
+    def predict(batch: np.ndarray) -> np.ndarray:
+        if hasattr(model, "predict_on_batch"):
+            return np.asarray(model.predict_on_batch(batch))
+        return np.asarray(model.predict(batch, verbose=0))
+    return predict
+
+
+def load_onnx_emotion_model(path: str = None, threads: int = EMOTION_ORT_THREADS):
+    """
+    Exported emotion model on onnxruntime (no TensorFlow import);
+    returns predict(batch (n,48,48,1)) -> (n,7).
+    """
+    import onnxruntime as ort
+    path = path or EMOTION_ONNX_PATH
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Emotion ONNX model not found at {path}; run python -m non_verbal_agent.export_onnx")
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = max(1, threads)
+    options.inter_op_num_threads = 1
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    session = ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+    input_name = session.get_inputs()[0].name
+
+    def predict(batch: np.ndarray) -> np.ndarray:
+        return session.run(None, {input_name: np.ascontiguousarray(batch, dtype=np.float32)})[0]
+    return predict
+
+
+# Model name -> loader, selected with get_emotion_service(model)
+EMOTION_MODELS = {
+    "keras": load_keras_emotion_model,
+    "onnx": load_onnx_emotion_model,
+}
+
+
+class EmotionService:
+    """
+    Central emotion inference for all live sessions.
+
+    Face crops are queued with `submit()`; a worker thread stacks up to
+    `max_batch` of them (waiting at most `max_wait_ms` for the batch to fill)
+    and runs the emotion model once on the (n, 48, 48, 1) tensor. The model is
+    loaded on the worker thread on first use; if that fails, requests fail
+    immediately with the load error until `load_retry_s` has passed.
+    """
+    def __init__(self, model_loader: Callable[[], Callable] = load_keras_emotion_model,
+                 max_batch: int = EMOTION_MAX_BATCH, max_wait_ms: float = EMOTION_MAX_WAIT_MS,
+                 load_retry_s: float = EMOTION_LOAD_RETRY_S):
+        self.model_loader = model_loader
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000
+        self.load_retry_s = load_retry_s
+        self._predict: Optional[Callable] = None
+        self._load_error: Optional[Exception] = None
+        self._retry_load_at = 0.0
+        self._pending: List = []  # (tensor, future, enqueued_at)
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {"requests": 0, "batches": 0, "failed": 0, "rejected": 0, "load_failures": 0, "max_batch_size": 0,
+                       "wait_seconds": 0.0, "inference_seconds": 0.0}
+
+    def submit(self, face: np.ndarray) -> concurrent.futures.Future:
+        """Queues one face crop; the future resolves to {label: probability}."""
+        tensor = preprocess_face(face)
+        future = concurrent.futures.Future()
+        with self._cond:
+            error = self._recent_load_error()
+            if error is not None:
+                # Not queued, so kept out of the batch averages
+                self._stats["rejected"] += 1
+                future.set_exception(error)
+                return future
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, name="emotion_service", daemon=True)
+                self._thread.start()
+            self._pending.append((tensor, future, time.perf_counter()))
+            self._stats["requests"] += 1
+            self._cond.notify()
+        return future
+
+    def predict(self, face: np.ndarray, timeout: float = 30) -> Dict[str, float]:
+        """Blocking `submit`; on the event loop, await `asyncio.wrap_future(submit(face))` instead."""
+        return self.submit(face).result(timeout=timeout)
+
+    def stats(self) -> Dict:
+        with self._cond:
+            stats = dict(self._stats)
+            batches = stats["batches"]
+            requests = stats["requests"]
+            stats["avg_batch_size"] = round(requests / batches, 2) if batches else 0.0
+            stats["avg_wait_ms"] = round(1000 * stats.pop("wait_seconds") / requests, 2) if requests else 0.0
+            stats["avg_inference_ms"] = round(1000 * stats.pop("inference_seconds") / batches, 2) if batches else 0.0
+            stats["queued"] = len(self._pending)
+            stats["model_loaded"] = self._predict is not None
+            stats["load_error"] = str(self._load_error) if self._load_error is not None else None
+            return stats
+
+    def _recent_load_error(self) -> Optional[Exception]:
+        """The model's load error while loading is backed off, else None."""
+        if self._load_error is not None and time.perf_counter() < self._retry_load_at:
+            return self._load_error
+        return None
+
+    def _load(self):
+        with self._cond:
+            error = self._recent_load_error()
+        if error is not None:
+            raise error
+        try:
+            predict = self.model_loader()
+        except Exception as e:
+            with self._cond:
+                self._load_error = e
+                self._retry_load_at = time.perf_counter() + self.load_retry_s
+                self._stats["load_failures"] += 1
+            logger.error(f"Emotion model failed to load (retrying in {self.load_retry_s:g}s): {e}")
+            raise
+        with self._cond:
+            self._load_error = None
+        return predict
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            deadline = self._pending[0][2] + self.max_wait
+            while len(self._pending) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            return batch
+
+    def _worker(self):
+        while True:
+            batch = self._next_batch()
+            started = time.perf_counter()
+            try:
+                if self._predict is None:
+                    self._predict = self._load()
+                probabilities = self._predict(np.stack([tensor for tensor, _, _ in batch]))
+                for (_, future, _), row in zip(batch, probabilities):
+                    future.set_result(to_emotions(np.asarray(row)))
+                failed = 0
+            except Exception as e:
+                logger.error(f"Emotion batch failed: {e}")
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                failed = len(batch)
+
+            with self._cond:
+                self._stats["batches"] += 1
+                self._stats["failed"] += failed
+                self._stats["max_batch_size"] = max(self._stats["max_batch_size"], len(batch))
+                self._stats["wait_seconds"] += sum(started - enqueued for _, _, enqueued in batch)
+                self._stats["inference_seconds"] += time.perf_counter() - started
+
+
+_emotion_services: Dict[str, EmotionService] = {}
+_emotion_service_lock = threading.Lock()
+
+
+def get_emotion_service(model: str = "keras") -> EmotionService:
+    """Shared service for one emotion model ("keras" or "onnx")."""
+    service = _emotion_services.get(model)
+    if service is None:
+        with _emotion_service_lock:
+            service = _emotion_services.get(model)
+            if service is None:
+                if model not in EMOTION_MODELS:
+                    raise ValueError(f"Unknown emotion model: {model} (expected one of {tuple(EMOTION_MODELS)})")
+                service = _emotion_services[model] = EmotionService(EMOTION_MODELS[model])
+    return service
+
+
+def emotion_service_stats() -> Optional[Dict]:
+    """Stats per model of the shared services, or None if no session has used them."""
+    if not _emotion_services:
+        return None
+    return {model: service.stats() for model, service in list(_emotion_services.items())}
@@ -0,0 +1,241 @@
+"""
+Exports DeepFace's emotion CNN to ONNX, quantises it to int8 and checks that
+the int8 model agrees with the original on a held-out set of frames.
+
+Run from backend/ (export needs tf-keras, tf2onnx and onnx; serving only needs onnxruntime):
+    python -m non_verbal_agent.export_onnx --frames path/to/frames
+    python -m non_verbal_agent.export_onnx --frames path/to/frames --fp32 existing_fp32.onnx
+    python -m non_verbal_agent.export_onnx --frames path/to/frames --check-only
+
+`--frames` is a directory of webcam frames (jpg/png). Faces are cropped the
+same way as in serving; part of them calibrates the int8 activation ranges,
+the held-out rest is only used for the parity check. The int8 model is
+written to EMOTION_ONNX_PATH only if the check passes; serve it with
+NONVERBAL_BACKEND=onnx.
+"""
+import os
+import sys
+import time
+import argparse
+
+import cv2
+import numpy as np
+
+# Allow `python non_verbal_agent/export_onnx.py` as well as `python -m non_verbal_agent.export_onnx`
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from non_verbal_agent.emotion_service import (
+    EMOTION_LABELS, EMOTION_ONNX_PATH, INPUT_SIZE, preprocess_face,
+    load_keras_emotion_model, load_onnx_emotion_model,
+)
+from non_verbal_agent.frame_gate import get_face_cascade, locate_face
+from non_verbal_agent.frame_preprocessor import face_tensor
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def load_faces(frames_dir: str, limit: int = None) -> np.ndarray:
+    """
+    Face tensors (n, 48, 48, 1) from the frames in a directory; frames without a face are dropped.
+    Raises RuntimeError without a face detector: calibrating on whole frames would skew the int8 scales.
+    """
+    if get_face_cascade() is None:
+        raise RuntimeError("No face detector available (OpenCV CascadeClassifier and FACE_CASCADE_PATH); "
+                           "cannot crop faces for calibration")
+    names = sorted(n for n in os.listdir(frames_dir) if n.lower().endswith(IMAGE_EXTENSIONS))
+    faces = []
+    for name in names[:limit]:
+        frame = cv2.imread(os.path.join(frames_dir, name))
+        if frame is None:
+            continue
+        box = locate_face(frame)
+        if box is None:
+            continue
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        faces.append(preprocess_face(face_tensor(gray, box)))
+    if not faces:
+        return np.zeros((0, INPUT_SIZE, INPUT_SIZE, 1), dtype=np.float32)
+    return np.stack(faces)
+
+
+def split_holdout(faces: np.ndarray, fraction: float, seed: int = 0):
+    """(calibration, held_out) split with a fixed seed, so reruns check the same frames."""
+    order = np.random.default_rng(seed).permutation(len(faces))
+    n_held = max(1, int(round(len(faces) * fraction)))
+    return faces[order[n_held:]], faces[order[:n_held]]
+
+
+def export_keras(path: str, opset: int = 13) -> str:
+    """Converts the Keras emotion model to a float32 ONNX graph with a dynamic batch axis."""
+    import tensorflow as tf
+    import tf2onnx
+    from deepface import DeepFace
+    try:
+        client = DeepFace.build_model(task="facial_attribute", model_name="Emotion")
+    except TypeError:
+        client = DeepFace.build_model("Emotion")  # deepface < 0.0.93
+    model = getattr(client, "model", client)
+    spec = [tf.TensorSpec((None, INPUT_SIZE, INPUT_SIZE, 1), tf.float32, name="input")]
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tf2onnx.convert.from_keras(model, input_signature=spec, opset=opset, output_path=path)
+    return path
+
+
+def quantize(fp32_path: str, int8_path: str, calibration: np.ndarray, per_channel: bool = True) -> str:
+    """
+    Static int8 quantisation (QDQ format): int8 weights, uint8 activations with
+    ranges calibrated on `calibration`. Only Conv/MatMul/Gemm are quantised;
+    pooling, activations and the softmax stay in float.
+    """
+    from onnxruntime.quantization import (
+        CalibrationDataReader, QuantFormat, QuantType, quantize_static,
+    )
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+    import onnxruntime as ort
+
+    # ONNX shape inference + graph folding first, as recommended for static quantisation
+    # (the graph has static shapes apart from the batch axis, so no symbolic pass)
+    prepared_path = int8_path + ".prep.onnx"
+    quant_pre_process(fp32_path, prepared_path, skip_symbolic_shape=True)
+    input_name = ort.InferenceSession(prepared_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+
+    class FaceReader(CalibrationDataReader):
+        def __init__(self):
+            self._batches = iter(calibration[i:i + 1] for i in range(len(calibration)))
+
+        def get_next(self):
+            batch = next(self._batches, None)
+            return None if batch is None else {input_name: batch}
+
+    try:
+        quantize_static(
+            prepared_path, int8_path, FaceReader(),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=per_channel,
+            op_types_to_quantize=["Conv", "MatMul", "Gemm"],
+        )
+    finally:
+        os.remove(prepared_path)
+    return int8_path
+
+
+def run_batched(predict, faces: np.ndarray, batch_size: int = 16) -> np.ndarray:
+    outputs = [np.asarray(predict(faces[i:i + batch_size]), dtype=np.float32)
+               for i in range(0, len(faces), batch_size)]
+    return np.concatenate(outputs) if outputs else np.zeros((0, len(EMOTION_LABELS)), dtype=np.float32)
+
+
+def compare(reference: np.ndarray, candidate: np.ndarray) -> dict:
+    """Top-1 agreement and probability error of `candidate` against `reference` (both (n, 7))."""
+    diff = np.abs(reference - candidate)
+    return {
+        "frames": len(reference),
+        "top1_agreement": float(np.mean(reference.argmax(axis=1) == candidate.argmax(axis=1))),
+        "max_prob_diff": float(diff.max()) if diff.size else 0.0,
+        "mean_prob_diff": float(diff.mean()) if diff.size else 0.0,
+    }
+
+
+def benchmark(predict, faces: np.ndarray, repeats: int = 3) -> dict:
+    """Milliseconds per face at batch size 1 and 16 (best of `repeats`)."""
+    timings = {}
+    for batch_size in (1, 16):
+        best = float("inf")
+        for _ in range(repeats):
+            started = time.perf_counter()
+            run_batched(predict, faces, batch_size)
+            best = min(best, time.perf_counter() - started)
+        timings[f"batch_{batch_size}_ms"] = round(1000 * best / max(1, len(faces)), 3)
+    return timings
+
+
+def _print_check(name: str, result: dict):
+    print(f"  {name}: top-1 agreement {result['top1_agreement']:.1%}, "
+          f"prob diff max {result['max_prob_diff']:.4f} / mean {result['mean_prob_diff']:.4f} "
+          f"on {result['frames']} frames")
+
+
+def main(argv=None):
+    default_fp32 = os.path.join(os.path.dirname(EMOTION_ONNX_PATH), "emotion_fp32.onnx")
+    parser = argparse.ArgumentParser(description="Export the emotion model to int8 ONNX and check parity.")
+    parser.add_argument("--frames", required=True, help="Directory of frames (jpg/png) for calibration and parity")
+    parser.add_argument("--out", default=EMOTION_ONNX_PATH, help="int8 model path (default: EMOTION_ONNX_PATH)")
+    parser.add_argument("--fp32", default=None,
+                        help=f"Use this float32 ONNX model instead of exporting from Keras (export target: {default_fp32})")
+    parser.add_argument("--reference", choices=("auto", "keras", "fp32"), default="auto",
+                        help="Model the int8 output is checked against (auto: keras if TensorFlow is installed)")
+    parser.add_argument("--holdout", type=float, default=0.3, help="Fraction of faces kept out of calibration")
+    parser.add_argument("--limit", type=int, default=None, help="Use at most this many frames")
+    parser.add_argument("--min-agreement", type=float, default=0.95, help="Required top-1 agreement")
+    parser.add_argument("--max-prob-diff", type=float, default=0.15, help="Allowed max probability difference")
+    parser.add_argument("--opset", type=int, default=13)
+    parser.add_argument("--no-per-channel", action="store_true", help="Per-tensor weight scales")
+    parser.add_argument("--check-only", action="store_true", help="Only check an existing --out model")
+    args = parser.parse_args(argv)
+
+    try:
+        faces = load_faces(args.frames, args.limit)
+    except RuntimeError as e:
+        print(e)
+        return 1
+    if len(faces) < 2:
+        print(f"Need at least 2 frames with a face in {args.frames}, found {len(faces)}")
+        return 1
+    calibration, held_out = split_holdout(faces, args.holdout)
+    print(f"Faces: {len(faces)} ({len(calibration)} calibration, {len(held_out)} held out)")
+
+    fp32_path = args.fp32 or default_fp32
+    if not args.check_only and not args.fp32:
+        started = time.perf_counter()
+        export_keras(fp32_path, args.opset)
+        print(f"Exported {fp32_path} in {time.perf_counter() - started:.1f}s")
+
+    reference_name = args.reference
+    if reference_name == "auto":
+        try:
+            import tensorflow  # noqa: F401
+            reference_name = "keras"
+        except ImportError:
+            reference_name = "fp32"
+    reference_predict = load_keras_emotion_model() if reference_name == "keras" else load_onnx_emotion_model(fp32_path)
+
+    if args.check_only:
+        int8_path = args.out
+    else:
+        int8_path = args.out + ".tmp"
+        started = time.perf_counter()
+        quantize(fp32_path, int8_path, calibration, per_channel=not args.no_per_channel)
+        print(f"Quantised to int8 in {time.perf_counter() - started:.1f}s")
+    int8_predict = load_onnx_emotion_model(int8_path)
+
+    print(f"Parity on held-out faces (reference: {reference_name}):")
+    reference = run_batched(reference_predict, held_out)
+    if reference_name == "keras" and os.path.exists(fp32_path):
+        _print_check("fp32", compare(reference, run_batched(load_onnx_emotion_model(fp32_path), held_out)))
+    result = compare(reference, run_batched(int8_predict, held_out))
+    _print_check("int8", result)
+
+    print("Latency per face (ms):")
+    print(f"  {reference_name}: {benchmark(reference_predict, held_out)}")
+    print(f"  int8: {benchmark(int8_predict, held_out)}")
+    if os.path.exists(fp32_path):
+        print(f"Size: fp32 {os.path.getsize(fp32_path) / 1e6:.1f} MB, int8 {os.path.getsize(int8_path) / 1e6:.1f} MB")
+
+    passed = result["top1_agreement"] >= args.min_agreement and result["max_prob_diff"] <= args.max_prob_diff
+    if args.check_only:
+        print("Parity OK" if passed else "Parity FAILED")
+        return 0 if passed else 1
+    if not passed:
+        os.replace(int8_path, args.out + ".rejected")
+        print(f"Parity FAILED (need {args.min_agreement:.0%} agreement, max diff {args.max_prob_diff}); "
+              f"kept {args.out}.rejected for inspection")
+        return 1
+    os.replace(int8_path, args.out)
+    print(f"Parity OK, wrote {args.out} (serve with NONVERBAL_BACKEND=onnx)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+import os
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Face detection runs on a copy downscaled to this width
+DETECT_WIDTH = int(os.getenv("FRAME_GATE_DETECT_WIDTH", "320"))
+
+# dHash Hamming distance (of 64 bits) at or below which a face crop counts as unchanged
+HASH_DISTANCE = int(os.getenv("FRAME_GATE_HASH_DISTANCE", "6"))
+
+# Mean absolute difference (gray levels) of 16x16 thumbnails above which a crop changed.
+# dHash ignores overall brightness, this catches lighting changes and blank frames.
+MAX_PIXEL_DIFF = float(os.getenv("FRAME_GATE_PIXEL_DIFF", "12"))
+
+# Re-run inference after this many reused frames even if nothing changed
+MAX_REUSE = int(os.getenv("FRAME_GATE_MAX_REUSE", "15"))
+
+# A face box moving more than this fraction of its width counts as a change
+MAX_SHIFT = 0.15
+
+# opencv-python 5 no longer ships the Haar cascades (or CascadeClassifier);
+# point this at the XML if the installed build lacks it
+FACE_CASCADE_PATH = os.getenv("FACE_CASCADE_PATH", "")
+
+ANALYZE = "analyze"
+REUSE = "reuse"
+NO_FACE = "no_face"
+
+_cascade = None
+_cascade_loaded = False
+_cascade_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_stats = {"frames": 0, ANALYZE: 0, REUSE: 0, NO_FACE: 0}
+
+
+def _cascade_path() -> str:
+    if FACE_CASCADE_PATH:
+        return FACE_CASCADE_PATH
+    data_dir = getattr(getattr(cv2, "data", None), "haarcascades", "")
+    return os.path.join(data_dir, "haarcascade_frontalface_default.xml")
+
+
+def get_face_cascade():
+    """Frontal-face Haar cascade, or None if OpenCV or the model file lacks it."""
+    global _cascade, _cascade_loaded
+    if not _cascade_loaded:
+        with _cascade_lock:
+            if not _cascade_loaded:
+                path = _cascade_path()
+                cascade = None
+                if hasattr(cv2, "CascadeClassifier") and os.path.exists(path):
+                    cascade = cv2.CascadeClassifier(path)
+                if cascade is None or cascade.empty():
+                    logger.warning(f"Face cascade not found at {path}; frame gate will only check for changes")
+                    cascade = None
+                _cascade = cascade
+                _cascade_loaded = True
+    return _cascade
+
+
+def dhash(gray: np.ndarray, size: int = 8) -> int:
+    """64-bit difference hash: sign of horizontal gradients on a (size x size+1) thumbnail."""
+    thumb = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    bits = (thumb[:, 1:] > thumb[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def detect_face(gray_small: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+    """Largest face (x, y, w, h) in the downscaled gray frame; None if none (or no cascade)."""
+    cascade = get_face_cascade()
+    if cascade is None:
+        return None
+    min_side = max(24, gray_small.shape[1] // 10)
+    faces = cascade.detectMultiScale(gray_small, scaleFactor=1.2, minNeighbors=5, minSize=(min_side, min_side))
+    if len(faces) == 0:
+        return None
+    x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+    return int(x), int(y), int(w), int(h)
+
+
+def locate_face(frame: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+    """Largest face box in full-resolution coordinates (detected on a downscaled copy)."""
+    gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    scale = min(1.0, DETECT_WIDTH / gray.shape[1])
+    small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1.0 else gray
+    box = detect_face(small)
+    return _scale_box(box, scale) if box is not None else None
+
+
+def _scale_box(box, scale: float):
+    return tuple(int(round(v / scale)) for v in box)
+
+
+def frame_gate_stats() -> Dict:
+    """Process-wide gate decisions across all sessions."""
+    with _stats_lock:
+        stats = dict(_stats)
+    frames = stats["frames"]
+    stats["skipped"] = stats[REUSE] + stats[NO_FACE]
+    stats["skipped_ratio"] = round(stats["skipped"] / frames, 3) if frames else 0.0
+    stats["face_detector"] = get_face_cascade() is not None if _cascade_loaded else None
+    return stats
+
+
+class FrameGate:
+    """
+    Per-session gate in front of emotion inference.
+
+    For each frame:
+      - NO_FACE: the cascade found no face on a downscaled copy -> skip inference.
+      - REUSE:   the face crop's dHash is within HASH_DISTANCE of the last
+                 analysed crop, its brightness is about the same and the face
+                 has not moved -> reuse that result.
+      - ANALYZE: otherwise (and at least every MAX_REUSE frames).
+    Without a cascade every frame counts as having a face and only the change
+    check on the whole frame applies.
+    """
+    def __init__(self, hash_distance: int = HASH_DISTANCE, max_reuse: int = MAX_REUSE):
+        self.hash_distance = hash_distance
+        self.max_reuse = max_reuse
+        self.last_result: Optional[Dict] = None
+        self._last_hash: Optional[int] = None
+        self._last_thumb: Optional[np.ndarray] = None
+        self._last_box: Optional[Tuple[int, int, int, int]] = None
+        self._reused = 0
+        self._pending = None  # (hash, thumbnail, box) of the frame being analysed
+        # Face box of the last checked frame, full-resolution (None if no face / no detector)
+        self.face_box: Optional[Tuple[int, int, int, int]] = None
+        self.stats = {"frames": 0, ANALYZE: 0, REUSE: 0, NO_FACE: 0}
+
+    def check(self, frame: np.ndarray, prepared=None) -> str:
+        """
+        `prepared` (a FramePreprocessor result) supplies an already reduced gray
+        frame and face detection, so the gate does not detect again.
+        """
+        self.face_box = None
+        if prepared is not None and prepared.detected is not None:
+            if not prepared.detected:
+                return self._decide(NO_FACE)
+            x, y, w, h = box = prepared.face_box
+            crop = prepared.gray[y:y + h, x:x + w]
+            self.face_box = box
+            return self._compare(crop, box)
+
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        scale = min(1.0, DETECT_WIDTH / gray.shape[1])
+        small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1.0 else gray
+
+        if get_face_cascade() is not None:
+            box = detect_face(small)
+            if box is None:
+                return self._decide(NO_FACE)
+            x, y, w, h = box
+            crop = small[y:y + h, x:x + w]
+            self.face_box = _scale_box(box, scale)
+        else:
+            box, crop = None, small
+        return self._compare(crop, box)
+
+    def _compare(self, crop: np.ndarray, box) -> str:
+        crop_hash = dhash(crop)
+        thumb = cv2.resize(crop, (16, 16), interpolation=cv2.INTER_AREA).astype(np.float32)
+        self._pending = (crop_hash, thumb, box)
+        if (self.last_result is not None and self._reused < self.max_reuse
+                and hamming(crop_hash, self._last_hash) <= self.hash_distance
+                and float(np.mean(np.abs(thumb - self._last_thumb))) <= MAX_PIXEL_DIFF
+                and not self._moved(box)):
+            self._reused += 1
+            return self._decide(REUSE)
+        return self._decide(ANALYZE)
+
+    def remember(self, result: Dict):
+        """Stores the result of an ANALYZE frame for later reuse."""
+        if self._pending is None or not result.get('success'):
+            return
+        self._last_hash, self._last_thumb, self._last_box = self._pending
+        self.last_result = result
+        self._reused = 0
+
+    def reset(self):
+        self.last_result = None
+        self._last_hash = None
+        self._last_thumb = None
+        self._last_box = None
+        self._reused = 0
+
+    def summary(self) -> Dict:
+        stats = dict(self.stats)
+        stats["skipped"] = stats[REUSE] + stats[NO_FACE]
+        return stats
+
+    def _moved(self, box) -> bool:
+        if box is None or self._last_box is None:
+            return False
+        x, y, w, _ = box
+        last_x, last_y, last_w, _ = self._last_box
+        limit = MAX_SHIFT * max(w, last_w)
+        return abs(x - last_x) > limit or abs(y - last_y) > limit or abs(w - last_w) > limit
+
+    def _decide(self, decision: str) -> str:
+        self.stats["frames"] += 1
+        self.stats[decision] += 1
+        with _stats_lock:
+            _stats["frames"] += 1
+            _stats[decision] += 1
+        return decision
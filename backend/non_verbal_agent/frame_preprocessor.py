@@ -0,0 +1,148 @@
+import os
+import logging
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from non_verbal_agent.frame_gate import detect_face, get_face_cascade
+from non_verbal_agent.emotion_service import INPUT_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Decode at the largest JPEG reduction (1/2, 1/4, 1/8) that keeps at least this width
+MIN_DECODE_WIDTH = int(os.getenv("FRAME_MIN_DECODE_WIDTH", "320"))
+
+# The tracked box is grown by this fraction on each side to form the search ROI
+ROI_MARGIN = 0.5
+
+# Full-frame re-detection at least every N frames, even while tracking succeeds
+REDETECT_EVERY = int(os.getenv("FRAME_REDETECT_EVERY", "30"))
+
+_REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+class PreparedFrame:
+    """A decoded (possibly reduced) frame plus the face found in it."""
+    __slots__ = ("image", "gray", "scale", "face_box", "face", "detected", "tracked")
+
+    def __init__(self, image, gray, scale, face_box=None, face=None, detected=None, tracked=False):
+        self.image = image          # BGR at 1/scale of the sent resolution
+        self.gray = gray
+        self.scale = scale
+        self.face_box = face_box    # (x, y, w, h) in `image` coordinates
+        self.face = face            # (48, 48) uint8 gray crop for the emotion model
+        self.detected = detected    # True / False, or None without a face detector
+        self.tracked = tracked      # Found inside the previous frame's ROI
+
+    def face_crop(self, margin: float = 0.1) -> Optional[np.ndarray]:
+        """Colour face crop from `image` (with a small margin), or None."""
+        if self.face_box is None:
+            return None
+        return self.image[_expand(self.face_box, margin, self.image.shape)]
+
+
+def _expand(box, margin: float, shape) -> Tuple[slice, slice]:
+    x, y, w, h = box
+    dx, dy = int(w * margin), int(h * margin)
+    top, left = max(0, y - dy), max(0, x - dx)
+    bottom, right = min(shape[0], y + h + dy), min(shape[1], x + w + dx)
+    return slice(top, bottom), slice(left, right)
+
+
+def face_tensor(gray: np.ndarray, box) -> np.ndarray:
+    """Square crop around the box, resized to the emotion model's 48x48 input."""
+    x, y, w, h = box
+    side = max(w, h)
+    cx, cy = x + w // 2, y + h // 2
+    top, left = max(0, cy - side // 2), max(0, cx - side // 2)
+    crop = gray[top:top + side, left:left + side]
+    return cv2.resize(crop, (INPUT_SIZE, INPUT_SIZE), interpolation=cv2.INTER_AREA)
+
+
+class FramePreprocessor:
+    """
+    Per-session decode + face tracking for incoming JPEG frames.
+
+    - Decode: the first frame is decoded at 1/2 to learn the camera size; later
+      frames use the largest IMREAD_REDUCED_COLOR_* factor that keeps
+      MIN_DECODE_WIDTH, so libjpeg skips most of the IDCT work.
+    - Tracking: the face is searched in an ROI around the last box; the whole
+      frame is searched only when that fails or every REDETECT_EVERY frames.
+    - Output: the reduced BGR frame, its face box and a 48x48 gray face crop.
+    """
+    def __init__(self, min_width: int = MIN_DECODE_WIDTH):
+        self.min_width = min_width
+        self.scale = 2
+        self._box: Optional[Tuple[int, int, int, int]] = None
+        self._since_full = 0
+        self.stats = {"frames": 0, "tracked": 0, "full_detections": 0, "no_face": 0, "decode_failed": 0}
+
+    def decode(self, jpeg_bytes: bytes) -> Optional[np.ndarray]:
+        data = np.frombuffer(jpeg_bytes, dtype=np.uint8)
+        image = cv2.imdecode(data, _REDUCED_FLAGS[self.scale])
+        if image is None:
+            return None
+        self._pick_scale(image.shape[1] * self.scale)
+        return image
+
+    def prepare(self, jpeg_bytes: bytes) -> Optional[PreparedFrame]:
+        previous_scale = self.scale
+        image = self.decode(jpeg_bytes)
+        if image is None:
+            self.stats["decode_failed"] += 1
+            return None
+        self.stats["frames"] += 1
+        prepared = self.track(image, scale=previous_scale)
+        if self.scale != previous_scale:
+            self._box = None  # The next frame is decoded at another scale
+        return prepared
+
+    def track(self, image: np.ndarray, scale: int = 1) -> PreparedFrame:
+        """Finds the face in an already decoded frame."""
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        if get_face_cascade() is None:
+            return PreparedFrame(image, gray, scale, detected=None)
+
+        box, tracked = None, False
+        if self._box is not None and self._since_full < REDETECT_EVERY:
+            box = self._detect_in_roi(gray, self._box)
+            tracked = box is not None
+        if box is None:
+            box = detect_face(gray)
+            self._since_full = 0
+            self.stats["full_detections"] += 1
+        else:
+            self._since_full += 1
+            self.stats["tracked"] += 1
+
+        self._box = box
+        if box is None:
+            self.stats["no_face"] += 1
+            return PreparedFrame(image, gray, scale, detected=False)
+        return PreparedFrame(image, gray, scale, face_box=box, face=face_tensor(gray, box),
+                             detected=True, tracked=tracked)
+
+    def reset(self):
+        self._box = None
+        self._since_full = 0
+
+    def _detect_in_roi(self, gray: np.ndarray, box) -> Optional[Tuple[int, int, int, int]]:
+        rows, cols = _expand(box, ROI_MARGIN, gray.shape)
+        found = detect_face(gray[rows, cols])
+        if found is None:
+            return None
+        x, y, w, h = found
+        return x + cols.start, y + rows.start, w, h
+
+    def _pick_scale(self, full_width: int):
+        for factor in (8, 4, 2, 1):
+            if full_width // factor >= self.min_width:
+                self.scale = factor
+                return
+        self.scale = 1
@@ -1,12 +1,24 @@
+import os
+import asyncio
 import logging
 import numpy as np
 import cv2
 from typing import Dict
+from non_verbal_agent.frame_gate import FrameGate, NO_FACE, REUSE, get_face_cascade, locate_face
 
 logger = logging.getLogger(__name__)
 
+# "deepface": DeepFace.analyze per frame; "batched": face crops go to the shared
+# micro-batching EmotionService (non_verbal_agent/emotion_service.py);
+# "onnx": same service, running the exported int8 model on onnxruntime (no TensorFlow)
+NONVERBAL_BACKENDS = ("deepface", "batched", "onnx")
+DEFAULT_NONVERBAL_BACKEND = os.getenv("NONVERBAL_BACKEND", "deepface")
+
 class NonVerbalAgent:
-    def __init__(self):
+    def __init__(self, backend=None):
+        self.backend = (backend or DEFAULT_NONVERBAL_BACKEND).lower()
+        if self.backend not in NONVERBAL_BACKENDS:
+            raise ValueError(f"Unknown non-verbal backend: {self.backend} (expected one of {NONVERBAL_BACKENDS})")
         self.emotion_map = {
             'happy': 0.9, 'neutral': 0.6, 'sad': 0.2, 'angry': 0.3,
             'surprised': 0.8, 'fearful': 0.4, 'disgusted': 0.2
@@ -24,69 +36,177 @@ class NonVerbalAgent:
                 logger.error("DeepFace not found. Please install deepface.")
                 self.deepface = None
 
-    def analyze_frame(self, frame_data: np.ndarray) -> Dict:
+    def warm_up(self):
+        """Loads the emotion model (and face detector) and runs it once on a blank face."""
+        get_face_cascade()
+        face = np.zeros((48, 48), dtype=np.uint8)
+        if self.backend in ("batched", "onnx"):
+            from non_verbal_agent.emotion_service import get_emotion_service
+            get_emotion_service("onnx" if self.backend == "onnx" else "keras").predict(face)
+            return
+        self._load_deepface()
+        if self.deepface is None:
+            raise ImportError("DeepFace not installed")
+        self.deepface.analyze(cv2.cvtColor(face, cv2.COLOR_GRAY2RGB), actions=['emotion'],
+                              enforce_detection=False, detector_backend='skip')
+
+    def analyze_frame(self, frame_data: np.ndarray, gate: FrameGate = None, prepared=None) -> Dict:
         """
         Process a single video frame. 
         Returns confidence score (0-1), emotions, etc.
+
+        With a per-session `gate`, frames without a face are skipped
+        (success False, 'skipped': 'no_face') and frames whose face has not
+        changed reuse the previous result ('skipped': 'reuse').
+        `prepared` (FramePreprocessor output) supplies the face box and crop,
+        so the emotion model only sees the face.
         """
         try:
+            if prepared is not None:
+                frame_data = prepared.image
             if frame_data is None or frame_data.size == 0:
                 return self._empty_response()
-            
-            # Ensure RGB
-            if len(frame_data.shape) == 3:
-                frame_rgb = cv2.cvtColor(frame_data, cv2.COLOR_BGR2RGB)
-            else:
-                frame_rgb = frame_data
 
-            # 1. Emotions (DeepFace)
-            self._load_deepface()
+            skipped = self._check_gate(frame_data, gate, prepared)
+            if skipped is not None:
+                return skipped
+
+            # 1. Emotions (DeepFace, or the batched emotion service)
             emotions = {}
-            if self.deepface:
-                try:
-                    # actions=['emotion'] only
-                    res = self.deepface.analyze(frame_rgb, actions=['emotion'], enforce_detection=False)
-                    # DeepFace returns a list of results (one per face)
-                    if isinstance(res, list):
-                        res = res[0]
+            if self.backend in ("batched", "onnx"):
+                face = self._face_for_service(frame_data, gate, prepared)
+                emotions = self._service_emotions(lambda service: service.predict(face)) if face is not None else {}
+            else:
+                self._load_deepface()
+                if self.deepface:
+                    try:
+                        # actions=['emotion'] only
+                        if prepared is not None and prepared.face_box is not None:
+                            # Face already located: analyse the crop without re-detecting
+                            res = self.deepface.analyze(prepared.face_crop(), actions=['emotion'],
+                                                        enforce_detection=False, detector_backend='skip')
+                        else:
+                            # Ensure RGB
+                            if len(frame_data.shape) == 3:
+                                frame_rgb = cv2.cvtColor(frame_data, cv2.COLOR_BGR2RGB)
+                            else:
+                                frame_rgb = frame_data
+                            res = self.deepface.analyze(frame_rgb, actions=['emotion'], enforce_detection=False)
+                        # DeepFace returns a list of results (one per face)
+                        if isinstance(res, list):
+                            res = res[0]
                     
-                    raw_emotions = res.get('emotion', {})
-                    # Normalize 0-100 -> 0-1, verify float conversion
-                    emotions = {k: float(v)/100.0 for k, v in raw_emotions.items()}
-                except Exception as e:
-                    logger.debug(f"DeepFace analyze failed (no face?): {e}")
-
-            if not emotions:
-                # Fallback to defaults
-                emotions = {k: 0.1 for k in self.emotion_map}
-                emotions['neutral'] = 0.5
-
-            # 2. Eye Contact (Heuristic)
-            # Without landmarks/dlib, we assume if face detected by DeepFace, contact is okay.
-            # Real implementation needs gaze tracking.
-            # For this prototype: Random fluctuation around high confidence if emotions detected.
-            eye_contact = 0.8 if emotions.get('neutral', 0) > 0.1 else 0.4
-            
-            # 3. Posture (Heuristic)
-            # Assume centered face if detection worked
-            posture_score = 0.7 
-
-            # 4. Aggregate
-            confidence = self._calculate_aggregate_confidence(emotions, eye_contact, posture_score)
-
-            return {
-                'confidence_score': float(confidence),
-                'emotions': emotions,
-                'facial_expression': max(emotions, key=emotions.get),
-                'eye_contact': float(eye_contact),
-                'posture_score': float(posture_score),
-                'success': True
-            }
+                        raw_emotions = res.get('emotion', {})
+                        # Normalize 0-100 -> 0-1, verify float conversion
+                        emotions = {k: float(v)/100.0 for k, v in raw_emotions.items()}
+                    except Exception as e:
+                        logger.debug(f"DeepFace analyze failed (no face?): {e}")
+
+            return self._result(emotions, gate)
 
         except Exception as e:
             logger.error(f"Frame analysis error: {e}")
             return self._empty_response()
 
+    async def aanalyze_frame(self, frame_data: np.ndarray, gate: FrameGate = None, prepared=None,
+                             executor=None) -> Dict:
+        """
+        `analyze_frame` for the event loop. With the batched backends and a
+        `prepared` frame, the gate check and crop are cheap and run here, and
+        the emotion batch is awaited, so no executor thread waits on it and
+        frames of every session can share one batch. Otherwise `analyze_frame`
+        runs on `executor`.
+        """
+        if self.backend not in ("batched", "onnx") or prepared is None or prepared.detected is None:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, self.analyze_frame, frame_data, gate, prepared)
+        try:
+            frame_data = prepared.image
+            if frame_data is None or frame_data.size == 0:
+                return self._empty_response()
+            skipped = self._check_gate(frame_data, gate, prepared)
+            if skipped is not None:
+                return skipped
+
+            emotions = {}
+            face = self._face_for_service(frame_data, gate, prepared)
+            if face is not None:
+                future = self._service_emotions(lambda service: service.submit(face))
+                if future:
+                    try:
+                        emotions = await asyncio.wrap_future(future)
+                    except Exception as e:
+                        logger.debug(f"Batched emotion inference failed: {e}")
+            return self._result(emotions, gate)
+        except Exception as e:
+            logger.error(f"Frame analysis error: {e}")
+            return self._empty_response()
+
+    def _check_gate(self, frame_data: np.ndarray, gate: FrameGate = None, prepared=None):
+        """Response for a frame the gate skips (no face, or unchanged face); None to analyse it."""
+        if gate is None:
+            return None
+        decision = gate.check(frame_data, prepared=prepared)
+        if decision == NO_FACE:
+            response = self._empty_response()
+            response['skipped'] = NO_FACE
+            return response
+        if decision == REUSE:
+            return dict(gate.last_result, skipped=REUSE)
+        return None
+
+    def _result(self, emotions: Dict, gate: FrameGate = None) -> Dict:
+        """Scores the frame from its emotions; the gate remembers the result for reuse."""
+        if not emotions:
+            # Fallback to defaults
+            emotions = {k: 0.1 for k in self.emotion_map}
+            emotions['neutral'] = 0.5
+
+        # 2. Eye Contact (Heuristic)
+        # Without landmarks/dlib, we assume if face detected by DeepFace, contact is okay.
+        # Real implementation needs gaze tracking.
+        # For this prototype: Random fluctuation around high confidence if emotions detected.
+        eye_contact = 0.8 if emotions.get('neutral', 0) > 0.1 else 0.4
+        
+        # 3. Posture (Heuristic)
+        # Assume centered face if detection worked
+        posture_score = 0.7 
+
+        # 4. Aggregate
+        confidence = self._calculate_aggregate_confidence(emotions, eye_contact, posture_score)
+
+        result = {
+            'confidence_score': float(confidence),
+            'emotions': emotions,
+            'facial_expression': max(emotions, key=emotions.get),
+            'eye_contact': float(eye_contact),
+            'posture_score': float(posture_score),
+            'success': True
+        }
+        if gate is not None:
+            gate.remember(result)
+        return result
+
+    def _face_for_service(self, frame_data: np.ndarray, gate: FrameGate = None, prepared=None):
+        """Face crop for the emotion service (48x48 from `prepared`, else cropped via the gate's box); None if no face."""
+        if prepared is not None and prepared.detected is not None:
+            return prepared.face
+        box = gate.face_box if gate is not None else locate_face(frame_data)
+        if box is not None:
+            x, y, w, h = box
+            return frame_data[max(0, y):y + h, max(0, x):x + w]
+        # No detector available: whole frame
+        return frame_data if get_face_cascade() is None else None
+
+    def _service_emotions(self, call):
+        """`call(service)` on this backend's EmotionService; {} if that fails."""
+        from non_verbal_agent.emotion_service import get_emotion_service
+        try:
+            return call(get_emotion_service("onnx" if self.backend == "onnx" else "keras"))
+        except Exception as e:
+            logger.debug(f"Batched emotion inference failed: {e}")
+            return {}
+
     def _calculate_aggregate_confidence(self, emotions, eye_contact, posture):
         # Weight positive emotions higher
         pos_score = emotions.get('happy', 0) + emotions.get('neutral', 0) + emotions.get('surprised', 0)
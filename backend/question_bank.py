@@ -0,0 +1,215 @@
+import os
+import json
+import time
+import random
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple, Any
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUESTIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "questions.json")
+
+# How often (seconds) get_question_bank() stats the file for changes
+RELOAD_CHECK_INTERVAL = float(os.getenv("QUESTION_BANK_RELOAD_INTERVAL", "2.0"))
+
+EMPTY_DATASET = {"common": [], "branches": {}}
+
+
+def _file_signature(file_path: str) -> Tuple[int, int]:
+    st = os.stat(file_path)
+    return st.st_mtime_ns, st.st_size
+
+
+class QuestionBank:
+    """
+    Immutable, indexed snapshot of the question dataset.
+
+    Built once per file version and shared by every session. Question dicts are
+    shared too and must be treated as read-only.
+    Indexes: id -> question, branch -> questions, tag -> questions.
+    """
+    def __init__(self, data: Dict, source_path: Optional[str] = None, signature: Optional[Tuple[int, int]] = None):
+        self.source_path = source_path
+        self.signature = signature  # (mtime_ns, size) of the file this was parsed from
+        self.loaded_at = time.time()
+
+        self.common: Tuple[Dict, ...] = tuple(data.get("common", []))
+        self.branches: Dict[str, Tuple[Dict, ...]] = {
+            branch: tuple(questions) for branch, questions in data.get("branches", {}).items()
+        }
+        self._branch_keys = {branch.upper(): branch for branch in self.branches}
+
+        self._by_id: Dict[str, Dict] = {}
+        self._branch_of: Dict[str, str] = {}
+        by_tag: Dict[str, List[Dict]] = {}
+
+        for q in self.common:
+            self._index(q, None, by_tag)
+        for branch, questions in self.branches.items():
+            for q in questions:
+                self._index(q, branch, by_tag)
+        self._by_tag = {tag: tuple(qs) for tag, qs in by_tag.items()}
+
+    def _index(self, question: Dict, branch: Optional[str], by_tag: Dict[str, List[Dict]]):
+        qid = question.get("id")
+        if qid is not None:
+            if qid in self._by_id:
+                logger.warning(f"[QuestionBank] Duplicate question id '{qid}'")
+            self._by_id.setdefault(qid, question)
+            if branch:
+                self._branch_of.setdefault(qid, branch)
+        tags = question.get("tags") or []
+        if isinstance(tags, str):
+            tags = [tags]
+        for tag in tags:
+            by_tag.setdefault(str(tag).lower(), []).append(question)
+
+    @classmethod
+    def load(cls, file_path: str = DEFAULT_QUESTIONS_PATH) -> "QuestionBank":
+        """Parses the JSON file. Raises on missing/invalid files (callers decide on fallback)."""
+        signature = _file_signature(file_path)
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data, source_path=file_path, signature=signature)
+
+    # --- Lookups ---
+
+    def get_all_branches(self) -> List[str]:
+        return list(self.branches)
+
+    def resolve_branch(self, branch: str) -> Optional[str]:
+        """Case-insensitive branch name -> canonical key."""
+        if branch in self.branches:
+            return branch
+        return self._branch_keys.get((branch or "").upper())
+
+    def get_branch_questions(self, branch: str) -> Tuple[Dict, ...]:
+        key = self.resolve_branch(branch)
+        return self.branches[key] if key else ()
+
+    def get_question_by_id(self, question_id: str) -> Optional[Dict]:
+        return self._by_id.get(question_id)
+
+    def get_branch_of(self, question_id: str) -> Optional[str]:
+        return self._branch_of.get(question_id)
+
+    def get_questions_by_tag(self, tag: str) -> Tuple[Dict, ...]:
+        return self._by_tag.get(tag.lower(), ())
+
+    def get_tags(self) -> List[str]:
+        return list(self._by_tag)
+
+    def get_stats(self) -> Dict[str, Any]:
+        branch_counts = {branch: len(qs) for branch, qs in self.branches.items()}
+        total_technical = sum(branch_counts.values())
+        return {
+            "total_greeting": len(self.common),
+            "branches": branch_counts,
+            "total_technical": total_technical,
+            "total_questions": len(self.common) + total_technical,
+            "tags": len(self._by_tag),
+        }
+
+
+class QuestionCursor:
+    """
+    Per-session position in one branch's question order.
+    Holds a reference to the snapshot it was created from, so a hot reload
+    never reorders or removes questions under a live interview.
+    """
+    __slots__ = ("bank", "branch", "order", "position")
+
+    def __init__(self, bank: QuestionBank, branch: str, shuffle: bool = False, seed: Optional[int] = None):
+        self.bank = bank
+        self.branch = bank.resolve_branch(branch)
+        order = list(range(len(bank.get_branch_questions(branch))))
+        if shuffle:
+            random.Random(seed).shuffle(order)
+        self.order = tuple(order)
+        self.position = 0
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    @property
+    def remaining(self) -> int:
+        return len(self.order) - self.position
+
+    def peek(self) -> Optional[Dict]:
+        if self.position >= len(self.order):
+            return None
+        return self.bank.branches[self.branch][self.order[self.position]]
+
+    def next(self) -> Optional[Dict]:
+        question = self.peek()
+        if question is not None:
+            self.position += 1
+        return question
+
+
+class _ReloadingBank:
+    """Holds the current snapshot for one file and swaps it when the file changes."""
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.bank = self._load_or_empty(previous=None)
+        self.last_check = time.monotonic()
+        self.lock = threading.Lock()
+        self.reloads = 0
+
+    def _load_or_empty(self, previous: Optional[QuestionBank]) -> QuestionBank:
+        try:
+            return QuestionBank.load(self.file_path)
+        except FileNotFoundError:
+            logger.error(f"[QuestionBank] File '{self.file_path}' not found.")
+        except json.JSONDecodeError as e:
+            logger.error(f"[QuestionBank] Invalid JSON in '{self.file_path}': {e}")
+        except Exception as e:
+            logger.error(f"[QuestionBank] Error loading file: {e}")
+        # Keep serving the last good version rather than an empty bank
+        return previous if previous is not None else QuestionBank(EMPTY_DATASET, source_path=self.file_path)
+
+    def current(self, check_interval: float = RELOAD_CHECK_INTERVAL) -> QuestionBank:
+        now = time.monotonic()
+        if now - self.last_check < check_interval:
+            return self.bank
+        with self.lock:
+            if now - self.last_check < check_interval:
+                return self.bank
+            self.last_check = now
+            try:
+                signature = _file_signature(self.file_path)
+            except OSError:
+                return self.bank
+            if signature != self.bank.signature:
+                new_bank = self._load_or_empty(previous=self.bank)
+                if new_bank is not self.bank:
+                    self.bank = new_bank
+                    self.reloads += 1
+                    logger.info(f"[QuestionBank] Reloaded {self.file_path} ({new_bank.get_stats()['total_questions']} questions)")
+        return self.bank
+
+
+_banks: Dict[str, _ReloadingBank] = {}
+_banks_lock = threading.Lock()
+
+def get_question_bank(file_path: Optional[str] = None, check_interval: float = RELOAD_CHECK_INTERVAL) -> QuestionBank:
+    """
+    Returns the shared snapshot for `file_path` (default: questions.json),
+    reloading it if the file changed on disk since the last check.
+    """
+    path = os.path.abspath(file_path or DEFAULT_QUESTIONS_PATH)
+    holder = _banks.get(path)
+    if holder is None:
+        with _banks_lock:
+            holder = _banks.get(path)
+            if holder is None:
+                holder = _ReloadingBank(path)
+                _banks[path] = holder
+    return holder.current(check_interval)
+
+def question_bank_stats() -> Dict[str, Any]:
+    return {
+        path: {**holder.bank.get_stats(), "reloads": holder.reloads}
+        for path, holder in list(_banks.items())
+    }
@@ -0,0 +1,355 @@
+"""
+Re-renders the PDF report of every saved session (after a change to the
+scoring weights or the report template).
+
+Sessions are streamed from MongoDB (InterviewStore, MONGO_URI) through a
+cursor and rendered by generate_pdf_report in a process pool, into a
+directory or a .zip archive. Progress is checkpointed, so an interrupted run
+continues where it stopped when started again with the same arguments.
+Archives are written as one closed part per checkpoint (<out>.partNNNN.zip)
+and merged into <out> when the run completes, so a killed run never leaves
+reports the checkpoint counts as done in an unreadable file.
+
+Run from backend/:
+    python regenerate_reports.py --out reports_v2/
+    python regenerate_reports.py --out reports_v2.zip --workers 8 --since 2025-01-01
+    python regenerate_reports.py --out reports_v2/ --restart      # ignore the checkpoint
+"""
+import os
+import sys
+import glob
+import json
+import time
+import asyncio
+import zipfile
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+# Allow running from anywhere
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Sessions read (and candidates looked up) per cursor batch
+BATCH_SIZE = 200
+# Completed reports between checkpoint writes
+CHECKPOINT_EVERY = 100
+
+
+def report_name(session: Dict) -> str:
+    return f"report_{session.get('session_id') or session['_id']}.pdf"
+
+
+def _init_worker():
+    # Pay the ReportLab import once per process, not on the first report
+    import report_generator  # noqa: F401
+
+
+def render_one(candidate: Dict, session: Dict, out_dir: Optional[str]):
+    """
+    Process-pool task. Renders one report; writes it into `out_dir` (atomically)
+    or, for archives, returns the bytes to the parent. Returns (size, data or None).
+    """
+    from report_generator import generate_pdf_report
+    data = generate_pdf_report(candidate, session)
+    if not data:
+        raise RuntimeError("PDF generation failed")
+    if out_dir is None:
+        return len(data), data
+    path = os.path.join(out_dir, report_name(session))
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return len(data), None
+
+
+class Checkpoint:
+    """
+    Resume point of a run: the `_id` up to which every session has been handled
+    (sessions finish out of order, so this is the low watermark), plus counters
+    and the ids of sessions that failed to render.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.last_id: Optional[str] = None
+        self.done = 0
+        self.failed: List[Dict] = []
+        self.bytes = 0
+        self.seconds = 0.0
+        # Archive parts closed before this checkpoint was written
+        self.parts: List[str] = []
+
+    def load(self) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        self.last_id = state.get("last_id")
+        self.done = state.get("done", 0)
+        self.failed = state.get("failed", [])
+        self.bytes = state.get("bytes", 0)
+        self.seconds = state.get("seconds", 0.0)
+        self.parts = state.get("parts", [])
+        return True
+
+    def save(self):
+        state = {"last_id": self.last_id, "done": self.done, "failed": self.failed,
+                 "bytes": self.bytes, "seconds": round(self.seconds, 2), "parts": self.parts,
+                 "updated_at": time.time()}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+class ReportWriter:
+    """
+    Destination of the reports: a directory (workers write the files) or a zip
+    archive (written here). Archive entries go to a part file that is closed
+    at each checkpoint; `finish` merges the closed parts into the archive.
+    """
+    def __init__(self, out: str, restart: bool = False, parts: List[str] = None):
+        self.archive_path = out if out.lower().endswith(".zip") else None
+        self.out_dir = None if self.archive_path else out
+        self.parts: List[str] = []
+        self._zip: Optional[zipfile.ZipFile] = None
+        self._part_path: Optional[str] = None
+        if self.archive_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.archive_path)), exist_ok=True)
+            if restart and os.path.exists(self.archive_path):
+                os.remove(self.archive_path)
+            kept = set() if restart else set(parts or [])
+            for path in self._part_files():
+                if os.path.basename(path) in kept:
+                    self.parts.append(os.path.basename(path))
+                else:
+                    # Written after the last checkpoint (or before a restart); its sessions are redone
+                    os.remove(path)
+        else:
+            os.makedirs(self.out_dir, exist_ok=True)
+
+    def add(self, session: Dict, data: Optional[bytes]):
+        if self.archive_path is None or data is None:
+            return
+        if self._zip is None:
+            self._part_path = self._next_part_path()
+            self._zip = zipfile.ZipFile(self._part_path, "w", compression=zipfile.ZIP_DEFLATED)
+        self._zip.writestr(report_name(session), data)
+
+    def flush(self):
+        """Closes the current part; the checkpoint written next lists it as complete."""
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+            self.parts.append(os.path.basename(self._part_path))
+
+    def finish(self):
+        """Merges the archive so far and every closed part into the archive, then drops the parts."""
+        self.flush()
+        if self.archive_path is None or not self.parts:
+            return
+        directory = os.path.dirname(os.path.abspath(self.archive_path))
+        sources = [self.archive_path] if os.path.exists(self.archive_path) else []
+        sources += [os.path.join(directory, part) for part in self.parts]
+        tmp_path = f"{self.archive_path}.tmp"
+        seen = set()
+        with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED) as merged:
+            # Newest first: a session re-done after a resume keeps its latest rendering
+            for source in reversed(sources):
+                if not os.path.exists(source):
+                    continue
+                with zipfile.ZipFile(source) as part:
+                    for name in part.namelist():
+                        if name not in seen:
+                            seen.add(name)
+                            merged.writestr(name, part.read(name))
+        os.replace(tmp_path, self.archive_path)
+        for part in self.parts:
+            path = os.path.join(directory, part)
+            if os.path.exists(path):
+                os.remove(path)
+        self.parts = []
+
+    def close(self):
+        """Stops writing without committing the open part (an interrupted run)."""
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+
+    def _part_files(self) -> List[str]:
+        return sorted(glob.glob(f"{glob.escape(self.archive_path[:-4])}.part[0-9][0-9][0-9][0-9].zip"))
+
+    def _next_part_path(self) -> str:
+        existing = [int(path[-8:-4]) for path in self._part_files()]
+        return f"{self.archive_path[:-4]}.part{max(existing, default=0) + 1:04d}.zip"
+
+
+def session_query(since: Optional[str], until: Optional[str]) -> Dict:
+    saved_at = {}
+    if since:
+        saved_at["$gte"] = datetime.fromisoformat(since)
+    if until:
+        saved_at["$lt"] = datetime.fromisoformat(until)
+    return {"saved_at": saved_at} if saved_at else {}
+
+
+async def regenerate(store, writer: ReportWriter, checkpoint: Checkpoint, workers: int,
+                     query: Dict = None, limit: Optional[int] = None, progress_seconds: float = 10.0) -> Dict:
+    """
+    Streams sessions after the checkpoint through the process pool, keeping at
+    most a few tasks per worker in flight so memory stays flat however many
+    sessions there are.
+    """
+    loop = asyncio.get_running_loop()
+    max_in_flight = workers * 4
+    pending: Dict[asyncio.Future, Dict] = {}     # future -> session
+    order: List[str] = []           # submitted ids, oldest first
+    finished = set()                # ids finished out of order
+    run = {"done": 0, "failed": 0, "bytes": 0}
+    started = time.perf_counter()
+    last_report = started
+    last_checkpoint = started
+    since_checkpoint = 0
+
+    def advance_watermark():
+        while order and order[0] in finished:
+            finished.discard(order[0])
+            checkpoint.last_id = order.pop(0)
+
+    def save_checkpoint():
+        nonlocal last_checkpoint
+        writer.flush()
+        checkpoint.parts = list(writer.parts)
+        now = time.perf_counter()
+        checkpoint.seconds += now - last_checkpoint
+        last_checkpoint = now
+        checkpoint.save()
+
+    async def collect(return_when):
+        nonlocal last_report, since_checkpoint
+        if not pending:
+            return
+        done, _ = await asyncio.wait(pending, return_when=return_when)
+        for future in done:
+            session = pending.pop(future)
+            session_id = str(session["_id"])
+            try:
+                size, data = future.result()
+                writer.add(session, data)
+                run["done"] += 1
+                run["bytes"] += size
+                checkpoint.done += 1
+                checkpoint.bytes += size
+            except Exception as e:
+                run["failed"] += 1
+                checkpoint.failed.append({"_id": session_id, "session_id": session.get("session_id"),
+                                          "error": f"{type(e).__name__}: {e}"})
+                print(f"❌ {session.get('session_id') or session_id}: {e}")
+            finished.add(session_id)
+            since_checkpoint += 1
+        advance_watermark()
+        if since_checkpoint >= CHECKPOINT_EVERY:
+            save_checkpoint()
+            since_checkpoint = 0
+        now = time.perf_counter()
+        if now - last_report >= progress_seconds:
+            print_progress(run, now - started)
+            last_report = now
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        submitted = 0
+        batch: List[Dict] = []
+        candidates: Dict[str, Dict] = {}
+
+        async def submit(batch: List[Dict]):
+            nonlocal submitted
+            missing = {s.get("candidate_id") for s in batch if s.get("candidate_id") not in candidates}
+            if missing:
+                candidates.update(await store.get_candidates(missing))
+            for session in batch:
+                while len(pending) >= max_in_flight:
+                    await collect(asyncio.FIRST_COMPLETED)
+                candidate = candidates.get(session.get("candidate_id")) or {}
+                future = loop.run_in_executor(pool, render_one, candidate, session, writer.out_dir)
+                pending[future] = session
+                order.append(str(session["_id"]))
+                submitted += 1
+
+        async for session in store.iter_sessions(checkpoint.last_id, query, BATCH_SIZE):
+            if limit is not None and submitted + len(batch) >= limit:
+                break
+            batch.append(session)
+            if len(batch) >= BATCH_SIZE:
+                await submit(batch)
+                batch = []
+                # Candidate lookups only help within nearby sessions; keep the memo bounded
+                if len(candidates) > BATCH_SIZE * 10:
+                    candidates.clear()
+        if batch:
+            await submit(batch)
+        await collect(asyncio.ALL_COMPLETED)
+
+    save_checkpoint()
+    run["seconds"] = time.perf_counter() - started
+    return run
+
+
+def print_progress(run: Dict, seconds: float):
+    rate = run["done"] / seconds if seconds > 0 else 0.0
+    print(f"  {run['done']} rendered, {run['failed']} failed | {rate:.1f} reports/s, "
+          f"{run['bytes'] / 1e6 / seconds if seconds > 0 else 0:.2f} MB/s | {seconds:.0f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-render the PDF report of every saved session.")
+    parser.add_argument("--out", required=True, help="Output directory, or an archive path ending in .zip")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Render processes")
+    parser.add_argument("--since", default=None, help="Only sessions saved on/after this ISO date")
+    parser.add_argument("--until", default=None, help="Only sessions saved before this ISO date")
+    parser.add_argument("--limit", type=int, default=None, help="Stop after this many sessions (this run)")
+    parser.add_argument("--checkpoint", default=None, help="Progress file (default: <out>.checkpoint.json)")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint and start over")
+    parser.add_argument("--progress", type=float, default=10.0, help="Seconds between progress lines")
+    parser.add_argument("--json", default=None, help="Write the run summary to this file")
+    args = parser.parse_args(argv)
+
+    from store import InterviewStore
+    store = InterviewStore()
+    if store.db is None:
+        print("❌ MongoDB is not configured (MONGO_URI); there are no saved sessions to regenerate.")
+        return 2
+
+    checkpoint = Checkpoint(args.checkpoint or f"{args.out.rstrip('/').rstrip(os.sep)}.checkpoint.json")
+    if args.restart and os.path.exists(checkpoint.path):
+        # Starting over also replaces an existing archive
+        os.remove(checkpoint.path)
+    if checkpoint.load():
+        print(f"↻ Resuming after session {checkpoint.last_id} ({checkpoint.done} already rendered)")
+
+    writer = ReportWriter(args.out, restart=args.restart, parts=checkpoint.parts)
+    workers = max(1, args.workers)
+    print(f"🖨️  Regenerating reports → {args.out} ({workers} workers)")
+    try:
+        run = asyncio.run(regenerate(store, writer, checkpoint, workers,
+                                     session_query(args.since, args.until), args.limit, args.progress))
+        writer.finish()
+        checkpoint.parts = list(writer.parts)
+        checkpoint.save()
+    finally:
+        writer.close()
+
+    seconds = run["seconds"]
+    print("==========================================")
+    print_progress(run, seconds)
+    print(f"Total so far: {checkpoint.done} rendered, {len(checkpoint.failed)} failed "
+          f"({checkpoint.seconds:.0f}s over all runs); checkpoint: {checkpoint.path}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({**run, "reports_per_second": run["done"] / seconds if seconds > 0 else 0.0,
+                       "total_done": checkpoint.done, "failed": checkpoint.failed}, f, indent=2)
+    return 1 if run["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
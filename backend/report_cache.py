@@ -0,0 +1,174 @@
+import os
+import re
+import json
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+REPORT_CACHE_MAX_BYTES = int(float(os.getenv("REPORT_CACHE_MB", "64")) * 1024 * 1024)
+
+# Session fields the PDF is rendered from; a change to any of them is a new report
+REPORT_FIELDS = ("scores", "total_score", "score_breakdown", "transcript", "saved_at")
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def score_version(session_data: Dict) -> str:
+    """
+    Version of a session's report: the template version plus a hash of the
+    fields it is rendered from (or the session's own `score_version`, if set).
+    Re-scoring a session or changing the template yields a new version.
+    """
+    from report_generator import REPORT_TEMPLATE_VERSION
+    explicit = session_data.get("score_version")
+    if explicit is not None:
+        content = str(explicit)
+    else:
+        content = json.dumps({k: session_data.get(k) for k in REPORT_FIELDS}, sort_keys=True, default=str)
+    digest = hashlib.sha1(f"{REPORT_TEMPLATE_VERSION}\x00{content}".encode("utf-8")).hexdigest()
+    return f"t{REPORT_TEMPLATE_VERSION}-{digest[:16]}"
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """True if an If-None-Match / If-Range header names `etag` (weak comparison, or `*`)."""
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+
+def byte_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parses a single-range `Range: bytes=...` header into an inclusive (start, end).
+    Returns None to serve the whole body (no header, or a form we do not split,
+    such as multiple ranges); raises ValueError if the range is unsatisfiable.
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("empty suffix range")
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError(f"range {header} outside 0-{size - 1}")
+    return start, end
+
+
+class ReportCache:
+    """
+    Rendered report PDFs in memory, keyed by (session_id, score version).
+
+    Size-bounded LRU: least recently served reports are dropped once
+    `max_bytes` is exceeded. Concurrent requests for a report that is being
+    rendered wait for that render instead of starting their own.
+    """
+    def __init__(self, max_bytes: int = REPORT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._size = 0
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._stats = {"hits": 0, "misses": 0, "renders": 0, "coalesced": 0, "render_failures": 0,
+                       "evictions": 0}
+
+    def get(self, session_id: str, version: str) -> Optional[bytes]:
+        key = (session_id, version)
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return data
+
+    def set(self, session_id: str, version: str, data: bytes):
+        if not data or len(data) > self.max_bytes:
+            return
+        key = (session_id, version)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            # Older versions of this session's report will not be asked for again
+            for stale in [k for k in self._entries if k[0] == session_id]:
+                self._size -= len(self._entries.pop(stale))
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self._stats["evictions"] += 1
+
+    async def get_or_render(self, session_id: str, version: str,
+                            render: Callable[[], Awaitable[Optional[bytes]]]) -> Optional[bytes]:
+        """Cached PDF, or the result of `render()` (awaited once per key however many callers wait)."""
+        data = self.get(session_id, version)
+        if data is not None:
+            return data
+        key = (session_id, version)
+        pending = self._inflight.get(key)
+        if pending is not None:
+            with self._lock:
+                self._stats["coalesced"] += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            data = await render()
+            with self._lock:
+                self._stats["renders" if data else "render_failures"] += 1
+            if data:
+                self.set(session_id, version, data)
+            future.set_result(data)
+            return data
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters get the exception; retrieve it so an unawaited future does not log it
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_report_cache: Optional[ReportCache] = None
+_report_cache_lock = threading.Lock()
+
+
+def get_report_cache() -> ReportCache:
+    global _report_cache
+    if _report_cache is None:
+        with _report_cache_lock:
+            if _report_cache is None:
+                _report_cache = ReportCache()
+    return _report_cache
@@ -2,19 +2,27 @@ from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 from reportlab.lib.units import inch
 from reportlab.lib import colors
+import io
 import os
 
-def generate_pdf_report(candidate_data, session_data, output_path):
+# Bump when the layout changes so cached/archived reports are re-rendered
+REPORT_TEMPLATE_VERSION = "1"
+
+def generate_pdf_report(candidate_data, session_data, output_path=None):
     """
     Generates a PDF report for the interview session.
     
     Args:
         candidate_data (dict): { "name", "email", "branch", ... }
         session_data (dict): { "total_score", "transcript", ... }
-        output_path (str): File path to save the PDF.
+        output_path (str | binary stream | None): File path or writable stream to save
+            the PDF to. If None, the PDF is rendered in memory and returned as bytes.
+
+    Returns True/False when writing to output_path; the PDF bytes (None on failure) otherwise.
     """
+    buffer = io.BytesIO() if output_path is None else None
     try:
-        c = canvas.Canvas(output_path, pagesize=letter)
+        c = canvas.Canvas(buffer if buffer is not None else output_path, pagesize=letter)
         width, height = letter
         
         # --- Header ---
@@ -85,6 +93,9 @@ def generate_pdf_report(candidate_data, session_data, output_path):
         
         c.setFont("Helvetica", 10)
         transcript = session_data.get("transcript", [])
+        if isinstance(transcript, str):
+            # Saved sessions keep the answers as one joined string
+            transcript = [{"question": "Candidate answers", "user_answer": transcript}] if transcript else []
         
         for turn in transcript:
             if y_pos < 1 * inch:
@@ -107,7 +118,7 @@ def generate_pdf_report(candidate_data, session_data, output_path):
             y_pos -= 0.3 * inch
 
         c.save()
-        return True
+        return buffer.getvalue() if buffer is not None else True
     except Exception as e:
         print(f"PDF Generation Failed: {e}")
-        return False
+        return None if buffer is not None else False
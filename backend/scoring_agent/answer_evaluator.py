@@ -0,0 +1,133 @@
+import logging
+import threading
+from typing import Dict, List
+from pydantic import BaseModel, Field
+from agents.llm_gateway import get_llm_gateway
+from agents.chain_registry import register_chain, json_parser
+
+logger = logging.getLogger(__name__)
+
+# Reference terms per branch, used to anchor keyword coverage
+DOMAIN_KEYWORDS = {
+    'cse': ['algorithm', 'database', 'api', 'system design', 'oop', 'java', 'python', 'sql', 'networking', 'os'],
+    'ai': ['machine learning', 'deep learning', 'neural network', 'nlp', 'pytorch', 'tensorflow', 'model'],
+    'mechanical': ['thermodynamics', 'fluid mechanics', 'cad', 'manufacturing', 'gears', 'stress'],
+    'civil': ['structural analysis', 'concrete', 'surveying', 'autocad', 'soil mechanics'],
+    'ec': ['vlsi', 'embedded systems', 'microcontroller', 'analog', 'digital signal processing'],
+    'eee': ['circuit', 'power systems', 'generator', 'transformer', 'grid']
+}
+
+class AnswerEvaluation(BaseModel):
+    """Compact wire schema: short keys keep both the prompt and the completion small."""
+    matched: List[str] = Field(description="Technical terms the answer uses")
+    missing: List[str] = Field(description="Expected terms the answer lacks")
+    keyword: float = Field(description="Keyword coverage 0-100")
+    semantic: float = Field(description="Semantic accuracy vs the ideal answer 0-100")
+    why: str = Field(description="Rationale, at most 20 words")
+
+# The schema is spelled out inline instead of `get_format_instructions()`,
+# which would add a ~300 token JSON-schema preamble to every answer.
+EVALUATION_CHAIN = register_chain(
+    "scoring.evaluate_answer",
+    "Grade a {branch} interview answer. Reply with JSON only:\n"
+    '{{"matched":[terms used],"missing":[expected terms absent],"keyword":0-100,"semantic":0-100,"why":"<=20 words"}}\n'
+    "keyword: coverage of domain terms (reference: {expected_examples}). "
+    "semantic: meaning and factual accuracy vs the ideal answer.\n"
+    "Q: {question}\n"
+    "Ideal: {ideal_answer}\n"
+    "Answer: {answer}",
+    parser=json_parser(),
+    temperature=0.0
+)
+
+class AnswerEvaluator:
+    """
+    Scores one answer for keyword coverage and semantic accuracy in a single LLM call.
+    KeywordScorer and VerbalAnalyzer both read from this result; the call runs at
+    temperature 0 through the gateway, so the second consumer is a cache hit.
+    """
+    def __init__(self):
+        self.gateway = get_llm_gateway()
+
+    def _inputs(self, question: str, ideal_answer: str, branch: str, answer: str) -> Dict:
+        branch_key = (branch or "cse").lower()
+        return {
+            "branch": branch_key.upper(),
+            "expected_examples": ", ".join(DOMAIN_KEYWORDS.get(branch_key, DOMAIN_KEYWORDS['cse'])),
+            "question": question or "",
+            "ideal_answer": ideal_answer or "",
+            "answer": answer or ""
+        }
+
+    def evaluate(self, question: str, ideal_answer: str, branch: str, answer: str) -> Dict:
+        """
+        Returns matched/missing keywords, keyword_score, semantic_score and a rationale.
+        Blocks on the LLM; event-loop callers use `aevaluate`.
+        """
+        if not answer or not self.gateway.available:
+            return self._empty_result()
+        try:
+            raw = EVALUATION_CHAIN.invoke(self._inputs(question, ideal_answer, branch, answer))
+            return self._normalise(raw)
+        except Exception as e:
+            logger.error(f"Answer evaluation failed: {e}")
+            return self._empty_result()
+
+    async def aevaluate(self, question: str, ideal_answer: str, branch: str, answer: str) -> Dict:
+        """`evaluate` awaited on the gateway (KeywordScorer.aextract_and_score, VerbalAnalyzer.ascore_answer)."""
+        if not answer or not self.gateway.available:
+            return self._empty_result()
+        try:
+            raw = await EVALUATION_CHAIN.ainvoke(self._inputs(question, ideal_answer, branch, answer))
+            return self._normalise(raw)
+        except Exception as e:
+            logger.error(f"Answer evaluation failed: {e}")
+            return self._empty_result()
+
+    @staticmethod
+    def _clamp(value) -> float:
+        try:
+            return max(0.0, min(100.0, float(value)))
+        except (TypeError, ValueError):
+            return 0.0
+
+    def _normalise(self, raw: Dict) -> Dict:
+        if not isinstance(raw, dict):
+            raise ValueError(f"Unexpected evaluation payload: {raw!r}")
+        parsed = AnswerEvaluation(
+            matched=[str(k) for k in raw.get("matched") or []],
+            missing=[str(k) for k in raw.get("missing") or []],
+            keyword=self._clamp(raw.get("keyword")),
+            semantic=self._clamp(raw.get("semantic")),
+            why=str(raw.get("why", ""))
+        )
+        return {
+            'matched_keywords': parsed.matched,
+            'missing_keywords': parsed.missing,
+            'keyword_score': parsed.keyword,
+            'semantic_score': parsed.semantic,
+            'rationale': parsed.why,
+            'success': True
+        }
+
+    def _empty_result(self) -> Dict:
+        return {
+            'matched_keywords': [],
+            'missing_keywords': [],
+            'keyword_score': 0.0,
+            'semantic_score': 0.0,
+            'rationale': "",
+            'success': False
+        }
+
+
+_answer_evaluator = None
+_answer_evaluator_lock = threading.Lock()
+
+def get_answer_evaluator() -> AnswerEvaluator:
+    global _answer_evaluator
+    if _answer_evaluator is None:
+        with _answer_evaluator_lock:
+            if _answer_evaluator is None:
+                _answer_evaluator = AnswerEvaluator()
+    return _answer_evaluator
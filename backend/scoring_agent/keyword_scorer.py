@@ -1,10 +1,10 @@
 from typing import List, Dict, Tuple
+import asyncio
 import logging
-import os
-from langchain_groq import ChatGroq
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
 from pydantic import BaseModel, Field
+from agents.llm_gateway import get_llm_gateway
+from agents.chain_registry import register_chain, json_parser
+from scoring_agent.answer_evaluator import DOMAIN_KEYWORDS, get_answer_evaluator
 
 logger = logging.getLogger(__name__)
 
@@ -13,82 +13,115 @@ class KeywordAnalysis(BaseModel):
     missing_keywords: List[str] = Field(description="List of expected keywords that were missing")
     keyword_score: float = Field(description="A score from 0 to 100 representing domain relevance coverage")
 
+KEYWORD_CHAIN = register_chain(
+    "keyword.extract_and_score",
+    "You are an expert technical interviewer evaluating an answer.\n"
+    "Domain: {job_role}\n"
+    "Candidate Transcript: \"{transcript}\"\n\n"
+    "Tasks:\n"
+    "1. Identify technical keywords/concepts present in the transcript.\n"
+    "2. Compare them against standard expectations for this domain (Examples: {expected_examples}).\n"
+    "3. Calculate a relevance score (0-100) based on the density and quality of technical terms used.\n"
+    "\n{format_instructions}",
+    parser=json_parser(KeywordAnalysis),
+    temperature=0.0
+)
+
 class KeywordScorer:
     def __init__(self):
-        self.api_key = os.getenv("GROQ_API_KEY")
-        if self.api_key:
-            self.llm = ChatGroq(
-                temperature=0.0,
-                model_name="llama-3.3-70b-versatile", 
-                api_key=self.api_key
-            )
-        else:
+        self.gateway = get_llm_gateway()
+        if not self.gateway.available:
             logger.warning("GROQ_API_KEY not found. Keyword scoring will fallback or fail.")
-            self.llm = None
             
         # Hardcoded fallback merely for safekeeping if LLM fails, 
         # ideally we should fetch from questions.json if we had topic metadata there.
-        self.domain_keywords = {
-            'cse': ['algorithm', 'database', 'api', 'system design', 'oop', 'java', 'python', 'sql', 'networking', 'os'],
-            'ai': ['machine learning', 'deep learning', 'neural network', 'nlp', 'pytorch', 'tensorflow', 'model'],
-            'mechanical': ['thermodynamics', 'fluid mechanics', 'cad', 'manufacturing', 'gears', 'stress'],
-            'civil': ['structural analysis', 'concrete', 'surveying', 'autocad', 'soil mechanics'],
-            'ec': ['vlsi', 'embedded systems', 'microcontroller', 'analog', 'digital signal processing'],
-            'eee': ['circuit', 'power systems', 'generator', 'transformer', 'grid']
-        }
+        self.domain_keywords = DOMAIN_KEYWORDS
 
     def _load_keybert(self):
         # Deprecated: No longer loading KeyBERT locally to save resources.
         pass
 
-    def extract_and_score(self, transcript: str, job_role: str = 'cse', top_n: int = 10) -> Dict:
+    def extract_and_score(self, transcript: str, job_role: str = 'cse', top_n: int = 10,
+                          question: str = None, ideal_answer: str = None) -> Dict:
         """
         Extracts keywords and scores them using LLM reasoning.
+        When the question and its ideal answer are known, the score comes from the
+        merged per-answer evaluation (shared with VerbalAnalyzer.score_answer).
+        Blocks on the LLM; use `aextract_and_score` from the event loop.
         """
         job_role = job_role.lower()
         
         # 1. Fallback Logic (if LLM unavailable)
-        if not self.llm:
+        if not self.gateway.available:
             return self._fallback_score(transcript, job_role)
 
+        if question and ideal_answer:
+            evaluation = get_answer_evaluator().evaluate(question, ideal_answer, job_role, transcript)
+            if evaluation.get('success'):
+                return self._from_evaluation(evaluation)
+
         # 2. LLM Logic
-        parser = JsonOutputParser(pydantic_object=KeywordAnalysis)
-        
-        # We define a "Reference Set" based on our basic domain map to guide the LLM, 
-        # but allow it to find synonyms or related relevant terms.
-        expected_examples = ", ".join(self.domain_keywords.get(job_role, self.domain_keywords['cse']))
-        
-        prompt = ChatPromptTemplate.from_template(
-            "You are an expert technical interviewer evaluating an answer.\n"
-            "Domain: {job_role}\n"
-            "Candidate Transcript: \"{transcript}\"\n\n"
-            "Tasks:\n"
-            "1. Identify technical keywords/concepts present in the transcript.\n"
-            "2. Compare them against standard expectations for this domain (Examples: {expected_examples}).\n"
-            "3. Calculate a relevance score (0-100) based on the density and quality of technical terms used.\n"
-            "\n{format_instructions}"
-        )
-        
-        chain = prompt | self.llm | parser
-        
         try:
-            result = chain.invoke({
-                "job_role": job_role,
-                "transcript": transcript,
-                "expected_examples": expected_examples,
-                "format_instructions": parser.get_format_instructions()
-            })
-            
-            return {
-                'keyword_score': result.get('keyword_score', 0),
-                'matched_keywords': result.get('matched_keywords', []),
-                'missing_keywords': result.get('missing_keywords', []),
-                'success': True
-            }
+            result = KEYWORD_CHAIN.invoke(self._chain_inputs(transcript, job_role))
+            return self._from_chain(result)
         except Exception as e:
             logger.error(f"LLM Keyword Analysis failed: {e}")
             return self._fallback_score(transcript, job_role)
 
+    async def aextract_and_score(self, transcript: str, job_role: str = 'cse', top_n: int = 10,
+                                 question: str = None, ideal_answer: str = None, executor=None) -> Dict:
+        """
+        `extract_and_score` for the event loop: the LLM calls are awaited, and only
+        the substring fallback runs on `executor`.
+        """
+        job_role = job_role.lower()
+        loop = asyncio.get_running_loop()
+
+        if not self.gateway.available:
+            return await loop.run_in_executor(executor, self._fallback_score, transcript, job_role)
+
+        if question and ideal_answer:
+            evaluation = await get_answer_evaluator().aevaluate(question, ideal_answer, job_role, transcript)
+            if evaluation.get('success'):
+                return self._from_evaluation(evaluation)
+
+        try:
+            result = await KEYWORD_CHAIN.ainvoke(self._chain_inputs(transcript, job_role))
+            return self._from_chain(result)
+        except Exception as e:
+            logger.error(f"LLM Keyword Analysis failed: {e}")
+            return await loop.run_in_executor(executor, self._fallback_score, transcript, job_role)
+
+    def _chain_inputs(self, transcript: str, job_role: str) -> Dict:
+        # We define a "Reference Set" based on our basic domain map to guide the LLM, 
+        # but allow it to find synonyms or related relevant terms.
+        expected_examples = ", ".join(self.domain_keywords.get(job_role, self.domain_keywords['cse']))
+        return {
+            "job_role": job_role,
+            "transcript": transcript,
+            "expected_examples": expected_examples
+        }
+
+    @staticmethod
+    def _from_evaluation(evaluation: Dict) -> Dict:
+        return {
+            'keyword_score': evaluation['keyword_score'],
+            'matched_keywords': evaluation['matched_keywords'],
+            'missing_keywords': evaluation['missing_keywords'],
+            'semantic_score': evaluation['semantic_score'],
+            'rationale': evaluation['rationale'],
+            'success': True
+        }
+
+    @staticmethod
+    def _from_chain(result: Dict) -> Dict:
+        return {
+            'keyword_score': result.get('keyword_score', 0),
+            'matched_keywords': result.get('matched_keywords', []),
+            'missing_keywords': result.get('missing_keywords', []),
+            'success': True
+        }
+
     def _fallback_score(self, transcript: str, job_role: str) -> Dict:
         """Simple substring matching fallback."""
         raw_text_lower = transcript.lower()
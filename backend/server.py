@@ -3,18 +3,18 @@ import json
 import base64
 import time
 import uuid
-import cv2
 import numpy as np
 import subprocess
 import os
 import io
-import soundfile as sf
 import logging
+import threading
 from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, UploadFile, File, Form
+from typing import TYPE_CHECKING
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, UploadFile, File, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from dotenv import load_dotenv
 
 # ===== LOAD ENVIRONMENT =====
@@ -32,28 +32,38 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # ===== IMPORTS =====
-# Import Lazy Loader (created in agents/lazy_loader.py)
-from agents.lazy_loader import (
-    lazy_deepface,
-    lazy_librosa,
-    lazy_keybert,
-)
+# Heavy dependencies (OpenCV, LangChain, speech_recognition, motor, pypdf, ...)
+# load behind the agent or endpoint that uses them, or during warm-up.
+# Profile with: python -m agents.import_profiler server
+from agents.lazy_loader import lazy_module_stats
+from agents.llm_cache import get_llm_cache
+from agents.llm_gateway import get_llm_gateway
+from agents.chain_registry import warm_chains, chain_stats
+from agents.warmup import get_warmup
+from question_bank import get_question_bank, question_bank_stats
+from report_cache import get_report_cache, score_version, etag_matches, byte_range
 
 # Project Imports
 from brain_agent.orchestrator import BrainAgent
-from verbal_agent.verbal_analyzer import VerbalAnalyzer
+from brain_agent.resume_questions import get_resume_prefetcher
+from brain_agent.branch_classifier import branch_classifier_stats
+from tts_agent.audio_cache import get_tts_audio_cache
+from tts_agent import audio_codec
+from tts_agent.scheduler import TTSScheduler, PREFETCH
 from scoring_agent.engine import ScoringEngine as ScoreAgent
-from non_verbal_agent.video_analyzer import NonVerbalAgent
-from vocal_agent.vocal_analyzer import VocalAnalyzer
-from scoring_agent.keyword_scorer import KeywordScorer
-from report_generator import generate_pdf_report
-from email_service import send_email_with_report
-from store import InterviewStore
-from resume_parser import ResumeParser
+from vocal_agent.vocal_analyzer import VocalAnalyzer, vocal_gate_stats
+from vocal_agent.streaming import StreamingVocalExtractor
+from vocal_agent.pitch import get_pitch_batcher, pitch_batcher_stats
+
+if TYPE_CHECKING:
+    from non_verbal_agent.video_analyzer import NonVerbalAgent
+    from scoring_agent.keyword_scorer import KeywordScorer
+    from verbal_agent.verbal_analyzer import VerbalAnalyzer
 
 # ===== GLOBAL STATE =====
 store = None
 ml_executor = None
+job_queue = None
 
 # ===== LIFESPAN MANAGER =====
 @asynccontextmanager
@@ -62,7 +72,7 @@ async def lifespan(app: FastAPI):
     Manages application startup and shutdown lifecycle.
     Ensures Database and Executors are properly initialized/cleaned up.
     """
-    global store, ml_executor
+    global store, ml_executor, job_queue
     
     logger.info("🚀 Starting Interview Coaching System...")
     
@@ -72,6 +82,7 @@ async def lifespan(app: FastAPI):
     # 2. Initialize Database
     try:
         logger.info("📦 Connecting to Database...")
+        from store import InterviewStore
         store = InterviewStore()
         # Simple check if DB is online (InterviewStore handles timeouts internally)
         if store.db is not None:
@@ -80,13 +91,36 @@ async def lifespan(app: FastAPI):
              logger.warning("⚠️ Database Offline (Running in detached mode)")
     except Exception as e:
         logger.error(f"❌ Database Initialization Failed: {e}")
+
+    # 3. Report/email job queue (persisted with the sessions; in memory when offline)
+    if store is not None:
+        from job_queue import JobQueue
+        job_queue = JobQueue(store)
+        await job_queue.start()
+
+    # 4. Load and index the question bank once; sessions share it
+    stats = get_question_bank().get_stats()
+    logger.info(f"📚 Question bank ready ({stats['total_questions']} questions)")
+
+    # 5. Load and exercise the agents (and compile the LLM chains) in the background;
+    #    /ready reports when done
+    warmup = get_warmup()
+    register_warmups(warmup)
+    warmup_task = asyncio.create_task(warmup.run())
     
     yield # Server is running
     
-    # 3. Shutdown
+    # 6. Shutdown
     logger.info("🛑 Shutting down...")
+    if not warmup_task.done():
+        warmup_task.cancel()
+    if job_queue is not None:
+        await job_queue.stop()
     if ml_executor:
         ml_executor.shutdown(wait=True)
+    if _tts_scheduler is not None:
+        _tts_scheduler.shutdown()
+    get_llm_gateway().close()
     logger.info("👋 Goodbye!")
 
 # ===== APP INITIALIZATION =====
@@ -103,49 +137,183 @@ app.add_middleware(
 # ===== LAZY AGENT INSTANCES & SESSION STATE =====
 
 # Global Singletons for Stateless Agents
+# Built on first use by sessions and by the warm-up threads at the same time, so
+# each getter locks (double-checked, one lock per agent) to build its model once
 _non_verbal_agent = None
+_non_verbal_agent_lock = threading.Lock()
 _vocal_analyzer = None
+_vocal_analyzer_lock = threading.Lock()
 _keyword_scorer = None
+_keyword_scorer_lock = threading.Lock()
 _verbal_analyzer = None
+_verbal_analyzer_lock = threading.Lock()
 
-def get_non_verbal_agent() -> NonVerbalAgent:
+def get_non_verbal_agent() -> "NonVerbalAgent":
     """Lazy-initialized non-verbal agent"""
     global _non_verbal_agent
     if _non_verbal_agent is None:
-        _non_verbal_agent = NonVerbalAgent()
+        with _non_verbal_agent_lock:
+            if _non_verbal_agent is None:
+                from non_verbal_agent.video_analyzer import NonVerbalAgent
+                _non_verbal_agent = NonVerbalAgent()
     return _non_verbal_agent
 
 def get_vocal_analyzer() -> VocalAnalyzer:
     """Lazy-initialized vocal analyzer"""
     global _vocal_analyzer
     if _vocal_analyzer is None:
-        _vocal_analyzer = VocalAnalyzer()
+        with _vocal_analyzer_lock:
+            if _vocal_analyzer is None:
+                _vocal_analyzer = VocalAnalyzer()
     return _vocal_analyzer
 
-def get_keyword_scorer() -> KeywordScorer:
+def get_keyword_scorer() -> "KeywordScorer":
     """Lazy-initialized keyword scorer"""
     global _keyword_scorer
     if _keyword_scorer is None:
-        _keyword_scorer = KeywordScorer()
+        with _keyword_scorer_lock:
+            if _keyword_scorer is None:
+                from scoring_agent.keyword_scorer import KeywordScorer
+                _keyword_scorer = KeywordScorer()
     return _keyword_scorer
 
-def get_verbal_analyzer() -> VerbalAnalyzer:
+def get_verbal_analyzer() -> "VerbalAnalyzer":
     global _verbal_analyzer
     if _verbal_analyzer is None:
-        _verbal_analyzer = VerbalAnalyzer()
+        with _verbal_analyzer_lock:
+            if _verbal_analyzer is None:
+                from verbal_agent.verbal_analyzer import VerbalAnalyzer
+                _verbal_analyzer = VerbalAnalyzer()
     return _verbal_analyzer
 
-# Global Singleton for TTS
+# Global Singleton for TTS (also built from TTS worker threads)
 _tts_engine = None
+_tts_engine_lock = threading.Lock()
 
 def get_tts_engine():
     global _tts_engine
     if _tts_engine is None:
-        # Import here to avoid circular or early import issues
-        from tts_agent.tts_engine import TTSEngine
-        _tts_engine = TTSEngine()
+        with _tts_engine_lock:
+            if _tts_engine is None:
+                # Import here to avoid circular or early import issues
+                from tts_agent.tts_engine import create_tts_engine
+                _tts_engine = create_tts_engine()
     return _tts_engine
 
+# Dedicated TTS worker pool (replies are not queued behind ML work)
+_tts_scheduler = None
+_tts_scheduler_lock = threading.Lock()
+
+def get_tts_scheduler() -> TTSScheduler:
+    global _tts_scheduler
+    if _tts_scheduler is None:
+        with _tts_scheduler_lock:
+            if _tts_scheduler is None:
+                _tts_scheduler = TTSScheduler(get_tts_engine)
+    return _tts_scheduler
+
+def register_warmups(warmup):
+    """Agents loaded (and run once on dummy input) at startup instead of on the first request."""
+    from vocal_agent import features
+    from agents.lazy_loader import lazy_librosa
+    if features.use_librosa():
+        warmup.preload("librosa", lazy_librosa)
+    # 1 s of a quiet 150 Hz tone: passes the energy gate, so pitch and onsets run
+    tone = (0.1 * np.sin(2 * np.pi * 150 * np.arange(16000) / 16000)).astype(np.float32)
+    warmup.add("non_verbal", get_non_verbal_agent, lambda agent: agent.warm_up())
+    warmup.add("vocal", get_vocal_analyzer, lambda analyzer: analyzer.analyze_audio(tone))
+    # Stub answer scored through the same evaluator call as a live answer (temperature 0,
+    # so it is cached and the second of these shares the first one's request)
+    stub = {"question": "What is an API?", "ideal_answer": "An interface between programs.",
+            "answer": "An API lets programs talk to each other."}
+    warmup.add("keyword", get_keyword_scorer, lambda scorer: scorer.extract_and_score(
+        stub["answer"], "cse", question=stub["question"], ideal_answer=stub["ideal_answer"]))
+    warmup.add("verbal", get_verbal_analyzer, lambda analyzer: analyzer.score_answer(
+        stub["answer"], stub["ideal_answer"], question=stub["question"], branch="cse"))
+    warmup.add("tts", get_tts_engine, lambda engine: engine.warm_up())
+    warmup.add("llm_chains", load_chain_modules, lambda _: warm_chains())
+
+def load_chain_modules():
+    """Imports the agents whose LLM chains are not registered by the server's own imports."""
+    import scoring_agent.keyword_scorer  # noqa: F401
+    import verbal_agent.verbal_analyzer  # noqa: F401
+
+def prefetch_upcoming_speech(session_id: str, brain_agent: BrainAgent):
+    """Renders the next dataset question in the background so it plays from the cache."""
+    question = brain_agent.upcoming_question()
+    if question and question.get("text"):
+        get_tts_scheduler().prefetch(session_id, question["text"])
+
+async def send_speech(websocket: WebSocket, session_id: str, text: str, audio_format: str, send_lock: asyncio.Lock):
+    """
+    Synthesises `text` on the TTS scheduler (reply priority) and sends it to the client.
+
+    Legacy "wav": one JSON {"type": "audio"} message with a base64 WAV.
+    "opus"/"mulaw": {"type": "audio_start"}, binary frames as they are encoded
+    (first byte = audio_codec.FRAME_TAGS), then {"type": "audio_end"}; the
+    client starts playback on the first frame.
+    """
+    loop = asyncio.get_running_loop()
+    scheduler = get_tts_scheduler()
+
+    if audio_format == audio_codec.LEGACY_FORMAT:
+        job = asyncio.wrap_future(scheduler.synthesize(session_id, text))
+        await asyncio.wait({job})
+        if job.cancelled():
+            return  # Session went away before the job started
+        audio_bytes = job.result()
+        if audio_bytes:
+            audio_b64 = base64.b64encode(audio_bytes).decode('utf-8')
+            audio_codec.record("wav", len(audio_bytes), len(audio_b64))
+            async with send_lock:
+                await websocket.send_json({"type": "audio", "audio": audio_b64})
+        return
+
+    frames: asyncio.Queue = asyncio.Queue()
+
+    def produce(engine):
+        try:
+            for frame in audio_codec.encode_stream(engine.stream(text), audio_format):
+                if TTSScheduler.cancelled():
+                    break  # Session went away mid-utterance
+                loop.call_soon_threadsafe(frames.put_nowait, frame)
+        finally:
+            loop.call_soon_threadsafe(frames.put_nowait, None)
+
+    producer = asyncio.wrap_future(scheduler.submit(session_id, produce))
+    utterance_id = uuid.uuid4().hex[:12]
+    sent_frames = 0
+    sent_bytes = 0
+    # One utterance at a time per socket, so frames of two replies never interleave
+    async with send_lock:
+        await websocket.send_json({
+            "type": "audio_start",
+            "id": utterance_id,
+            "format": audio_format,
+            "mime": audio_codec.MIME_TYPES[audio_format],
+            "sample_rate": audio_codec.MULAW_SAMPLE_RATE if audio_format == "mulaw" else None
+        })
+        while True:
+            if producer.done():
+                # Everything the producer queued is already in `frames`. A job the
+                # scheduler dropped before it started never queues the None sentinel.
+                frame = frames.get_nowait() if not frames.empty() else None
+            else:
+                getter = asyncio.ensure_future(frames.get())
+                await asyncio.wait({getter, producer}, return_when=asyncio.FIRST_COMPLETED)
+                if not getter.done():
+                    getter.cancel()
+                    continue
+                frame = getter.result()
+            if frame is None:
+                break
+            await websocket.send_bytes(frame)
+            sent_frames += 1
+            sent_bytes += len(frame)
+        await websocket.send_json({"type": "audio_end", "id": utterance_id, "frames": sent_frames, "bytes": sent_bytes})
+    if not producer.cancelled():
+        await producer
+
 # ===== WEBSOCKET CONNECTION MANAGER =====
 
 class ConnectionManager:
@@ -186,10 +354,15 @@ async def register_candidate(
     if resume:
         try:
             content = await resume.read()
+            from resume_parser import ResumeParser
             resume_text = ResumeParser.extract_text(content, resume.filename)
             print(f"Resume text extracted: {len(resume_text)} chars")
         except Exception as e:
             print(f"Resume parsing failed: {e}")
+
+    if resume_text:
+        # Start generating resume questions now; the interview picks them up later
+        get_resume_prefetcher().prefetch(resume_text)
             
     candidate_data = {
         "name": name, 
@@ -235,6 +408,110 @@ async def health_check():
         "active_connections": len(manager.active_connections)
     }
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 503 until the startup warm-up has finished"""
+    status = get_warmup().status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@app.get("/metrics")
+async def metrics():
+    """Runtime performance counters"""
+    from non_verbal_agent.frame_gate import frame_gate_stats
+    from non_verbal_agent.emotion_service import emotion_service_stats
+    return {
+        "llm_cache": get_llm_cache().stats(),
+        "llm_gateway": get_llm_gateway().stats(),
+        "llm_chains": chain_stats(),
+        "question_bank": question_bank_stats(),
+        "resume_prefetch": get_resume_prefetcher().stats(),
+        "branch_classifier": branch_classifier_stats(),
+        "tts_cache": get_tts_audio_cache().stats(),
+        "tts_audio": audio_codec.codec_stats(),
+        "tts_scheduler": get_tts_scheduler().stats(),
+        "pitch_batcher": pitch_batcher_stats(),
+        "vocal_gate": vocal_gate_stats(),
+        "frame_gate": frame_gate_stats(),
+        "emotion_service": emotion_service_stats(),
+        "lazy_modules": lazy_module_stats(),
+        "warmup": get_warmup().status(),
+        "jobs": job_queue.stats() if job_queue is not None else None,
+        "report_cache": get_report_cache().stats()
+    }
+
+@app.get("/jobs/{session_id}")
+async def get_session_jobs(session_id: str):
+    """Status of the report/email jobs of one session"""
+    if job_queue is None:
+        return JSONResponse({"error": "Job queue not running"}, status_code=503)
+    jobs = await job_queue.get_jobs(session_id)
+    if not jobs:
+        return JSONResponse({"error": "No jobs for this session"}, status_code=404)
+    return {"session_id": session_id, "jobs": jobs}
+
+async def load_report_source(session_id: str):
+    """
+    (session, candidate) to render a report from: the saved session, or the copy
+    queued with its report job when the database is offline. (None, None) if unknown.
+    """
+    session = await store.get_session(session_id)
+    if session is not None:
+        candidate = await store.get_candidate(session.get("candidate_id")) or {}
+        return session, candidate
+    for job in await store.get_jobs(session_id):
+        payload = job.get("payload") or {}
+        if payload.get("session"):
+            return payload["session"], payload.get("candidate") or {}
+    return None, None
+
+@app.get("/reports/{session_id}")
+async def get_session_report(session_id: str, request: Request):
+    """Interview report PDF, rendered on demand and cached per score version (ETag + Range)"""
+    if store is None:
+        return JSONResponse({"error": "Store not initialized"}, status_code=503)
+    try:
+        session, candidate = await load_report_source(session_id)
+    except Exception as e:
+        logger.error(f"Report lookup failed for {session_id}: {e}")
+        return JSONResponse({"error": str(e)}, status_code=500)
+    if session is None:
+        return JSONResponse({"error": "Session not found"}, status_code=404)
+
+    version = score_version(session)
+    etag = f'"{version}"'
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, no-cache",
+        "Content-Disposition": f'inline; filename="report_{session_id}.pdf"',
+    }
+    # Unchanged since the client's copy: no render, no body
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    from report_generator import generate_pdf_report
+    loop = asyncio.get_running_loop()
+    pdf = await get_report_cache().get_or_render(
+        session_id, version,
+        lambda: loop.run_in_executor(None, generate_pdf_report, candidate, session)
+    )
+    if not pdf:
+        return JSONResponse({"error": "Report generation failed"}, status_code=500)
+
+    # A Range is only honoured for the version the client already has part of
+    if_range = request.headers.get("if-range")
+    span = None
+    if if_range is None or etag_matches(if_range, etag):
+        try:
+            span = byte_range(request.headers.get("range"), len(pdf))
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{len(pdf)}"})
+    if span is None:
+        return Response(pdf, media_type="application/pdf", headers=headers)
+    start, end = span
+    return Response(pdf[start:end + 1], status_code=206, media_type="application/pdf",
+                    headers={**headers, "Content-Range": f"bytes {start}-{end}/{len(pdf)}"})
+
 # ===== ADMIN ENDPOINTS =====
 @app.get("/admin/sessions")
 async def get_all_sessions():
@@ -286,10 +563,11 @@ async def get_all_candidates():
 # ===== WEBSOCKET ENDPOINT =====
 
 @app.websocket("/ws/interview")
-async def websocket_endpoint(websocket: WebSocket, candidate_id: str = None):
+async def websocket_endpoint(websocket: WebSocket, candidate_id: str = None, audio: str = None):
     """
     Main WebSocket endpoint for real-time interview processing
     Handles video frames, audio chunks, and interview events
+    `audio` lists the speech formats the client accepts, best first (e.g. "opus,mulaw").
     """
     client_id = f"client_{id(websocket)}"
     await manager.connect(websocket, client_id)
@@ -309,14 +587,27 @@ async def websocket_endpoint(websocket: WebSocket, candidate_id: str = None):
     transcript_buffer = []
     non_verbal_scores = []
     vocal_scores = []
+    vocal_chunk_counts = {"voiced": 0, "silent": 0}
+    # Skips emotion inference on frames without a face or without change
+    from non_verbal_agent.frame_gate import FrameGate
+    from non_verbal_agent.frame_preprocessor import FramePreprocessor
+    frame_gate = FrameGate()
+    frame_preprocessor = FramePreprocessor()
     keyword_results = []
+    semantic_scores = []
     
     # Session Timing
     start_time = time.time()
+
+    # Speech transport (negotiated; can be changed with an "audio_config" message)
+    audio_prefs = {"format": audio_codec.negotiate(audio)}
+    audio_send_lock = asyncio.Lock()
     
     # Audio Buffer for Transcription
     # Changed SILENCE_LIMIT to 3 (Approx 1.5s latency) for responsive but robust detection
     audio_buffer_np = np.array([], dtype=np.float32)
+    # Vocal features are extracted incrementally; overlap state carries across chunks
+    vocal_stream = StreamingVocalExtractor(sample_rate=16000, pitch_batcher=get_pitch_batcher())
     silence_chunks = 0
     IS_SPEAKING_THRESHOLD = -35.0 # dB - Adjusted: matches user background noise profile (~-40dB silence)
     SILENCE_LIMIT = 3 # 1.5 seconds of silence required to trigger
@@ -348,6 +639,7 @@ async def websocket_endpoint(websocket: WebSocket, candidate_id: str = None):
         if keyword_results:
              kw_scores = [k.get('keyword_score', 0) for k in keyword_results]
              mean_keyword = float(np.mean(kw_scores)) if kw_scores else 0.0
+        mean_semantic = float(np.mean(semantic_scores)) if semantic_scores else 0.0
              
         # Weighted Score
         final_score = (0.4 * mean_nv) + (0.2 * mean_vocal) + (0.4 * mean_keyword)
@@ -356,11 +648,14 @@ async def websocket_endpoint(websocket: WebSocket, candidate_id: str = None):
             "non_verbal_score": round(mean_nv, 1), 
             "vocal_score": round(mean_vocal, 1),
             "keyword_score": round(mean_keyword, 1),
+            "semantic_score": round(mean_semantic, 1),
             "final_score": round(final_score, 1)
         }
         
         print(f"--- SAVING SESSION [{client_id}] ---")
         print(f"Scores collected: NV={len(non_verbal_scores)}, Vocal={len(vocal_scores)}, Keywords={len(keyword_results)}")
+        print(f"Audio chunks: voiced={vocal_chunk_counts['voiced']}, silent={vocal_chunk_counts['silent']}")
+        print(f"Video frames: {frame_gate.summary()} | Decode/tracking: {frame_preprocessor.stats}")
         print(f"Final Scores: {scores_data}")
         
         if store and candidate_id:
@@ -378,16 +673,45 @@ async def websocket_endpoint(websocket: WebSocket, candidate_id: str = None):
                 "completed": not is_aborted,
                 "saved_at": time.time() # Use timestamp usually handled by DB, but good to preserve
             }
+            # add_session adds Mongo fields to the dict; the report job gets a clean copy
+            report_session = dict(session_data)
             try:
                 await store.add_session(session_data)
                 logger.info(f"Session saved successfully via {'Abortion' if is_aborted else 'Normal End'}")
             except Exception as e:
                 logger.error(f"Failed to save session: {e}")
 
+            # PDF report + email happen in the job queue, off the interview's event loop
+            if job_queue is not None:
+                try:
+                    candidate = await store.get_candidate(candidate_id) or {}
+                    job = await job_queue.enqueue_report(report_session, candidate)
+                    logger.info(f"Report job {job['job_id']} queued ({job['status']})")
+                except Exception as e:
+                    logger.error(f"Failed to queue report job: {e}")
+
+    # Keyword scoring for one answer. When the answer responds to a known question,
+    # the merged evaluator scores keywords and semantics in one LLM call.
+    async def score_answer_keywords(full_transcript, answer_text, answered_question):
+        branch = (brain_agent.selected_branch or "cse").lower()
+        if answered_question and answered_question.get("ideal_answer"):
+            kw_result = await get_keyword_scorer().aextract_and_score(
+                answer_text,
+                branch,
+                question=answered_question.get("text"),
+                ideal_answer=answered_question.get("ideal_answer"),
+                executor=ml_executor
+            )
+            if 'semantic_score' in kw_result:
+                semantic_scores.append(float(kw_result['semantic_score']))
+            return kw_result
+        return await get_keyword_scorer().aextract_and_score(full_transcript, "cse", executor=ml_executor)
+
     # Helper for background transcription execution
     async def run_background_transcription(audio_data, current_sr):
         try:
             temp_filename = f"temp_transcribe_{client_id}_{int(time.time()*1000)}.wav"
+            import soundfile as sf
             sf.write(temp_filename, audio_data, samplerate=current_sr)
             
             logger.info("Audio chunk sent for transcription (Background)")
@@ -406,6 +730,7 @@ async def websocket_endpoint(websocket: WebSocket, candidate_id: str = None):
             
             if transcribed_text and len(transcribed_text.strip()) > 1:
                 print(f"User Said: {transcribed_text}")
+                answered_question = brain_agent.current_question
                 
                 # Update buffers
                 transcript_buffer.append(transcribed_text)
@@ -421,34 +746,19 @@ async def websocket_endpoint(websocket: WebSocket, candidate_id: str = None):
                 full_trans = " ".join(transcript_buffer)
                 if len(full_trans) > 1:
                     try:
-                        kw_result = await loop.run_in_executor(
-                            ml_executor,
-                            get_keyword_scorer().extract_and_score,
-                            full_trans,
-                            "cse"
-                        )
+                        kw_result = await score_answer_keywords(full_trans, transcribed_text, answered_question)
                         keyword_results.append(kw_result)
                     except Exception as e:
                         logger.error(f"Keyword error: {e}")
                 
                 # Brain Response
                 try:
-                    ai_text = brain_agent.get_response(transcribed_text)
+                    ai_text = await brain_agent.aget_response(transcribed_text)
                     await websocket.send_json({"type": "text", "ai_text": ai_text})
                     
-                    # TTS
-                    audio_path = await loop.run_in_executor(
-                        ml_executor,
-                        get_tts_engine().speak,
-                        ai_text
-                    )
-                    
-                    if audio_path and os.path.exists(audio_path):
-                         with open(audio_path, "rb") as f:
-                             audio_b64 = base64.b64encode(f.read()).decode('utf-8')
-                         await websocket.send_json({"type": "audio", "audio": audio_b64})
-                         try: os.remove(audio_path)
-                         except: pass
+                    # TTS (cached prompts come straight from the audio cache)
+                    await send_speech(websocket, client_id, ai_text, audio_prefs["format"], audio_send_lock)
+                    prefetch_upcoming_speech(client_id, brain_agent)
                 except Exception as e:
                     logger.error(f"Brain/TTS Error: {e}")
                     
@@ -457,7 +767,7 @@ async def websocket_endpoint(websocket: WebSocket, candidate_id: str = None):
                 
     # Initial Greeting
     try:
-        initial_msg = brain_agent.get_response("start")
+        initial_msg = await brain_agent.aget_response("start")
         await websocket.send_json({"type": "text", "ai_text": initial_msg})
     except Exception as e:
         logger.error(f"Brain init error: {e}")
@@ -487,20 +797,25 @@ async def websocket_endpoint(websocket: WebSocket, candidate_id: str = None):
                 frame_base64 = data.get("frame")
                 if frame_base64:
                     try:
-                        # Decode base64 frame
+                        # Decode base64 frame (reduced-scale JPEG decode + face tracking, off the event loop)
                         frame_bytes = base64.b64decode(frame_base64)
-                        frame_array = np.frombuffer(frame_bytes, dtype=np.uint8)
-                        frame = cv2.imdecode(frame_array, cv2.IMREAD_COLOR)
-                        
-                        # ✅ RUN NON-VERBAL ANALYSIS IN THREAD POOL
                         loop = asyncio.get_event_loop()
-                        nv_result = await loop.run_in_executor(
-                            ml_executor,
-                            get_non_verbal_agent().analyze_frame,
-                            frame
+                        prepared = await loop.run_in_executor(ml_executor, frame_preprocessor.prepare, frame_bytes)
+                        if prepared is None:
+                            logger.error("Video frame could not be decoded")
+                            continue
+                        
+                        # ✅ NON-VERBAL ANALYSIS: emotion batches are awaited; DeepFace runs in the thread pool
+                        nv_result = await get_non_verbal_agent().aanalyze_frame(
+                            prepared.image,
+                            frame_gate,
+                            prepared,
+                            executor=ml_executor
                         )
                         
-                        if nv_result.get('success'):
+                        if nv_result.get('skipped') == "no_face":
+                            pass # No face in view: not scored
+                        elif nv_result.get('success'):
                             # Ensure we append a float, not a dict
                             score = nv_result.get('confidence_score', 0)
                             if score is not None:
@@ -518,6 +833,7 @@ async def websocket_endpoint(websocket: WebSocket, candidate_id: str = None):
                             "eye_contact": round(nv_result.get('eye_contact', 0), 2),
                             "posture_score": round(nv_result.get('posture_score', 0), 2),
                             "aggregate_score": round(nv_result.get('aggregate_score', 0), 2),
+                            "face_detected": nv_result.get('skipped') != "no_face",
                             "success": nv_result.get('success', False)
                         })
                     
@@ -557,18 +873,22 @@ async def websocket_endpoint(websocket: WebSocket, candidate_id: str = None):
                             print("FFmpeg produced empty audio chunk")
                             continue
 
-                        # 2. RUN VOCAL ANALYSIS (on decoded PCM)
+                        # 2. RUN VOCAL ANALYSIS (on decoded PCM, incremental per session)
                         loop = asyncio.get_event_loop()
                         v_result = await loop.run_in_executor(
                             ml_executor,
-                            get_vocal_analyzer().analyze_audio,
+                            vocal_stream.push,
                             y_chunk
                         )
                         
                         # Debug Loudness
                         # print(f"Loudness: {v_result.get('loudness_db')} dB")
 
-                        if v_result.get('success'):
+                        if v_result.get('silent'):
+                            # Gated: silence is counted, not scored
+                            vocal_chunk_counts["silent"] += 1
+                        elif v_result.get('success'):
+                            vocal_chunk_counts["voiced"] += 1
                             score = v_result.get('confidence_score', 0)
                             if score is not None:
                                 vocal_scores.append(float(score))
@@ -580,9 +900,10 @@ async def websocket_endpoint(websocket: WebSocket, candidate_id: str = None):
                         await websocket.send_json({
                             "type": "audio_analysis",
                             "pitch_hz": v_result.get('pitch_hz', 0),
-                            "confidence_score": round(v_result.get('confidence_score', 0), 2),
+                            "confidence_score": None if v_result.get('confidence_score') is None else round(v_result['confidence_score'], 2),
                             "loudness_db": v_result.get('loudness_db', 0),
                             "speech_rate": v_result.get('speech_rate', 0),
+                            "silent": v_result.get('silent', False),
                             "success": v_result.get('success', False)
                         })
 
@@ -599,6 +920,7 @@ async def websocket_endpoint(websocket: WebSocket, candidate_id: str = None):
                                     logger.warning("Audio buffer exceeded limit, resetting")
                                     audio_buffer_np = np.array([], dtype=np.float32)
                                     silence_chunks = 0
+                                    await vocal_stream.aend_utterance()
                                     continue
                                 
                                 # Silence Detection Logic
@@ -633,46 +955,41 @@ async def websocket_endpoint(websocket: WebSocket, candidate_id: str = None):
                                     # Launch Background Task
                                     asyncio.create_task(run_background_transcription(current_buffer, sr_chunk))
 
+                                    # Per-utterance vocal summary (end of speech)
+                                    utterance = await vocal_stream.aend_utterance()
+                                    await websocket.send_json({"type": "utterance_analysis", **utterance})
+
                         except Exception as inner_e:
                             logger.error(f"Buffering/Transcription error: {inner_e}")
 
                     except Exception as e:
                         logger.error(f"Audio processing error: {str(e)}")
 
+            # ===== SPEECH FORMAT NEGOTIATION =====
+            elif data_type == "audio_config":
+                audio_prefs["format"] = audio_codec.negotiate(data.get("formats"))
+                await websocket.send_json({
+                    "type": "audio_config",
+                    "format": audio_prefs["format"],
+                    "supported": audio_codec.supported_formats()
+                })
+
             # ===== TRANSCRIPT / TEXT PROCESSING =====
             elif "text" in data or data_type == "transcript":
                 user_text = data.get("text", "")
                 if user_text:
                     transcript_buffer.append(user_text)
+                    answered_question = brain_agent.current_question
                     
                     # 1. Get Brain Response
                     try:
-                        ai_text = brain_agent.get_response(user_text)
+                        ai_text = await brain_agent.aget_response(user_text)
                         await websocket.send_json({"type": "text", "ai_text": ai_text})
 
                         # GENERATE SPEECH (TTS)
                         try:
-                            loop = asyncio.get_event_loop()
-                            audio_path = await loop.run_in_executor(
-                                ml_executor,
-                                get_tts_engine().speak,
-                                ai_text
-                            )
-                            
-                            if audio_path and os.path.exists(audio_path):
-                                with open(audio_path, "rb") as audio_file:
-                                    audio_bytes = audio_file.read()
-                                    audio_b64 = base64.b64encode(audio_bytes).decode('utf-8')
-                                    
-                                # Send Audio to UI
-                                await websocket.send_json({
-                                    "type": "audio",
-                                    "audio": audio_b64
-                                })
-                                
-                                # Cleanup
-                                try: os.remove(audio_path)
-                                except: pass
+                            await send_speech(websocket, client_id, ai_text, audio_prefs["format"], audio_send_lock)
+                            prefetch_upcoming_speech(client_id, brain_agent)
                         except Exception as tts_e:
                             logger.error(f"TTS Error: {tts_e}")
                     except Exception as e:
@@ -682,13 +999,7 @@ async def websocket_endpoint(websocket: WebSocket, candidate_id: str = None):
                     full_transcript = " ".join(transcript_buffer)
                     if len(full_transcript) > 1: # Reduced threshold to capture short answers like "AI", "CSE"
                         try:
-                            loop = asyncio.get_event_loop()
-                            kw_result = await loop.run_in_executor(
-                                ml_executor,
-                                get_keyword_scorer().extract_and_score,
-                                full_transcript,
-                                "cse" 
-                            )
+                            kw_result = await score_answer_keywords(full_transcript, user_text, answered_question)
                             
                             keyword_results.append(kw_result)
                             print(f"DEBUG KEYWORD SCORE: {kw_result.get('keyword_score')}")
@@ -722,6 +1033,7 @@ async def websocket_endpoint(websocket: WebSocket, candidate_id: str = None):
                     mean_vocal = float(np.mean(vocal_scores)) if vocal_scores else 0.0
                     kw_scores = [k.get('keyword_score', 0) for k in keyword_results]
                     mean_keyword = float(np.mean(kw_scores)) if kw_scores else 0.0
+                    mean_semantic = float(np.mean(semantic_scores)) if semantic_scores else 0.0
                     final_score = (0.4 * mean_nv) + (0.2 * mean_vocal) + (0.4 * mean_keyword)
                     
                     await websocket.send_json({
@@ -730,6 +1042,7 @@ async def websocket_endpoint(websocket: WebSocket, candidate_id: str = None):
                             "non_verbal_score": round(mean_nv, 1), 
                             "vocal_score": round(mean_vocal, 1),
                             "keyword_score": round(mean_keyword, 1),
+                            "semantic_score": round(mean_semantic, 1),
                             "final_score": round(final_score, 1) 
                         }
                     })
@@ -740,6 +1053,11 @@ async def websocket_endpoint(websocket: WebSocket, candidate_id: str = None):
     except Exception as e:
         logger.error(f"WebSocket error: {str(e)}")
 
+    finally:
+        # Nobody is listening any more: drop queued speech for this session
+        if _tts_scheduler is not None:
+            _tts_scheduler.cancel_session(client_id)
+
 # ===== MAIN EXECUTION =====
 if __name__ == "__main__":
     import uvicorn
@@ -15,6 +15,8 @@ class InterviewStore:
     def __init__(self):
         self.client = None
         self.db = None
+        # Background jobs (job_queue.py) live in the `jobs` collection, or here without MongoDB
+        self._memory_jobs = {}
         if MONGO_URI:
             try:
                 self.client = AsyncIOMotorClient(
@@ -68,6 +70,118 @@ class InterviewStore:
         await self.db.sessions.insert_one(session_data)
         print(f"Session {session_data.get('session_id')} saved to MongoDB.")
 
+    async def get_session(self, session_id: str) -> dict:
+        """Latest saved session with this id, or None (always None without MongoDB)."""
+        if self.db is None:
+            return None
+        return await self.db.sessions.find_one({"session_id": session_id}, sort=[("saved_at", -1)])
+
+    async def iter_sessions(self, after_id: str = None, query: dict = None, batch_size: int = 200):
+        """
+        Streams saved sessions in `_id` order through a cursor, starting after
+        `after_id` (to resume a pass). Yields nothing without MongoDB.
+        """
+        if self.db is None:
+            return
+        from bson.objectid import ObjectId
+        criteria = dict(query or {})
+        if after_id:
+            criteria["_id"] = {"$gt": ObjectId(after_id)}
+        cursor = self.db.sessions.find(criteria).sort("_id", 1).batch_size(batch_size)
+        async for session in cursor:
+            yield session
+
+    async def get_candidates(self, candidate_ids) -> dict:
+        """Candidates by id string, in one query; unknown or malformed ids are left out."""
+        if self.db is None:
+            return {}
+        from bson.objectid import ObjectId
+        object_ids = [ObjectId(i) for i in set(candidate_ids) if i and ObjectId.is_valid(i)]
+        if not object_ids:
+            return {}
+        cursor = self.db.candidates.find({"_id": {"$in": object_ids}})
+        return {str(candidate["_id"]): candidate async for candidate in cursor}
+
+    # ===== Background jobs =====
+    # Documents are keyed by their idempotency key (`_id`), so enqueueing the
+    # same work twice returns the existing job instead of a duplicate.
+
+    async def ensure_job_indexes(self):
+        if self.db is None:
+            return
+        try:
+            await self.db.jobs.create_index([("status", 1), ("next_attempt_at", 1)])
+            await self.db.jobs.create_index("session_id")
+        except Exception as e:
+            print(f"MongoDB Error creating job indexes: {e}")
+
+    async def insert_job(self, job: dict):
+        """Inserts a job unless one with the same `_id` exists; returns (stored job, inserted)."""
+        if self.db is None:
+            if job["_id"] in self._memory_jobs:
+                return dict(self._memory_jobs[job["_id"]]), False
+            self._memory_jobs[job["_id"]] = dict(job)
+            return dict(job), True
+        from pymongo.errors import DuplicateKeyError
+        try:
+            await self.db.jobs.insert_one(dict(job))
+            return job, True
+        except DuplicateKeyError:
+            return await self.db.jobs.find_one({"_id": job["_id"]}), False
+
+    async def claim_job(self, now: float, worker: str, lease_seconds: float) -> dict:
+        """
+        Atomically takes the next due job (or one whose worker's lease ran out)
+        and marks it running; returns None if nothing is due.
+        """
+        update = {"status": "running", "worker": worker, "lease_until": now + lease_seconds, "updated_at": now}
+        if self.db is None:
+            due = [j for j in self._memory_jobs.values() if _claimable(j, now)]
+            if not due:
+                return None
+            job = min(due, key=lambda j: j["next_attempt_at"])
+            job.update(update)
+            job["attempts"] = job.get("attempts", 0) + 1
+            return dict(job)
+        from pymongo import ReturnDocument
+        return await self.db.jobs.find_one_and_update(
+            {"$or": [
+                {"status": {"$in": ["queued", "retry"]}, "next_attempt_at": {"$lte": now}},
+                {"status": "running", "lease_until": {"$lt": now}},
+            ]},
+            {"$set": update, "$inc": {"attempts": 1}},
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def update_job(self, job_id: str, fields: dict):
+        if self.db is None:
+            if job_id in self._memory_jobs:
+                self._memory_jobs[job_id].update(fields)
+            return
+        await self.db.jobs.update_one({"_id": job_id}, {"$set": fields})
+
+    async def get_jobs(self, session_id: str) -> list:
+        if self.db is None:
+            return [dict(j) for j in self._memory_jobs.values() if j.get("session_id") == session_id]
+        return await self.db.jobs.find({"session_id": session_id}).to_list(length=None)
+
+    async def count_jobs(self) -> dict:
+        """Number of jobs per status."""
+        if self.db is None:
+            counts = {}
+            for job in self._memory_jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+            return counts
+        rows = await self.db.jobs.aggregate([{"$group": {"_id": "$status", "n": {"$sum": 1}}}]).to_list(length=None)
+        return {row["_id"]: row["n"] for row in rows}
+
     # Legacy method support (optional, can be removed if not used)
     def save_history_blocking(self, history):
         pass
+
+
+def _claimable(job: dict, now: float) -> bool:
+    if job["status"] in ("queued", "retry"):
+        return job["next_attempt_at"] <= now
+    return job["status"] == "running" and job.get("lease_until", 0) < now
@@ -0,0 +1,231 @@
+import sys
+import os
+import time
+import email
+import asyncio
+import tempfile
+import threading
+import socketserver
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# In-memory job store, fast retries
+os.environ["MONGO_URI"] = ""
+os.environ.setdefault("JOB_BACKOFF_BASE_S", "0.05")
+
+import email_service
+from store import InterviewStore
+from job_queue import JobQueue, SendRateLimiter, DONE, FAILED
+
+
+class FakeSMTPServer:
+    """
+    Plain-text SMTP stand-in on 127.0.0.1 (no TLS, no auth).
+    `fail_data` answers the next N DATA commands with 451 (relay throttling);
+    recipients in `refuse` get 550. Accepted messages are kept in `messages`.
+    """
+    def __init__(self, fail_data=0, refuse=()):
+        self.fail_data = fail_data
+        self.refuse = set(refuse)
+        self.messages = []
+        self.received_at = []
+        self.data_commands = 0
+        self._lock = threading.Lock()
+        self.server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), self._make_handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def _make_handler(self):
+        smtp = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                self.wfile.write((line + "\r\n").encode())
+
+            def handle(self):
+                self.reply("220 fake-smtp ready")
+                recipients = []
+                while True:
+                    line = self.rfile.readline().decode(errors="replace").strip()
+                    if not line:
+                        return
+                    command = line.split(" ", 1)[0].upper()
+                    if command == "EHLO":
+                        self.reply("250-fake-smtp")
+                        self.reply("250 8BITMIME")
+                    elif command == "HELO" or command == "NOOP" or command == "RSET":
+                        recipients = [] if command == "RSET" else recipients
+                        self.reply("250 OK")
+                    elif command == "MAIL":
+                        recipients = []
+                        self.reply("250 OK")
+                    elif command == "RCPT":
+                        address = line.split(":", 1)[1].strip().strip("<>").split(">")[0]
+                        if address in smtp.refuse:
+                            self.reply("550 5.1.1 No such user")
+                        else:
+                            recipients.append(address)
+                            self.reply("250 OK")
+                    elif command == "DATA":
+                        with smtp._lock:
+                            smtp.data_commands += 1
+                            throttled = smtp.fail_data > 0
+                            if throttled:
+                                smtp.fail_data -= 1
+                        if throttled:
+                            self.reply("451 4.7.1 Try again later")
+                            continue
+                        self.reply("354 End data with <CR><LF>.<CR><LF>")
+                        lines = []
+                        while True:
+                            data = self.rfile.readline()
+                            if data in (b".\r\n", b".\n", b""):
+                                break
+                            lines.append(data[1:] if data.startswith(b"..") else data)
+                        with smtp._lock:
+                            smtp.messages.append(email.message_from_bytes(b"".join(lines)))
+                            smtp.received_at.append(time.monotonic())
+                        self.reply("250 OK queued")
+                    elif command == "QUIT":
+                        self.reply("221 Bye")
+                        return
+                    else:
+                        self.reply("502 Command not implemented")
+
+        return Handler
+
+    def __enter__(self):
+        self.thread.start()
+        email_service.SMTP_HOST = "127.0.0.1"
+        email_service.SMTP_PORT = self.port
+        email_service.SMTP_SSL = False
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _session(session_id):
+    return {
+        "candidate_id": "cand-1",
+        "session_id": session_id,
+        "scores": {"final_score": 72.5},
+        "transcript": "I would use a hash map.",
+        "duration_seconds": 300,
+        "completed": True,
+        "saved_at": time.time(),
+    }
+
+
+CANDIDATE = {"name": "Test Candidate", "email": "candidate@example.com", "branch": "cse"}
+
+
+async def _wait_for(queue, session_id, statuses=(DONE, FAILED), timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        jobs = await queue.get_jobs(session_id)
+        if jobs and jobs[0]["status"] in statuses:
+            return jobs[0]
+        await asyncio.sleep(0.02)
+    raise AssertionError(f"Job for {session_id} did not finish: {await queue.get_jobs(session_id)}")
+
+
+def _run(test, **queue_args):
+    async def main():
+        reports_dir = tempfile.mkdtemp(prefix="reports_")
+        queue = JobQueue(InterviewStore(), reports_dir=reports_dir, poll_seconds=0.05, **queue_args)
+        await queue.start()
+        try:
+            await test(queue)
+        finally:
+            await queue.stop()
+    asyncio.run(main())
+
+
+def test_report_rendered_and_emailed():
+    with FakeSMTPServer() as smtp:
+        async def check(queue):
+            await queue.enqueue_report(_session("s-1"), CANDIDATE)
+            job = await _wait_for(queue, "s-1")
+            assert job["status"] == DONE, job
+            assert job["steps"]["email"] == "sent"
+            assert os.path.exists(job["steps"]["report_path"])
+            assert len(smtp.messages) == 1
+            message = smtp.messages[0]
+            assert message["To"] == CANDIDATE["email"]
+            attachments = [part for part in message.walk() if part.get_content_type() == "application/pdf"]
+            assert len(attachments) == 1 and attachments[0].get_payload(decode=True).startswith(b"%PDF")
+        _run(check)
+
+
+def test_idempotent_per_session():
+    with FakeSMTPServer() as smtp:
+        async def check(queue):
+            first = await queue.enqueue_report(_session("s-2"), CANDIDATE)
+            second = await queue.enqueue_report(_session("s-2"), CANDIDATE)
+            assert first["job_id"] == second["job_id"]
+            await _wait_for(queue, "s-2")
+            # A late duplicate after completion does not send again either
+            await queue.enqueue_report(_session("s-2"), CANDIDATE)
+            await asyncio.sleep(0.2)
+            assert len(await queue.get_jobs("s-2")) == 1
+            assert len(smtp.messages) == 1
+            assert queue.stats()["duplicates"] == 2
+        _run(check)
+
+
+def test_retries_with_backoff_when_relay_throttles():
+    with FakeSMTPServer(fail_data=2) as smtp:
+        async def check(queue):
+            await queue.enqueue_report(_session("s-3"), CANDIDATE)
+            job = await _wait_for(queue, "s-3")
+            assert job["status"] == DONE, job
+            assert job["attempts"] == 3
+            assert smtp.data_commands == 3 and len(smtp.messages) == 1
+            stats = queue.stats()
+            # The PDF is rendered once; only the email step is retried
+            assert stats["reports_rendered"] == 1 and stats["retried"] == 2 and stats["throttled"] == 2
+        _run(check, rate_limiter=SendRateLimiter(per_minute=6000))
+
+
+def test_permanent_rejection_is_not_retried():
+    with FakeSMTPServer(refuse={"nobody@example.com"}) as smtp:
+        async def check(queue):
+            await queue.enqueue_report(_session("s-4"), dict(CANDIDATE, email="nobody@example.com"))
+            job = await _wait_for(queue, "s-4")
+            assert job["status"] == FAILED and job["attempts"] == 1, job
+            assert "PermanentJobError" in job["last_error"]
+            assert not smtp.messages
+        _run(check)
+
+
+def test_email_rate_limit():
+    with FakeSMTPServer() as smtp:
+        async def check(queue):
+            sessions = [f"s-rate-{i}" for i in range(5)]
+            for session_id in sessions:
+                await queue.enqueue_report(_session(session_id), CANDIDATE)
+            for session_id in sessions:
+                await _wait_for(queue, session_id)
+            gaps = [b - a for a, b in zip(smtp.received_at, smtp.received_at[1:])]
+            assert len(smtp.messages) == 5
+            # 600/min = one email per 100 ms, whatever the number of workers: each send starts
+            # 100 ms after the previous one was acknowledged, so this does not depend on scheduling
+            assert min(gaps) >= 0.1, gaps
+        _run(check, workers=4, rate_limiter=SendRateLimiter(per_minute=600))
+
+
+if __name__ == "__main__":
+    for test in [test_report_rendered_and_emailed, test_idempotent_per_session,
+                 test_retries_with_backoff_when_relay_throttles, test_permanent_rejection_is_not_retried,
+                 test_email_rate_limit]:
+        started = time.perf_counter()
+        test()
+        print(f"✅ {test.__name__} ({time.perf_counter() - started:.2f}s)")
+    print("All job queue tests passed.")
@@ -0,0 +1,186 @@
+import sys
+import os
+import json
+import time
+import asyncio
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+from agents.llm_cache import LLMResponseCache
+import agents.llm_cache as llm_cache
+from agents.llm_gateway import LLMGateway
+
+
+class FakeGroqServer:
+    """
+    Minimal OpenAI-compatible chat completions endpoint (the path ChatGroq posts to).
+    Adds `latency` seconds per request and tracks request/concurrency counts.
+    """
+    def __init__(self, latency=0.2):
+        self.latency = latency
+        self.requests = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with server._lock:
+                    server.requests += 1
+                    server.active += 1
+                    server.max_active = max(server.max_active, server.active)
+                try:
+                    time.sleep(server.latency)
+                    prompt = body["messages"][-1]["content"]
+                    payload = json.dumps({
+                        "id": f"chatcmpl-{server.requests}",
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": body.get("model", "fake"),
+                        "choices": [{
+                            "index": 0,
+                            "message": {"role": "assistant", "content": f"echo: {prompt}"},
+                            "finish_reason": "stop"
+                        }],
+                        "usage": {"prompt_tokens": 5, "completion_tokens": 3, "total_tokens": 8}
+                    }).encode("utf-8")
+                finally:
+                    with server._lock:
+                        server.active -= 1
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+PROMPT = ChatPromptTemplate.from_template("Say {word}")
+
+
+@contextmanager
+def _gateway(server, **kwargs):
+    # Fresh cache per test so results do not leak between cases; the process-wide one is put back after
+    saved = llm_cache._llm_cache
+    llm_cache._llm_cache = LLMResponseCache(disk_dir=None)
+    gateway = LLMGateway(api_key="test-key", base_url=server.base_url, **kwargs)
+    try:
+        yield gateway
+    finally:
+        gateway.close()
+        llm_cache._llm_cache = saved
+
+
+async def _fan_out(gateway, words, site="test.site", temperature=0.3):
+    return await asyncio.gather(*[
+        gateway.ainvoke(site, PROMPT, StrOutputParser(), {"word": w}, temperature=temperature)
+        for w in words
+    ])
+
+
+def test_roundtrip_and_cache():
+    with FakeGroqServer(latency=0.05) as server, _gateway(server) as gateway:
+        first = gateway.invoke("test.cached", PROMPT, StrOutputParser(), {"word": "hi"})
+        second = gateway.invoke("test.cached", PROMPT, StrOutputParser(), {"word": "hi"})
+        assert first == second == "echo: Say hi"
+        assert server.requests == 1, "temperature-0 call should be served from cache"
+        assert gateway.stats()["cache_hits"] == 1
+
+
+def test_coalesces_identical_inflight_requests():
+    with FakeGroqServer(latency=0.3) as server, _gateway(server) as gateway:
+        results = asyncio.run(_fan_out(gateway, ["same"] * 6))
+        assert all(r == "echo: Say same" for r in results)
+        assert server.requests == 1, f"expected 1 upstream request, saw {server.requests}"
+        assert gateway.stats()["coalesced"] == 5
+
+
+def test_waiters_survive_cancelled_owner():
+    with FakeGroqServer(latency=0.3) as server, _gateway(server) as gateway:
+        async def main():
+            owner = asyncio.ensure_future(_fan_out(gateway, ["shared"]))
+            await asyncio.sleep(0.05)
+            waiters = asyncio.ensure_future(_fan_out(gateway, ["shared"] * 3))
+            await asyncio.sleep(0.05)
+            owner.cancel()
+            return await waiters
+        results = asyncio.run(main())
+        assert results == ["echo: Say shared"] * 3
+        # One waiter re-issued the request and the others joined it (the cancelled
+        # one may or may not have reached the server)
+        assert server.requests <= 2, f"saw {server.requests} upstream requests"
+
+
+def test_global_concurrency_limit():
+    with FakeGroqServer(latency=0.2) as server, \
+            _gateway(server, max_concurrency=3, default_site_limit=10) as gateway:
+        start = time.time()
+        asyncio.run(_fan_out(gateway, [f"w{i}" for i in range(9)]))
+        elapsed = time.time() - start
+        assert server.requests == 9
+        assert server.max_active <= 3, f"saw {server.max_active} concurrent requests"
+        assert elapsed >= 0.55, "9 requests at 3-wide with 0.2s latency need ~3 rounds"
+
+
+def test_per_site_concurrency_limit():
+    with FakeGroqServer(latency=0.2) as server, \
+            _gateway(server, max_concurrency=10, site_limits={"test.narrow": 2}) as gateway:
+        asyncio.run(_fan_out(gateway, [f"w{i}" for i in range(6)], site="test.narrow"))
+        assert server.max_active <= 2, f"saw {server.max_active} concurrent requests"
+
+
+def test_sync_callers_from_threads():
+    with FakeGroqServer(latency=0.1) as server, _gateway(server) as gateway:
+        results = []
+        threads = [
+            threading.Thread(target=lambda i=i: results.append(
+                gateway.invoke("test.threads", PROMPT, StrOutputParser(), {"word": f"t{i}"}, temperature=0.3)
+            ))
+            for i in range(4)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert sorted(results) == [f"echo: Say t{i}" for i in range(4)]
+
+
+if __name__ == "__main__":
+    for test in [test_roundtrip_and_cache, test_coalesces_identical_inflight_requests,
+                 test_waiters_survive_cancelled_owner, test_global_concurrency_limit,
+                 test_per_site_concurrency_limit, test_sync_callers_from_threads]:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            print(f"❌ {test.__name__}: {e}")
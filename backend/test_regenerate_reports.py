@@ -0,0 +1,93 @@
+import sys
+import os
+import time
+import asyncio
+import zipfile
+import tempfile
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import regenerate_reports as rr
+from regenerate_reports import Checkpoint, ReportWriter, regenerate
+
+
+class SimulatedKill(Exception):
+    pass
+
+
+class FakeStore:
+    """InterviewStore stand-in: `iter_sessions` over a list, optionally dying after `kill_after` sessions."""
+    def __init__(self, count, kill_after=None):
+        self.sessions = [{"_id": f"{i:06d}", "session_id": f"s{i}", "candidate_id": "c",
+                          "scores": {"final_score": i}, "transcript": "answer"} for i in range(count)]
+        self.kill_after = kill_after
+
+    async def iter_sessions(self, after_id=None, query=None, batch_size=200):
+        yielded = 0
+        for session in self.sessions:
+            if after_id is not None and session["_id"] <= after_id:
+                continue
+            if self.kill_after is not None and yielded >= self.kill_after:
+                raise SimulatedKill()
+            yielded += 1
+            yield session
+
+    async def get_candidates(self, candidate_ids):
+        return {"c": {"name": "Test Candidate", "email": "c@example.com"}}
+
+
+def _archive_run(out, store):
+    checkpoint = Checkpoint(out + ".checkpoint.json")
+    checkpoint.load()
+    writer = ReportWriter(out, parts=checkpoint.parts)
+    asyncio.run(regenerate(store, writer, checkpoint, workers=2, progress_seconds=60))
+    writer.finish()
+    checkpoint.parts = list(writer.parts)
+    checkpoint.save()
+    writer.close()
+    return checkpoint
+
+
+def test_zip_resume_after_kill():
+    rr.BATCH_SIZE, rr.CHECKPOINT_EVERY = 5, 5
+    out = os.path.join(tempfile.mkdtemp(prefix="regen_"), "reports.zip")
+
+    # First run dies after 15 sessions: 5-session checkpoints, then reports written past the last one
+    checkpoint = Checkpoint(out + ".checkpoint.json")
+    writer = ReportWriter(out)
+    try:
+        asyncio.run(regenerate(FakeStore(20, kill_after=15), writer, checkpoint, workers=2, progress_seconds=60))
+        raise AssertionError("run was not interrupted")
+    except SimulatedKill:
+        pass
+    # Killed: the open part never gets its central directory
+    if writer._zip is not None:
+        writer._zip.fp.flush()
+    killed = Checkpoint(checkpoint.path)
+    assert killed.load() and killed.done >= 5 and killed.parts
+
+    checkpoint = _archive_run(out, FakeStore(20))
+    with zipfile.ZipFile(out) as archive:
+        names = archive.namelist()
+        assert sorted(names) == sorted(f"report_s{i}.pdf" for i in range(20)), names
+        assert all(archive.read(name).startswith(b"%PDF") for name in names)
+    assert checkpoint.done >= 20 and checkpoint.last_id == "000019" and not checkpoint.parts
+    assert not [f for f in os.listdir(os.path.dirname(out)) if ".part" in f]
+
+
+def test_zip_rerun_appends_new_sessions():
+    rr.BATCH_SIZE, rr.CHECKPOINT_EVERY = 5, 5
+    out = os.path.join(tempfile.mkdtemp(prefix="regen_"), "reports.zip")
+    _archive_run(out, FakeStore(8))
+    _archive_run(out, FakeStore(12))
+    with zipfile.ZipFile(out) as archive:
+        assert sorted(archive.namelist()) == sorted(f"report_s{i}.pdf" for i in range(12))
+
+
+if __name__ == "__main__":
+    for test in [test_zip_resume_after_kill, test_zip_rerun_appends_new_sessions]:
+        started = time.perf_counter()
+        test()
+        print(f"✅ {test.__name__} ({time.perf_counter() - started:.2f}s)")
+    print("All report regeneration tests passed.")
@@ -0,0 +1,193 @@
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.getenv(
+    "TTS_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tts_cache")
+)
+DEFAULT_MAX_BYTES = int(float(os.getenv("TTS_CACHE_MAX_MB", "512")) * 1024 * 1024)
+DEFAULT_MEMORY_BYTES = int(float(os.getenv("TTS_CACHE_MEMORY_MB", "32")) * 1024 * 1024)
+
+
+def normalize_text(text: str) -> str:
+    """Whitespace differences do not change the spoken audio."""
+    return " ".join((text or "").split())
+
+
+def make_audio_key(voice_id: str, text: str) -> str:
+    """Content address for one utterance: voice (model + render settings) + text."""
+    payload = f"{voice_id}\x00{normalize_text(text)}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+class TTSAudioCache:
+    """
+    Content-addressed store of rendered audio (WAV bytes).
+
+    The disk tier is a size-bounded LRU: file mtimes record last use and the
+    least recently used files are deleted once `max_bytes` is exceeded.
+    A small in-memory tier keeps the hottest prompts off the disk entirely.
+    Files are written atomically, so several workers may share one directory.
+    """
+    def __init__(self, cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+                 max_bytes: int = DEFAULT_MAX_BYTES,
+                 memory_bytes: int = DEFAULT_MEMORY_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.memory_bytes = memory_bytes
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_size = 0
+        # key -> size on disk, in LRU order (oldest first)
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_size = 0
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._scan()
+
+    # --- Public API ---
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                if key in self._disk:
+                    self._disk.move_to_end(key)
+                self._stats["hits"] += 1
+                return data
+            on_disk = key in self._disk
+
+        if on_disk:
+            path = self._path(key)
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+                os.utime(path, None)  # Last-use time survives restarts
+            except OSError:
+                data = None
+            with self._lock:
+                if data is not None:
+                    self._stats["hits"] += 1
+                    self._stats["disk_hits"] += 1
+                    if key in self._disk:
+                        self._disk.move_to_end(key)
+                    self._remember(key, data)
+                    return data
+                self._forget_disk(key)
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def set(self, key: str, data: bytes):
+        if not data:
+            return
+        with self._lock:
+            self._stats["stores"] += 1
+            self._remember(key, data)
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"TTS cache write failed: {e}")
+            return
+        with self._lock:
+            self._forget_disk(key)
+            self._disk[key] = len(data)
+            self._disk_size += len(data)
+            self._evict()
+
+    def contains(self, key: str) -> bool:
+        with self._lock:
+            return key in self._memory or key in self._disk
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_size,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_size,
+                "max_bytes": self.max_bytes,
+            }
+
+    # --- Internals ---
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.wav")
+
+    def _scan(self):
+        """Rebuilds the LRU order from the files already on disk."""
+        found = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".wav"):
+                    continue
+                try:
+                    st = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                found.append((st.st_mtime, name[:-4], st.st_size))
+        for _, key, size in sorted(found):
+            self._disk[key] = size
+            self._disk_size += size
+        self._evict()
+
+    def _remember(self, key: str, data: bytes):
+        """Memory tier insert (caller holds the lock)."""
+        if len(data) > self.memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_size -= len(old)
+        self._memory[key] = data
+        self._memory_size += len(data)
+        while self._memory_size > self.memory_bytes:
+            _, dropped = self._memory.popitem(last=False)
+            self._memory_size -= len(dropped)
+
+    def _forget_disk(self, key: str):
+        size = self._disk.pop(key, None)
+        if size is not None:
+            self._disk_size -= size
+
+    def _evict(self):
+        """Deletes least recently used files until the disk tier fits (caller holds the lock)."""
+        while self._disk_size > self.max_bytes and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_size -= size
+            self._stats["evictions"] += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+
+_tts_audio_cache = None
+_tts_audio_cache_lock = threading.Lock()
+
+def get_tts_audio_cache() -> TTSAudioCache:
+    global _tts_audio_cache
+    if _tts_audio_cache is None:
+        with _tts_audio_cache_lock:
+            if _tts_audio_cache is None:
+                _tts_audio_cache = TTSAudioCache()
+    return _tts_audio_cache
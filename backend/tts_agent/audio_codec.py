@@ -0,0 +1,181 @@
+import os
+import shutil
+import logging
+import threading
+import subprocess
+import numpy as np
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Legacy transport: one base64 WAV inside a JSON "audio" message
+LEGACY_FORMAT = "wav"
+
+# First byte of every binary audio frame, so the client can decode each frame on its own
+FRAME_TAGS = {"opus": 1, "mulaw": 2}
+
+MIME_TYPES = {
+    "wav": "audio/wav",
+    "opus": "audio/ogg; codecs=opus",
+    "mulaw": "audio/basic",
+}
+
+FFMPEG = os.getenv("FFMPEG_PATH", "ffmpeg")
+OPUS_BITRATE = os.getenv("TTS_OPUS_BITRATE", "24k")
+MULAW_SAMPLE_RATE = 8000
+
+# μ-law is cut into frames of this length so playback can start early
+MULAW_CHUNK_MS = int(os.getenv("TTS_MULAW_CHUNK_MS", "250"))
+
+_ffmpeg_path = None
+_ffmpeg_checked = False
+_stats_lock = threading.Lock()
+_stats: Dict[str, Dict[str, int]] = {}
+
+
+def ffmpeg_available() -> bool:
+    global _ffmpeg_path, _ffmpeg_checked
+    if not _ffmpeg_checked:
+        _ffmpeg_path = shutil.which(FFMPEG)
+        _ffmpeg_checked = True
+    return _ffmpeg_path is not None
+
+
+def supported_formats():
+    formats = [LEGACY_FORMAT, "mulaw"]
+    if ffmpeg_available():
+        formats.append("opus")
+    return formats
+
+
+def negotiate(requested) -> str:
+    """
+    Picks the first format from the client's preference list that this server can
+    produce. `requested` is a list or a comma-separated string ("opus,mulaw").
+    Anything unknown (or nothing) keeps the legacy WAV transport.
+    """
+    if isinstance(requested, str):
+        requested = requested.split(",")
+    available = supported_formats()
+    for fmt in requested or []:
+        fmt = str(fmt).strip().lower()
+        if fmt in available:
+            return fmt
+    return LEGACY_FORMAT
+
+
+# ===== μ-law (G.711) =====
+
+_MULAW_BIAS = 0x84
+
+
+def _lowpass(samples: np.ndarray, cutoff_hz: float, sample_rate: int, taps: int = 31) -> np.ndarray:
+    """Windowed-sinc FIR, applied before decimating to 8 kHz."""
+    n = np.arange(taps) - (taps - 1) / 2
+    fc = cutoff_hz / sample_rate
+    kernel = 2 * fc * np.sinc(2 * fc * n) * np.hamming(taps)
+    kernel /= kernel.sum()
+    return np.convolve(samples, kernel, mode="same")
+
+
+def resample(pcm: np.ndarray, sample_rate: int, target_rate: int) -> np.ndarray:
+    """Linear-interpolation resampler (float32 in, float32 out)."""
+    if sample_rate == target_rate or len(pcm) == 0:
+        return pcm
+    if target_rate < sample_rate:
+        pcm = _lowpass(pcm, 0.45 * target_rate, sample_rate)
+    duration = len(pcm) / sample_rate
+    positions = np.arange(int(duration * target_rate)) * (sample_rate / target_rate)
+    return np.interp(positions, np.arange(len(pcm)), pcm).astype(np.float32)
+
+
+def mulaw_encode(pcm16: np.ndarray) -> bytes:
+    """16-bit linear PCM -> 8-bit G.711 μ-law (bit-exact with the reference g711.c)."""
+    samples = pcm16.astype(np.int32) >> 2  # 14-bit
+    negative = samples < 0
+    magnitude = np.minimum(np.where(negative, -samples, samples), 8159) + 33
+    exponent = np.maximum(np.floor(np.log2(magnitude)).astype(np.int32) - 5, 0)
+    mantissa = (magnitude >> (np.minimum(exponent, 7) + 1)) & 0x0F
+    code = np.where(exponent > 7, 0x7F, (exponent << 4) | mantissa)  # Past the last segment: full scale
+    mask = np.where(negative, 0x7F, 0xFF)
+    return (code ^ mask).astype(np.uint8).tobytes()
+
+
+def mulaw_decode(data: bytes) -> np.ndarray:
+    """8-bit G.711 μ-law -> 16-bit linear PCM (used by tests and tools)."""
+    u = ~np.frombuffer(data, dtype=np.uint8).astype(np.int32) & 0xFF
+    sign = u & 0x80
+    exponent = (u >> 4) & 0x07
+    mantissa = u & 0x0F
+    magnitude = (((mantissa << 3) + _MULAW_BIAS) << exponent) - _MULAW_BIAS
+    return np.where(sign != 0, -magnitude, magnitude).astype(np.int16)
+
+
+def encode_mulaw(pcm: bytes, sample_rate: int) -> bytes:
+    samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32)
+    resampled = resample(samples, sample_rate, MULAW_SAMPLE_RATE)
+    return mulaw_encode(np.clip(np.round(resampled), -32768, 32767).astype(np.int16))
+
+
+# ===== Opus (Ogg container, via ffmpeg) =====
+
+def encode_opus(pcm: bytes, sample_rate: int) -> Optional[bytes]:
+    """One self-contained Ogg/Opus file per chunk, decodable on its own by the browser."""
+    if not ffmpeg_available():
+        return None
+    cmd = [
+        _ffmpeg_path, "-hide_banner", "-loglevel", "error",
+        "-f", "s16le", "-ar", str(sample_rate), "-ac", "1", "-i", "pipe:0",
+        "-c:a", "libopus", "-b:a", OPUS_BITRATE, "-application", "voip",
+        "-f", "ogg", "pipe:1"
+    ]
+    try:
+        result = subprocess.run(cmd, input=pcm, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=30)
+    except Exception as e:
+        logger.error(f"Opus encode failed: {e}")
+        return None
+    if result.returncode != 0:
+        logger.error(f"Opus encode failed: {result.stderr.decode('utf-8', errors='ignore')}")
+        return None
+    return result.stdout
+
+
+# ===== Streaming =====
+
+def encode_stream(chunks: Iterable, fmt: str):
+    """
+    Turns (pcm_bytes, sample_rate) chunks from TTSEngine.stream() into tagged
+    binary frames: one Ogg file per sentence for Opus, ~MULAW_CHUNK_MS slices
+    for μ-law. Falls back to μ-law if Opus encoding fails.
+    """
+    for pcm, sample_rate in chunks:
+        if not pcm:
+            continue
+        if fmt == "opus":
+            encoded = encode_opus(pcm, sample_rate)
+            if encoded is not None:
+                record(fmt, len(pcm), len(encoded))
+                yield bytes([FRAME_TAGS["opus"]]) + encoded
+                continue
+            fmt = "mulaw"
+        encoded = encode_mulaw(pcm, sample_rate)
+        record("mulaw", len(pcm), len(encoded))
+        step = max(1, MULAW_SAMPLE_RATE * MULAW_CHUNK_MS // 1000)
+        for start in range(0, len(encoded), step):
+            yield bytes([FRAME_TAGS["mulaw"]]) + encoded[start:start + step]
+
+
+def record(fmt: str, pcm_bytes: int, encoded_bytes: int):
+    with _stats_lock:
+        entry = _stats.setdefault(fmt, {"chunks": 0, "pcm_bytes": 0, "sent_bytes": 0})
+        entry["chunks"] += 1
+        entry["pcm_bytes"] += pcm_bytes
+        entry["sent_bytes"] += encoded_bytes
+
+
+def codec_stats() -> Dict:
+    with _stats_lock:
+        stats = {fmt: dict(entry) for fmt, entry in _stats.items()}
+    for entry in stats.values():
+        entry["ratio"] = round(entry["sent_bytes"] / entry["pcm_bytes"], 3) if entry["pcm_bytes"] else 0.0
+    return {"formats": stats, "supported": supported_formats()}
@@ -0,0 +1,51 @@
+import os
+import threading
+from tts_agent.tts_engine import BaseTTSEngine, DEFAULT_MODEL_PATH, VOLUME_FACTOR, scale_pcm, voice_id_for
+
+
+class PiperVoiceEngine(BaseTTSEngine):
+    """
+    In-process Piper TTS: the ONNX voice is loaded once per worker and audio
+    stays in memory as 16-bit PCM (no executable, no temp files).
+
+    Works with piper-tts 1.2 (`synthesize_stream_raw`) and 1.3+ (`synthesize`
+    yielding AudioChunk objects); both produce audio sentence by sentence.
+    """
+    def __init__(self, model_path=None, config_path=None, use_cuda=False, voice=None, cache=None):
+        self.model_path = model_path or DEFAULT_MODEL_PATH
+
+        if voice is None:
+            if not os.path.exists(self.model_path):
+                raise FileNotFoundError(f"Model file not found at: {self.model_path}")
+            from piper import PiperVoice
+            # Config defaults to "<model>.onnx.json" next to the model
+            voice = PiperVoice.load(self.model_path, config_path=config_path, use_cuda=use_cuda)
+
+        self.voice = voice
+        self.sample_rate = voice.config.sample_rate
+        # espeak-ng phonemisation inside Piper is not thread-safe
+        self._lock = threading.Lock()
+
+        super().__init__(voice_id_for(self.model_path), cache=cache)
+
+    def _raw_chunks(self, text: str):
+        if hasattr(self.voice, "synthesize_stream_raw"):
+            # piper-tts 1.2: raw int16 bytes per sentence
+            for pcm in self.voice.synthesize_stream_raw(text):
+                yield pcm, self.sample_rate
+        else:
+            # piper-tts 1.3+: AudioChunk per sentence
+            for chunk in self.voice.synthesize(text):
+                yield chunk.audio_int16_bytes, chunk.sample_rate
+
+    def _stream_segment(self, text: str):
+        chunks = self._raw_chunks(text)
+        while True:
+            # Hold the voice only while a sentence is being generated, not while
+            # the caller consumes it, so concurrent utterances interleave.
+            with self._lock:
+                item = next(chunks, None)
+            if item is None:
+                return
+            pcm, sample_rate = item
+            yield scale_pcm(pcm, VOLUME_FACTOR), sample_rate
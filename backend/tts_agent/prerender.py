@@ -0,0 +1,99 @@
+"""
+Pre-renders every static utterance into the TTS audio cache.
+
+Run at deploy time (from backend/):
+    python -m tts_agent.prerender
+    python -m tts_agent.prerender --questions path/to/questions.json --workers 4
+    python -m tts_agent.prerender --dry-run
+"""
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+# Allow `python tts_agent/prerender.py` as well as `python -m tts_agent.prerender`
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from question_bank import QuestionBank, DEFAULT_QUESTIONS_PATH
+from brain_agent.resume_questions import MAX_RESUME_QUESTIONS
+from brain_agent.orchestrator import (
+    FALLBACK_GREETING, BRANCH_REPROMPT, QUESTION_PREFIX, RESUME_QUESTION_PREFIX,
+    END_OF_QUESTIONS, INTERVIEW_COMPLETE,
+)
+from tts_agent.tts_engine import split_segments
+
+
+def collect_utterances(bank: QuestionBank):
+    """Every segment the interviewer can say without an LLM, de-duplicated, in a stable order."""
+    texts = [
+        FALLBACK_GREETING,
+        BRANCH_REPROMPT.format(branches=", ".join(bank.get_all_branches())),
+        END_OF_QUESTIONS,
+        INTERVIEW_COMPLETE,
+        RESUME_QUESTION_PREFIX,
+    ]
+    longest_branch = max((len(qs) for qs in bank.branches.values()), default=0)
+    for number in range(1, longest_branch + MAX_RESUME_QUESTIONS + 1):
+        texts.append(QUESTION_PREFIX.format(number=number))
+    for question in bank.common:
+        texts.append(question.get("text", ""))
+    for questions in bank.branches.values():
+        for question in questions:
+            texts.append(question.get("text", ""))
+
+    segments = []
+    seen = set()
+    for text in texts:
+        for segment in split_segments(text):
+            if segment not in seen:
+                seen.add(segment)
+                segments.append(segment)
+    return segments
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-render static interview prompts into the TTS audio cache.")
+    parser.add_argument("--questions", default=DEFAULT_QUESTIONS_PATH, help="Question bank JSON file")
+    parser.add_argument("--workers", type=int, default=2, help="Parallel render threads")
+    parser.add_argument("--backend", default=None, help="TTS backend: voice, process or auto (default: TTS_BACKEND)")
+    parser.add_argument("--piper", default=None, help="Piper executable for the process backend")
+    parser.add_argument("--model", default=None, help="Voice model (default: en_US-lessac-medium.onnx)")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be rendered")
+    args = parser.parse_args(argv)
+
+    bank = QuestionBank.load(args.questions)
+    segments = collect_utterances(bank)
+    print(f"Static segments: {len(segments)}")
+    if args.dry_run:
+        for segment in segments:
+            print(f"  {segment}")
+        return 0
+
+    from tts_agent.tts_engine import TTSEngine, create_tts_engine
+    if args.piper:
+        engine = TTSEngine(piper_path=args.piper, model_path=args.model)
+    else:
+        engine = create_tts_engine(args.backend, model_path=args.model)
+    todo = [s for s in segments if not engine.is_cached(s)]
+    print(f"Already cached: {len(segments) - len(todo)}, to render: {len(todo)}")
+
+    started = time.perf_counter()
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        for i, (segment, audio) in enumerate(zip(todo, pool.map(engine.render_cached, todo)), 1):
+            if audio is None:
+                failed += 1
+                print(f"  [{i}/{len(todo)}] FAILED: {segment[:60]}")
+            elif i % 25 == 0 or i == len(todo):
+                print(f"  [{i}/{len(todo)}] rendered")
+    elapsed = time.perf_counter() - started
+
+    stats = engine.cache.stats()
+    print(f"Rendered {len(todo) - failed} segments in {elapsed:.1f}s ({failed} failed)")
+    print(f"Cache: {stats['disk_entries']} files, {stats['disk_bytes'] / (1024 * 1024):.1f} MB")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
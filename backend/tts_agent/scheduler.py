@@ -0,0 +1,197 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+import concurrent.futures
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Lower value runs first
+REPLY = 0
+PREFETCH = 1
+PRIORITY_NAMES = {REPLY: "reply", PREFETCH: "prefetch"}
+
+DEFAULT_WORKERS = int(os.getenv("TTS_WORKERS", "2"))
+
+
+class _Job:
+    __slots__ = ("session_id", "priority", "fn", "args", "future", "enqueued_at", "cancel_event")
+
+    def __init__(self, session_id, priority, fn, args):
+        self.session_id = session_id
+        self.priority = priority
+        self.fn = fn
+        self.args = args
+        self.future = concurrent.futures.Future()
+        self.enqueued_at = time.perf_counter()
+        self.cancel_event = threading.Event()
+
+
+class TTSScheduler:
+    """
+    Dedicated worker pool for speech synthesis, separate from the ML executor,
+    so a backlog of video frames or scoring never delays a spoken reply.
+
+    - Priorities: every queued REPLY job runs before any PREFETCH job.
+    - Fairness: within a priority, sessions are served round-robin, one job each.
+    - Cancellation: `cancel_session()` drops a session's queued jobs and flags its
+      running ones; long jobs poll `TTSScheduler.cancelled()` between chunks.
+    """
+    _local = threading.local()
+
+    def __init__(self, engine_getter: Callable[[], Any], workers: int = DEFAULT_WORKERS):
+        self.engine_getter = engine_getter
+        self.workers = max(1, workers)
+        # priority -> session_id -> queued jobs (OrderedDict order = round-robin order)
+        self._queues: Dict[int, "OrderedDict[Any, Deque[_Job]]"] = {REPLY: OrderedDict(), PREFETCH: OrderedDict()}
+        self._running: Dict[Any, set] = {}
+        self._cond = threading.Condition()
+        self._threads = []
+        self._stopping = False
+        self._stats = {
+            name: {"submitted": 0, "started": 0, "completed": 0, "failed": 0, "cancelled": 0,
+                   "wait_seconds": 0.0, "max_wait_seconds": 0.0, "run_seconds": 0.0}
+            for name in PRIORITY_NAMES.values()
+        }
+
+    # --- Public API ---
+
+    def submit(self, session_id, fn: Callable, *args, priority: int = REPLY) -> concurrent.futures.Future:
+        """Queues `fn(engine, *args)`; returns a future with its result."""
+        job = _Job(session_id, priority, fn, args)
+        with self._cond:
+            if self._stopping:
+                raise RuntimeError("TTS scheduler is shut down")
+            self._ensure_workers()
+            self._queues[priority].setdefault(session_id, deque()).append(job)
+            self._stats[PRIORITY_NAMES[priority]]["submitted"] += 1
+            self._cond.notify()
+        return job.future
+
+    async def arun(self, session_id, fn: Callable, *args, priority: int = REPLY):
+        return await asyncio.wrap_future(self.submit(session_id, fn, *args, priority=priority))
+
+    def synthesize(self, session_id, text: str, priority: int = REPLY) -> concurrent.futures.Future:
+        """Future of WAV bytes (see TTSEngine.synthesize)."""
+        return self.submit(session_id, lambda engine: engine.synthesize(text), priority=priority)
+
+    def prefetch(self, session_id, text: str) -> concurrent.futures.Future:
+        """Warms the audio cache for text that will probably be spoken soon."""
+        return self.submit(session_id, lambda engine: engine.render_cached(text) is not None, priority=PREFETCH)
+
+    def cancel_session(self, session_id) -> int:
+        """Drops queued jobs of a session and flags its running jobs. Returns jobs dropped."""
+        dropped = []
+        with self._cond:
+            for priority, queues in self._queues.items():
+                jobs = queues.pop(session_id, None)
+                if jobs:
+                    dropped.extend(jobs)
+                    self._stats[PRIORITY_NAMES[priority]]["cancelled"] += len(jobs)
+            for job in self._running.get(session_id, ()):
+                job.cancel_event.set()
+        for job in dropped:
+            job.future.cancel()
+        return len(dropped)
+
+    @classmethod
+    def cancelled(cls) -> bool:
+        """True inside a job whose session was cancelled while it was running."""
+        job = getattr(cls._local, "job", None)
+        return job is not None and job.cancel_event.is_set()
+
+    def stats(self) -> Dict:
+        with self._cond:
+            result = {}
+            for priority, name in PRIORITY_NAMES.items():
+                entry = dict(self._stats[name])
+                started = entry["started"]
+                entry["queued"] = sum(len(q) for q in self._queues[priority].values())
+                entry["sessions_queued"] = len(self._queues[priority])
+                entry["avg_wait_ms"] = round(1000 * entry.pop("wait_seconds") / started, 1) if started else 0.0
+                entry["max_wait_ms"] = round(1000 * entry.pop("max_wait_seconds"), 1)
+                entry["avg_run_ms"] = round(1000 * entry.pop("run_seconds") / started, 1) if started else 0.0
+                result[name] = entry
+            result["workers"] = self.workers
+            result["running"] = sum(len(jobs) for jobs in self._running.values())
+            return result
+
+    def shutdown(self, wait: bool = True):
+        with self._cond:
+            self._stopping = True
+            pending = [job for queues in self._queues.values() for jobs in queues.values() for job in jobs]
+            for queues in self._queues.values():
+                queues.clear()
+            self._cond.notify_all()
+        for job in pending:
+            job.future.cancel()
+        if wait:
+            for thread in self._threads:
+                thread.join(timeout=10)
+
+    # --- Internals ---
+
+    def _ensure_workers(self):
+        """Starts the worker threads on first use (caller holds the lock)."""
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._worker, name=f"tts_worker_{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _next_job(self) -> Optional[_Job]:
+        """Highest priority first; round-robin across sessions (caller holds the lock)."""
+        for priority in sorted(self._queues):
+            queues = self._queues[priority]
+            if not queues:
+                continue
+            session_id, jobs = next(iter(queues.items()))
+            job = jobs.popleft()
+            if jobs:
+                queues.move_to_end(session_id)  # The session goes to the back of the line
+            else:
+                del queues[session_id]
+            return job
+        return None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    if self._stopping:
+                        return
+                    self._cond.wait()
+                    job = self._next_job()
+                self._running.setdefault(job.session_id, set()).add(job)
+
+            stats = self._stats[PRIORITY_NAMES[job.priority]]
+            wait = time.perf_counter() - job.enqueued_at
+            started = time.perf_counter()
+            outcome = "completed"
+            if not job.future.set_running_or_notify_cancel():
+                outcome = "cancelled"  # Cancelled by its caller while queued
+            else:
+                self._local.job = job
+                try:
+                    job.future.set_result(job.fn(self.engine_getter(), *job.args))
+                except Exception as e:
+                    outcome = "failed"
+                    logger.error(f"TTS job failed: {e}")
+                    job.future.set_exception(e)
+                finally:
+                    self._local.job = None
+
+            with self._cond:
+                running = self._running.get(job.session_id)
+                if running is not None:
+                    running.discard(job)
+                    if not running:
+                        del self._running[job.session_id]
+                stats[outcome] += 1
+                stats["started"] += 1
+                stats["wait_seconds"] += wait
+                stats["max_wait_seconds"] = max(stats["max_wait_seconds"], wait)
+                stats["run_seconds"] += time.perf_counter() - started
@@ -1,49 +1,250 @@
 import os
 import io
+import re
 import wave
 import uuid
+import shutil
+import logging
 import subprocess
 import numpy as np
+from tts_agent.audio_cache import get_tts_audio_cache, make_audio_key, normalize_text
 
-class TTSEngine:
-    def __init__(self, piper_path=None, model_path=None):
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        
+logger = logging.getLogger(__name__)
+
+# Output volume applied to Piper's audio (User volume fix)
+VOLUME_FACTOR = 0.2
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MODEL_PATH = os.path.join(BASE_DIR, "models", "en_US-lessac-medium.onnx")
+
+# Dynamic prefixes the orchestrator puts in front of otherwise static question text.
+# They are rendered as their own segments so the question audio is reusable.
+SEGMENT_PREFIXES = [
+    re.compile(r"^(Question \d+:)\s*(.+)$", re.DOTALL),
+    re.compile(r"^(\(Resume Context\))\s*(.+)$", re.DOTALL),
+]
+
+
+def split_segments(text: str):
+    """'Question 3: What is OOP?' -> ['Question 3:', 'What is OOP?']"""
+    text = normalize_text(text)
+    for pattern in SEGMENT_PREFIXES:
+        match = pattern.match(text)
+        if match:
+            return [match.group(1), match.group(2)]
+    return [text] if text else []
+
+
+def scale_pcm(pcm: bytes, factor: float = VOLUME_FACTOR) -> bytes:
+    """Applies the volume factor to 16-bit PCM in memory."""
+    audio_data = np.frombuffer(pcm, dtype=np.int16)
+    return (audio_data * factor).astype(np.int16).tobytes()
+
+
+def pcm_to_wav(pcm: bytes, sample_rate: int, channels: int = 1) -> bytes:
+    out = io.BytesIO()
+    with wave.open(out, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(pcm)
+    return out.getvalue()
+
+
+def wav_to_pcm(wav_bytes: bytes):
+    """Returns (pcm_bytes, sample_rate)."""
+    with wave.open(io.BytesIO(wav_bytes), "rb") as wf:
+        return wf.readframes(wf.getnframes()), wf.getframerate()
+
+
+def concat_wav(chunks):
+    """Joins WAV byte strings that share one format into a single WAV."""
+    if len(chunks) == 1:
+        return chunks[0]
+    params = None
+    frames = []
+    for chunk in chunks:
+        with wave.open(io.BytesIO(chunk), "rb") as wf:
+            if params is None:
+                params = wf.getparams()
+            frames.append(wf.readframes(wf.getnframes()))
+    out = io.BytesIO()
+    with wave.open(out, "wb") as wf:
+        wf.setparams(params)
+        wf.writeframes(b"".join(frames))
+    return out.getvalue()
+
+
+def voice_id_for(model_path: str) -> str:
+    """Cache namespace for a voice: model file identity + render settings."""
+    try:
+        model_size = os.path.getsize(model_path)
+    except OSError:
+        model_size = 0
+    return f"piper:{os.path.basename(model_path)}:{model_size}:vol={VOLUME_FACTOR}"
+
+
+class BaseTTSEngine:
+    """
+    Cache-aware synthesis shared by the TTS backends.
+
+    Backends implement `_render(text) -> WAV bytes` or `_stream_segment(text)`
+    yielding (pcm_bytes, sample_rate) as audio is produced; each default is
+    derived from the other.
+    """
+    def __init__(self, voice_id: str, cache=None):
+        self.voice_id = voice_id
+        # Rendered audio is shared across sessions (and restarts) through the cache
+        self.cache = cache if cache is not None else get_tts_audio_cache()
+
+    def synthesize(self, text: str) -> bytes:
+        """
+        Converts text to WAV bytes.
+        Each segment is looked up in the audio cache first; only misses are rendered.
+        Returns None on failure.
+        """
+        chunks = []
+        for segment in split_segments(text):
+            audio = self.render_cached(segment)
+            if audio is None:
+                return None
+            chunks.append(audio)
+        if not chunks:
+            return None
+        try:
+            return concat_wav(chunks)
+        except Exception as e:
+            print(f"Error joining TTS segments: {e}")
+            return None
+
+    def stream(self, text: str, max_chunk_ms: int = None):
+        """
+        Yields (pcm_bytes, sample_rate) chunks as soon as each is available.
+        Cached segments are yielded immediately; misses are streamed from the
+        backend (sentence by sentence where it supports that) and then cached.
+        `max_chunk_ms` further splits chunks for transport.
+        """
+        for segment in split_segments(text):
+            key = make_audio_key(self.voice_id, segment)
+            audio = self.cache.get(key)
+            if audio is not None:
+                pcm, sample_rate = wav_to_pcm(audio)
+                yield from self._split(pcm, sample_rate, max_chunk_ms)
+                continue
+
+            parts = []
+            sample_rate = None
+            try:
+                for pcm, sample_rate in self._stream_segment(segment):
+                    parts.append(pcm)
+                    yield from self._split(pcm, sample_rate, max_chunk_ms)
+            except Exception as e:
+                print(f"Error in TTS stream: {e}")
+                return
+            if parts:
+                self.cache.set(key, pcm_to_wav(b"".join(parts), sample_rate))
+
+    def render_cached(self, text: str) -> bytes:
+        """One segment through the cache."""
+        key = make_audio_key(self.voice_id, text)
+        audio = self.cache.get(key)
+        if audio is None:
+            audio = self._render(text)
+            if audio is not None:
+                self.cache.set(key, audio)
+        return audio
+
+    def is_cached(self, text: str) -> bool:
+        return all(self.cache.contains(make_audio_key(self.voice_id, s)) for s in split_segments(text))
+
+    def warm_up(self, text: str = "Hello.") -> bool:
+        """Renders a short phrase past the cache, so the first real reply is not the first render."""
+        return self._render(text) is not None
+
+    def speak(self, text: str) -> str:
+        """
+        Converts text to audio.
+        Returns the absolute path to the generated WAV file.
+        """
+        audio = self.synthesize(text)
+        if audio is None:
+            return None
+
+        output_filename = f"speech_{uuid.uuid4()}.wav"
+        output_path = os.path.join(BASE_DIR, "..", "temp_audio", output_filename)
+        # Ensure temp_audio directory exists in project root
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with open(output_path, "wb") as f:
+            f.write(audio)
+        return os.path.abspath(output_path)
+
+    # --- Backend hooks ---
+
+    def _render(self, text: str) -> bytes:
+        parts = []
+        sample_rate = None
+        try:
+            for pcm, sample_rate in self._stream_segment(text):
+                parts.append(pcm)
+        except Exception as e:
+            print(f"Error in TTS render: {e}")
+            return None
+        return pcm_to_wav(b"".join(parts), sample_rate) if parts else None
+
+    def _stream_segment(self, text: str):
+        audio = self._render(text)
+        if audio is not None:
+            yield wav_to_pcm(audio)
+
+    @staticmethod
+    def _split(pcm: bytes, sample_rate: int, max_chunk_ms: int = None):
+        if not max_chunk_ms:
+            yield pcm, sample_rate
+            return
+        step = max(2, int(sample_rate * max_chunk_ms / 1000) * 2)
+        for start in range(0, len(pcm), step):
+            yield pcm[start:start + step], sample_rate
+
+
+class TTSEngine(BaseTTSEngine):
+    """Runs the Piper executable once per utterance (loads the voice every time)."""
+    def __init__(self, piper_path=None, model_path=None, cache=None):
         # Default paths if not provided
         if not piper_path:
-            self.piper_path = os.path.join(base_dir, "piper", "piper.exe")
+            self.piper_path = self._default_piper_path()
         else:
             self.piper_path = piper_path
-            
+
         if not model_path:
-            self.model_path = os.path.join(base_dir, "models", "en_US-lessac-medium.onnx")
+            self.model_path = DEFAULT_MODEL_PATH
         else:
             self.model_path = model_path
 
-        if not os.path.exists(self.piper_path):
+        if not self.piper_path or not os.path.exists(self.piper_path):
             raise FileNotFoundError(f"Piper executable not found at: {self.piper_path}")
         if not os.path.exists(self.model_path):
             raise FileNotFoundError(f"Model file not found at: {self.model_path}")
 
-    def speak(self, text: str) -> str:
-        """
-        Converts text to audio using Piper TTS.
-        Returns the absolute path to the generated WAV file.
-        """
-        output_filename = f"speech_{uuid.uuid4()}.wav"
-        output_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "temp_audio", output_filename)
-        # Ensure temp_audio directory exists in project root
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        
-        # We need a truly temporary file for the raw output before we scale it
-        raw_temp = output_path.replace(".wav", "_raw.wav")
+        super().__init__(voice_id_for(self.model_path), cache=cache)
+
+    @staticmethod
+    def _default_piper_path():
+        if os.name == "nt":
+            return os.path.join(BASE_DIR, "piper", "piper.exe")
+        bundled = os.path.join(BASE_DIR, "piper", "piper")
+        return bundled if os.path.exists(bundled) else shutil.which("piper")
+
+    def _render(self, text: str) -> bytes:
+        """Runs Piper for one segment and returns volume-scaled WAV bytes."""
+        raw_temp = os.path.join(BASE_DIR, "..", "temp_audio", f"speech_{uuid.uuid4()}_raw.wav")
+        os.makedirs(os.path.dirname(raw_temp), exist_ok=True)
 
         cmd = [
             self.piper_path,
             "--model", self.model_path,
             "--output_file", raw_temp
         ]
-        
+
         try:
             # Run Piper (input text via stdin)
             process = subprocess.Popen(
@@ -53,46 +254,60 @@ class TTSEngine:
                 stderr=subprocess.PIPE,
                 text=False
             )
-            
+
             input_data = text.encode('utf-8')
             stdout_data, stderr_data = process.communicate(input=input_data)
-            
+
             if process.returncode != 0:
                 print(f"Piper Error: {stderr_data.decode('utf-8', errors='ignore')}")
                 return None
-            
-            if os.path.exists(raw_temp):
-                # Apply Volume scaling (User volume fix)
-                self._scale_volume(raw_temp, output_path, factor=0.2)
-                
-                # Cleanup raw file
-                if os.path.exists(raw_temp):
-                    os.remove(raw_temp)
-                    
-                return os.path.abspath(output_path)
-            else:
+
+            if not os.path.exists(raw_temp):
                 return None
+            with open(raw_temp, "rb") as f:
+                raw = f.read()
+            return self._scale_volume(raw, factor=VOLUME_FACTOR)
 
         except Exception as e:
             print(f"Error in TTS speak: {e}")
             return None
+        finally:
+            if os.path.exists(raw_temp):
+                try: os.remove(raw_temp)
+                except OSError: pass
 
-    def _scale_volume(self, input_path, output_path, factor=0.2):
+    def _scale_volume(self, wav_bytes, factor=VOLUME_FACTOR):
         try:
-            with wave.open(input_path, "rb") as wf:
+            with wave.open(io.BytesIO(wav_bytes), "rb") as wf:
                 params = wf.getparams()
                 frames = wf.readframes(wf.getnframes())
-            
-            # Convert to numpy and scale
-            audio_data = np.frombuffer(frames, dtype=np.int16)
-            scaled_data = (audio_data * factor).astype(np.int16)
-            
-            with wave.open(output_path, "wb") as wf:
+
+            out = io.BytesIO()
+            with wave.open(out, "wb") as wf:
                 wf.setparams(params)
-                wf.writeframes(scaled_data.tobytes())
-                
+                wf.writeframes(scale_pcm(frames, factor))
+            return out.getvalue()
+
         except Exception as e:
             print(f"Error scaling volume: {e}")
-            # Fallback: just move the file if scaling fails
-            if os.path.exists(input_path):
-                os.rename(input_path, output_path)
+            # Fallback: unscaled audio
+            return wav_bytes
+
+
+def create_tts_engine(backend: str = None, model_path: str = None) -> BaseTTSEngine:
+    """
+    Builds the configured TTS backend (TTS_BACKEND):
+      - "voice":   in-process Piper voice, loaded once (tts_agent/piper_voice.py)
+      - "process": the Piper executable per utterance
+      - "auto":    "voice" if piper-tts and the model are available, else "process"
+    """
+    backend = (backend or os.getenv("TTS_BACKEND", "auto")).lower()
+    if backend in ("voice", "auto"):
+        try:
+            from tts_agent.piper_voice import PiperVoiceEngine
+            return PiperVoiceEngine(model_path=model_path)
+        except (ImportError, FileNotFoundError) as e:
+            if backend == "voice":
+                raise
+            logger.info(f"In-process Piper voice unavailable ({e}); using the Piper executable")
+    return TTSEngine(model_path=model_path)
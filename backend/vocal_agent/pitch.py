@@ -0,0 +1,274 @@
+import os
+import time
+import logging
+import threading
+import concurrent.futures
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Human voice range
+FMIN = 70.0
+FMAX = 400.0
+
+# YIN absolute threshold on the cumulative mean normalised difference
+YIN_THRESHOLD = float(os.getenv("YIN_THRESHOLD", "0.15"))
+
+# Frames below this RMS are unvoiced regardless of periodicity
+MIN_VOICED_DB = -50.0
+
+FRAME_LENGTH = 1024
+HOP_LENGTH = 256
+
+# Cross-session batching
+PITCH_BATCH_FRAMES = int(os.getenv("PITCH_BATCH_FRAMES", "2048"))
+PITCH_BATCH_WAIT_MS = float(os.getenv("PITCH_BATCH_WAIT_MS", "5"))
+
+
+def frame_signal(y: np.ndarray, frame_length: int = FRAME_LENGTH, hop_length: int = HOP_LENGTH) -> np.ndarray:
+    """1-D signal -> (n_frames, frame_length) view. Short signals are zero-padded to one frame."""
+    y = np.asarray(y, dtype=np.float32).ravel()
+    if y.size < frame_length:
+        y = np.pad(y, (0, frame_length - y.size))
+    n_frames = 1 + (y.size - frame_length) // hop_length
+    return np.lib.stride_tricks.sliding_window_view(y, frame_length)[::hop_length][:n_frames]
+
+
+def yin(frames: np.ndarray, sample_rate: int = 16000, fmin: float = FMIN, fmax: float = FMAX,
+        threshold: float = YIN_THRESHOLD) -> Dict[str, np.ndarray]:
+    """
+    Vectorised YIN over a 2-D batch of frames (rows may come from different sessions).
+
+    The difference function is computed for all frames at once from one batched
+    FFT autocorrelation plus cumulative energies, so the cost is O(n log n) per
+    frame instead of O(n * max_lag).
+
+    Returns per-frame arrays:
+      f0:          Hz (0 where unvoiced)
+      voiced:      bool
+      periodicity: 1 - CMND at the chosen lag (0..1, higher = more periodic)
+      rms:         frame RMS (used for shimmer)
+    """
+    frames = np.atleast_2d(np.asarray(frames, dtype=np.float32))
+    n, width = frames.shape
+    min_lag = max(2, int(sample_rate / fmax))
+    max_lag = min(width // 2, int(np.ceil(sample_rate / fmin)))
+    # The comparison window: first half of the frame against lagged copies
+    window = width - max_lag
+
+    # r(tau) = sum_j x_j x_{j+tau} over the window, for every frame at once
+    n_fft = 1 << int(np.ceil(np.log2(width + window)))
+    spectrum_frame = np.fft.rfft(frames, n=n_fft, axis=1)
+    spectrum_window = np.fft.rfft(frames[:, :window], n=n_fft, axis=1)
+    acf = np.fft.irfft(spectrum_frame * np.conj(spectrum_window), n=n_fft, axis=1)[:, :max_lag + 1]
+
+    # d(tau) = E(0..W) + E(tau..tau+W) - 2 r(tau)
+    squares = np.concatenate([np.zeros((n, 1), dtype=np.float64), np.cumsum(frames.astype(np.float64) ** 2, axis=1)], axis=1)
+    energy_0 = squares[:, window:window + 1]
+    lags = np.arange(max_lag + 1)
+    energy_tau = squares[:, lags + window] - squares[:, lags]
+    diff = np.maximum(energy_0 + energy_tau - 2 * acf, 0.0)
+
+    # Cumulative mean normalised difference
+    cmnd = np.ones_like(diff)
+    running = np.cumsum(diff[:, 1:], axis=1)
+    cmnd[:, 1:] = diff[:, 1:] * np.arange(1, max_lag + 1) / np.maximum(running, 1e-12)
+
+    search = cmnd[:, min_lag:max_lag]
+    # First dip below the threshold, then walk down to its local minimum
+    below = search < threshold
+    has_dip = below.any(axis=1)
+    first = np.argmax(below, axis=1)
+    lag_index = np.where(has_dip, first, np.argmin(search, axis=1))
+    rows = np.arange(n)
+    for _ in range(search.shape[1]):
+        step = (lag_index + 1 < search.shape[1])
+        step &= search[rows, np.minimum(lag_index + 1, search.shape[1] - 1)] < search[rows, lag_index]
+        if not step.any():
+            break
+        lag_index = lag_index + step
+
+    best = search[rows, lag_index]
+    tau = (lag_index + min_lag).astype(np.float64)
+    # Parabolic interpolation for sub-sample precision
+    inner = (lag_index > 0) & (lag_index < search.shape[1] - 1)
+    if inner.any():
+        a = search[rows[inner], lag_index[inner] - 1]
+        b = best[inner]
+        c = search[rows[inner], lag_index[inner] + 1]
+        denom = a - 2 * b + c
+        safe = np.abs(denom) > 1e-12
+        offset = np.where(safe, 0.5 * (a - c) / np.where(safe, denom, 1.0), 0.0)
+        tau[inner] += np.clip(offset, -0.5, 0.5)
+
+    rms = np.sqrt(np.mean(frames.astype(np.float64) ** 2, axis=1))
+    loud = 20 * np.log10(np.maximum(rms, 1e-9)) > MIN_VOICED_DB
+    voiced = has_dip & loud
+    f0 = np.where(voiced, sample_rate / tau, 0.0)
+    return {
+        "f0": f0,
+        "voiced": voiced,
+        "periodicity": np.clip(1.0 - best, 0.0, 1.0),
+        "rms": rms,
+    }
+
+
+def jitter_shimmer(f0: np.ndarray, rms: np.ndarray, voiced: np.ndarray):
+    """
+    Frame-level local jitter and shimmer (%) over consecutive voiced frames:
+      jitter  = mean |T_i - T_{i+1}| / mean T   (T = 1 / f0)
+      shimmer = mean |A_i - A_{i+1}| / mean A   (A = frame RMS)
+    Frame-level values, not the cycle-level Praat measures; comparable between
+    candidates, not with clinical norms.
+    """
+    pairs = voiced[:-1] & voiced[1:]
+    if not pairs.any():
+        return 0.0, 0.0
+    periods = np.where(voiced, 1.0 / np.maximum(f0, 1e-9), 0.0)
+    jitter = np.mean(np.abs(np.diff(periods))[pairs]) / np.mean(periods[voiced])
+    shimmer = np.mean(np.abs(np.diff(rms))[pairs]) / max(np.mean(rms[voiced]), 1e-12)
+    return float(jitter * 100), float(shimmer * 100)
+
+
+def summarize(result: Dict[str, np.ndarray]) -> Dict:
+    """Per-chunk prosody from the per-frame arrays of `yin`."""
+    voiced = result["voiced"]
+    f0 = result["f0"][voiced]
+    jitter, shimmer = jitter_shimmer(result["f0"], result["rms"], voiced)
+    return {
+        "pitch_hz": float(np.median(f0)) if f0.size else 0.0,
+        "pitch_std": float(np.std(f0)) if f0.size else 0.0,
+        "voiced_ratio": float(np.mean(voiced)) if voiced.size else 0.0,
+        "jitter": jitter,
+        "shimmer": shimmer,
+    }
+
+
+def as_frames(y: np.ndarray) -> np.ndarray:
+    """A 1-D signal is framed; a 2-D array is taken as frames already (e.g. from the streaming extractor)."""
+    y = np.asarray(y, dtype=np.float32)
+    return y if y.ndim == 2 else frame_signal(y)
+
+
+def frame_count(y: np.ndarray) -> int:
+    if np.ndim(y) == 2:
+        return len(y)
+    return 1 + max(0, len(y) - FRAME_LENGTH) // HOP_LENGTH
+
+
+def yin_batch(signals: List[np.ndarray], sample_rate: int = 16000) -> List[Dict[str, np.ndarray]]:
+    """Frames every signal, runs one `yin` call over all frames and splits the per-frame arrays back."""
+    if not signals:
+        return []
+    framed = [as_frames(y) for y in signals]
+    result = yin(np.concatenate(framed, axis=0), sample_rate=sample_rate)
+    parts = []
+    start = 0
+    for frames in framed:
+        parts.append({key: value[start:start + len(frames)] for key, value in result.items()})
+        start += len(frames)
+    return parts
+
+
+def estimate_batch(signals: List[np.ndarray], sample_rate: int = 16000) -> List[Dict]:
+    return [summarize(part) for part in yin_batch(signals, sample_rate=sample_rate)]
+
+
+def estimate(y: np.ndarray, sample_rate: int = 16000) -> Dict:
+    return estimate_batch([y], sample_rate=sample_rate)[0]
+
+
+class PitchBatcher:
+    """
+    Collects pitch requests from concurrent sessions and runs them as one
+    `yin` batch: a batch is flushed when it reaches `max_frames` or the oldest
+    request has waited `max_wait_ms`. Requests are signals or pre-framed
+    (n, FRAME_LENGTH) arrays; `raw=True` returns the per-frame `yin` arrays
+    instead of the summary.
+    """
+    def __init__(self, sample_rate: int = 16000, max_frames: int = PITCH_BATCH_FRAMES,
+                 max_wait_ms: float = PITCH_BATCH_WAIT_MS):
+        self.sample_rate = sample_rate
+        self.max_frames = max_frames
+        self.max_wait = max_wait_ms / 1000
+        self._pending = []  # (signal, future, enqueued_at, raw)
+        self._pending_frames = 0
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {"requests": 0, "batches": 0, "frames": 0, "max_batch_requests": 0, "batch_seconds": 0.0}
+
+    def submit(self, y: np.ndarray, raw: bool = False) -> concurrent.futures.Future:
+        future = concurrent.futures.Future()
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, name="pitch_batcher", daemon=True)
+                self._thread.start()
+            self._pending.append((y, future, time.perf_counter(), raw))
+            self._pending_frames += frame_count(y)
+            self._stats["requests"] += 1
+            self._cond.notify()
+        return future
+
+    def estimate(self, y: np.ndarray) -> Dict:
+        return self.submit(y).result()
+
+    def stats(self) -> Dict:
+        with self._cond:
+            stats = dict(self._stats)
+            batches = stats["batches"]
+            stats["avg_batch_requests"] = round(stats["requests"] / batches, 2) if batches else 0.0
+            stats["avg_batch_ms"] = round(1000 * stats.pop("batch_seconds") / batches, 2) if batches else 0.0
+            stats["queued"] = len(self._pending)
+            return stats
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                # Wait for more requests until the batch is full or the oldest one is due
+                deadline = self._pending[0][2] + self.max_wait
+                while self._pending_frames < self.max_frames:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._pending = self._pending, []
+                self._pending_frames = 0
+
+            started = time.perf_counter()
+            try:
+                parts = yin_batch([y for y, _, _, _ in batch], sample_rate=self.sample_rate)
+                for (_, future, _, raw), part in zip(batch, parts):
+                    future.set_result(part if raw else summarize(part))
+            except Exception as e:
+                logger.error(f"Pitch batch failed: {e}")
+                for _, future, _, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+            with self._cond:
+                self._stats["batches"] += 1
+                self._stats["frames"] += sum(frame_count(y) for y, _, _, _ in batch)
+                self._stats["max_batch_requests"] = max(self._stats["max_batch_requests"], len(batch))
+                self._stats["batch_seconds"] += time.perf_counter() - started
+
+
+_pitch_batcher = None
+_pitch_batcher_lock = threading.Lock()
+
+
+def get_pitch_batcher() -> PitchBatcher:
+    global _pitch_batcher
+    if _pitch_batcher is None:
+        with _pitch_batcher_lock:
+            if _pitch_batcher is None:
+                _pitch_batcher = PitchBatcher()
+    return _pitch_batcher
+
+
+def pitch_batcher_stats() -> Optional[Dict]:
+    """Stats of the shared batcher, or None if nothing has used it."""
+    return _pitch_batcher.stats() if _pitch_batcher is not None else None
@@ -0,0 +1,386 @@
+import math
+import asyncio
+import logging
+from collections import deque
+from typing import Dict, Optional
+
+import numpy as np
+
+from vocal_agent.vocal_analyzer import ENERGY_GATE_DB, is_silent, record_gate, score_confidence
+from vocal_agent.pitch import jitter_shimmer
+
+logger = logging.getLogger(__name__)
+
+# Frames quieter than this are treated as non-speech (matches the server's silence gate margin)
+SPEECH_GATE_DB = ENERGY_GATE_DB if ENERGY_GATE_DB is not None else -45.0
+
+# Human voice range searched by the pitch tracker
+MIN_PITCH_HZ = 70.0
+MAX_PITCH_HZ = 400.0
+
+# Normalised autocorrelation peak needed to call a frame voiced
+VOICING_THRESHOLD = 0.45
+
+# A shorter lag wins if its peak is at least this fraction of the strongest one
+OCTAVE_TOLERANCE = 0.85
+
+
+class RunningStats:
+    """Welford mean/variance plus min/max, updated one batch at a time."""
+    __slots__ = ("count", "mean", "_m2", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values: np.ndarray):
+        values = np.asarray(values, dtype=np.float64)
+        n = values.size
+        if n == 0:
+            return
+        batch_mean = float(values.mean())
+        batch_m2 = float(((values - batch_mean) ** 2).sum())
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.mean += delta * n / total
+        self._m2 += batch_m2 + delta * delta * self.count * n / total
+        self.count = total
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self._m2 / self.count) if self.count > 1 else 0.0
+
+    def summary(self, digits: int = 1) -> Dict:
+        if not self.count:
+            return {"mean": 0.0, "std": 0.0, "min": 0.0, "max": 0.0}
+        return {
+            "mean": round(self.mean, digits),
+            "std": round(self.std, digits),
+            "min": round(self.min, digits),
+            "max": round(self.max, digits),
+        }
+
+
+class StreamingVocalExtractor:
+    """
+    Per-session vocal feature extractor for the live audio stream.
+
+    Chunks of any length are pushed as they arrive. Samples that do not fill a
+    whole hop are carried over, so analysis frames straddle chunk boundaries
+    exactly as if the stream had been analysed in one piece.
+
+    Each frame gets one FFT, shared by:
+      - pitch: autocorrelation via the power spectrum (Wiener-Khinchin),
+        corrected for the analysis window,
+      - onsets: positive log-magnitude spectral flux against the previous
+        frame, with an adaptive threshold and one frame of look-ahead.
+    Loudness and zero-crossing rate come from the same framed samples.
+    Statistics accumulate per utterance until `end_utterance()`.
+
+    With a `pitch_batcher` (vocal_agent.pitch.PitchBatcher), the frames of
+    every non-silent chunk are also queued for YIN, batched with other
+    sessions, and the utterance summary reports jitter and shimmer.
+    """
+    def __init__(self, sample_rate: int = 16000, frame_length: int = 1024, hop_length: int = 256,
+                 energy_gate_db=ENERGY_GATE_DB, pitch_batcher=None):
+        self.sample_rate = sample_rate
+        self.pitch_batcher = pitch_batcher
+        self.energy_gate_db = energy_gate_db
+        self.frame_length = frame_length
+        self.hop_length = hop_length
+        self.n_fft = 2 * frame_length  # Zero padding keeps the autocorrelation linear
+
+        self.window = np.hanning(frame_length).astype(np.float32)
+        window_acf = np.fft.irfft(np.abs(np.fft.rfft(self.window, n=self.n_fft)) ** 2)[:frame_length]
+        self._window_acf = np.maximum(window_acf / window_acf[0], 1e-3)
+        self._min_lag = int(sample_rate / MAX_PITCH_HZ)
+        self._max_lag = min(frame_length - 2, int(sample_rate / MIN_PITCH_HZ))
+
+        # Onset picking: threshold over ~0.5 s of flux history, >= 100 ms between onsets
+        self._flux_history = deque(maxlen=max(4, int(0.5 * sample_rate / hop_length)))
+        self._min_onset_gap = max(1, int(0.1 * sample_rate / hop_length))
+
+        self._reset_stream()
+        self._reset_utterance()
+
+    # --- Public API ---
+
+    def push(self, chunk: np.ndarray) -> Dict:
+        """
+        Adds a chunk of mono float samples and returns the chunk's features plus
+        the running utterance statistics, in the same shape as
+        `VocalAnalyzer.analyze_audio` (pitch_hz, loudness_db, speech_rate, ...).
+        Chunks below the energy gate only advance the framing state and come back
+        with 'silent': True and no confidence score.
+        """
+        try:
+            y = np.asarray(chunk, dtype=np.float32).ravel()
+            if y.size == 0:
+                return self._empty_response()
+            self._utt_samples += y.size
+
+            # Chunk-level loudness, as before (the server's silence detection uses it)
+            rms = float(np.sqrt(np.mean(y ** 2)))
+            loudness_db = 20 * math.log10(rms) if rms > 1e-9 else -80.0
+            loudness_stability = 1.0 - min(1.0, float(np.std(y)) * 5)
+
+            frames = self._frames(y)
+            silent = is_silent(loudness_db, self.energy_gate_db)
+            record_gate(silent)
+            if silent:
+                self._skip_frames(len(frames))
+                return self._silent_response(loudness_db)
+
+            chunk_pitch = 0.0
+            if len(frames):
+                chunk_pitch = self._analyse_frames(frames)
+
+            pitch_hz = chunk_pitch or (self._pitch.mean if self._pitch.count else 0.0)
+            speech_rate = self.speech_rate()
+            return {
+                'pitch_hz': float(round(pitch_hz, 1)),
+                'loudness_db': float(round(loudness_db, 1)),
+                'loudness_stability': float(round(loudness_stability, 2)),
+                'speech_rate': float(round(speech_rate, 0)),
+                'confidence_score': float(round(score_confidence(loudness_db, pitch_hz, speech_rate), 1)),
+                'voiced_ratio': float(round(self._voiced_frames / self._frames_seen, 2)) if self._frames_seen else 0.0,
+                'onsets': self._onsets,
+                'silent': False,
+                'success': True
+            }
+        except Exception as e:
+            logger.error(f"Streaming vocal analysis error: {e}")
+            return self._empty_response()
+
+    def speech_rate(self) -> float:
+        """Onsets per minute of speech (frames above the speech gate) in the current utterance."""
+        speech_seconds = self._speech_frames * self.hop_length / self.sample_rate
+        if speech_seconds < 0.25:
+            return 0.0
+        return self._onsets / speech_seconds * 60
+
+    async def aend_utterance(self) -> Dict:
+        """`end_utterance` for the event loop: waits for this utterance's YIN batches without blocking."""
+        pending = [asyncio.wrap_future(future) for future, _ in self._yin_parts if not future.done()]
+        if pending:
+            await asyncio.wait(pending)
+        return self.end_utterance()
+
+    def end_utterance(self) -> Dict:
+        """
+        Closes the current utterance (end of speech) and returns its summary.
+        Overlap state is reset, so the next utterance starts clean.
+        """
+        self._flush_pending_onset()
+        jitter, shimmer = self._jitter_shimmer()
+        duration = self._utt_samples / self.sample_rate
+        frame_seconds = self.hop_length / self.sample_rate
+        pitch = self._pitch.summary()
+        loudness = self._loudness.summary()
+        speech_rate = self.speech_rate()
+        summary = {
+            'duration_s': round(duration, 2),
+            'speech_s': round(self._speech_frames * frame_seconds, 2),
+            'voiced_s': round(self._voiced_frames * frame_seconds, 2),
+            'silent_s': round(self._silent_frames * frame_seconds, 2),
+            'pitch_hz': pitch,
+            'pitch_variability': round(self._pitch.std / self._pitch.mean, 3) if self._pitch.mean else 0.0,
+            'loudness_db': loudness,
+            'zcr_mean': round(self._zcr.mean, 4),
+            'onsets': self._onsets,
+            'speech_rate': round(speech_rate, 0),
+            'confidence_score': round(score_confidence(loudness['mean'] if self._loudness.count else -80.0,
+                                                       pitch['mean'], speech_rate), 1),
+            'jitter': jitter,
+            'shimmer': shimmer,
+            'success': self._frames_seen > 0
+        }
+        self._reset_stream()
+        self._reset_utterance()
+        return summary
+
+    # --- Internals ---
+
+    def _reset_stream(self):
+        # Left-pad like a centred STFT so the first samples get a full frame
+        self._tail = np.zeros(self.frame_length // 2, dtype=np.float32)
+        self._prev_log_mag: Optional[np.ndarray] = None
+        self._pending_flux: Optional[float] = None
+        self._pending_candidate = False
+        self._prev_db = -180.0
+        self._prev_flux = 0.0
+        self._flux_history.clear()
+        self._frames_since_onset = self._min_onset_gap
+        self._yin_contiguous = False
+
+    def _reset_utterance(self):
+        self._utt_samples = 0
+        self._frames_seen = 0
+        self._speech_frames = 0
+        self._voiced_frames = 0
+        self._silent_frames = 0
+        self._onsets = 0
+        self._pitch = RunningStats()
+        self._loudness = RunningStats()
+        self._zcr = RunningStats()
+        # (future of per-frame YIN arrays, follows the previous part without a gap)
+        self._yin_parts = []
+
+    def _frames(self, y: np.ndarray) -> np.ndarray:
+        """Frames every complete hop in tail + y; keeps the overlap for next time."""
+        buffer = np.concatenate([self._tail, y]) if self._tail.size else y
+        if buffer.size < self.frame_length:
+            self._tail = buffer
+            return np.zeros((0, self.frame_length), dtype=np.float32)
+        n_frames = 1 + (buffer.size - self.frame_length) // self.hop_length
+        frames = np.lib.stride_tricks.sliding_window_view(buffer, self.frame_length)[::self.hop_length][:n_frames]
+        self._tail = buffer[n_frames * self.hop_length:].copy()
+        return frames
+
+    def _analyse_frames(self, frames: np.ndarray) -> float:
+        """Updates running statistics; returns the median voiced pitch of these frames (0 if none)."""
+        n = len(frames)
+        self._frames_seen += n
+
+        # Loudness and zero-crossing rate (time domain)
+        frame_rms = np.sqrt(np.mean(frames ** 2, axis=1))
+        frame_db = 20 * np.log10(np.maximum(frame_rms, 1e-9))
+        signs = np.signbit(frames)
+        zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+        speech = frame_db > SPEECH_GATE_DB
+        self._speech_frames += int(speech.sum())
+        self._zcr.update(zcr[speech])
+        self._loudness.update(frame_db[speech])
+
+        # One FFT per frame, shared by pitch and onset detection
+        spectrum = np.fft.rfft(frames * self.window, n=self.n_fft, axis=1)
+        magnitude = np.abs(spectrum)
+
+        # Pitch: autocorrelation from the power spectrum
+        acf = np.fft.irfft(magnitude ** 2, n=self.n_fft, axis=1)[:, :self.frame_length]
+        energy = acf[:, :1]
+        acf = np.where(energy > 1e-12, acf / np.maximum(energy, 1e-12), 0.0) / self._window_acf
+        search = acf[:, self._min_lag:self._max_lag + 1]
+        best = search.max(axis=1, keepdims=True)
+        # Earliest local peak close to the best one, to avoid sub-octave errors
+        local_peak = np.zeros_like(search, dtype=bool)
+        local_peak[:, 1:-1] = (search[:, 1:-1] >= search[:, :-2]) & (search[:, 1:-1] > search[:, 2:])
+        candidates = local_peak & (search >= OCTAVE_TOLERANCE * best)
+        peak = np.where(candidates.any(axis=1), np.argmax(candidates, axis=1), np.argmax(search, axis=1))
+        strength = search[np.arange(n), peak]
+        voiced = speech & (strength > VOICING_THRESHOLD)
+        lags = (peak + self._min_lag).astype(np.float64)
+        # Parabolic interpolation around the peak for sub-sample lag precision
+        inner = (peak > 0) & (peak < search.shape[1] - 1)
+        rows = np.arange(n)[inner]
+        if rows.size:
+            a = search[rows, peak[inner] - 1]
+            b = search[rows, peak[inner]]
+            c = search[rows, peak[inner] + 1]
+            denom = a - 2 * b + c
+            offset = np.where(np.abs(denom) > 1e-12, 0.5 * (a - c) / np.where(np.abs(denom) > 1e-12, denom, 1.0), 0.0)
+            lags[inner] += np.clip(offset, -0.5, 0.5)
+        pitches = self.sample_rate / lags[voiced]
+        self._voiced_frames += int(voiced.sum())
+        self._pitch.update(pitches)
+
+        # Onsets: positive spectral flux of the log magnitude
+        log_mag = np.log1p(magnitude)
+        previous = self._prev_log_mag if self._prev_log_mag is not None else log_mag[:1]
+        diffs = np.diff(np.vstack([previous, log_mag]), axis=0)
+        flux = np.maximum(diffs, 0.0).mean(axis=1)
+        self._prev_log_mag = log_mag[-1:]
+        # Only energy rises count: a sharp offset also produces broadband flux
+        rising = np.diff(np.concatenate([[self._prev_db], frame_db])) > 0
+        self._prev_db = float(frame_db[-1])
+        for value, is_candidate in zip(flux, speech & rising):
+            self._pick_onset(float(value), bool(is_candidate))
+
+        if self.pitch_batcher is not None:
+            self._yin_parts.append((self.pitch_batcher.submit(frames.copy(), raw=True), self._yin_contiguous))
+            self._yin_contiguous = True
+
+        return float(np.median(pitches)) if pitches.size else 0.0
+
+    def _skip_frames(self, n: int):
+        """Silent frames: counted, not analysed. The next frame is compared against silence."""
+        if n == 0:
+            return
+        self._frames_seen += n
+        self._silent_frames += n
+        self._yin_contiguous = False
+        self._flush_pending_onset()
+        if self._prev_log_mag is not None:
+            self._prev_log_mag = np.zeros_like(self._prev_log_mag)
+        self._prev_db = -180.0
+
+    def _jitter_shimmer(self):
+        """Jitter/shimmer (%) over the utterance's YIN frames; (None, None) without a pitch batcher."""
+        if self.pitch_batcher is None:
+            return None, None
+        f0, rms, voiced = [], [], []
+        gap = False
+        for future, contiguous in self._yin_parts:
+            try:
+                part = future.result()
+            except Exception as e:
+                logger.error(f"YIN batch failed: {e}")
+                gap = True
+                continue
+            if voiced and (gap or not contiguous):
+                # A gap (silence, failed batch) must not pair the frames on either side
+                f0.append(np.zeros(1))
+                rms.append(np.zeros(1))
+                voiced.append(np.zeros(1, dtype=bool))
+            gap = False
+            f0.append(part["f0"])
+            rms.append(part["rms"])
+            voiced.append(part["voiced"])
+        if not voiced:
+            return 0.0, 0.0
+        jitter, shimmer = jitter_shimmer(np.concatenate(f0), np.concatenate(rms), np.concatenate(voiced))
+        return round(jitter, 2), round(shimmer, 2)
+
+    def _pick_onset(self, flux: float, is_candidate: bool):
+        """Peak picking with one frame of delay: the pending frame is decided once its successor is known."""
+        pending = self._pending_flux
+        if pending is not None:
+            history = self._flux_history
+            threshold = (np.mean(history) + 1.5 * np.std(history)) if len(history) >= 4 else math.inf
+            if (pending > threshold and pending >= self._prev_flux and pending > flux
+                    and self._frames_since_onset >= self._min_onset_gap and self._pending_candidate):
+                self._onsets += 1
+                self._frames_since_onset = 0
+            self._flux_history.append(pending)
+            self._prev_flux = pending
+        self._frames_since_onset += 1
+        self._pending_flux = flux
+        self._pending_candidate = is_candidate
+
+    def _flush_pending_onset(self):
+        if self._pending_flux is not None:
+            self._pick_onset(0.0, False)
+
+    def _silent_response(self, loudness_db):
+        response = self._empty_response()
+        response.update({'loudness_db': float(round(loudness_db, 1)), 'confidence_score': None,
+                         'silent': True, 'success': True})
+        return response
+
+    def _empty_response(self):
+        return {
+            'pitch_hz': 0.0,
+            'loudness_db': -80.0,
+            'loudness_stability': 0.0,
+            'speech_rate': 0.0,
+            'confidence_score': 50.0, # Neutral fallback
+            'voiced_ratio': 0.0,
+            'onsets': 0,
+            'silent': False,
+            'success': False
+        }
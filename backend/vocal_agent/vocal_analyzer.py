@@ -1,14 +1,66 @@
 import numpy as np
-import librosa
-import soundfile as sf
 import io
+import os
 import logging
+import threading
+from vocal_agent import pitch
+from vocal_agent import features
 
 logger = logging.getLogger(__name__)
 
+# "yin": vectorised YIN per chunk; "batched": YIN batched across sessions; "zcr": legacy proxy
+PITCH_BACKENDS = ("yin", "batched", "zcr")
+DEFAULT_PITCH_BACKEND = os.getenv("VOCAL_PITCH_BACKEND", "yin")
+
+# Chunks quieter than this (RMS dB) are silence: no heavy features, no confidence score.
+# Set VOCAL_ENERGY_GATE_DB=off to analyse everything.
+_gate_env = os.getenv("VOCAL_ENERGY_GATE_DB", "-45")
+ENERGY_GATE_DB = None if _gate_env.lower() == "off" else float(_gate_env)
+
+_gate_lock = threading.Lock()
+_gate_stats = {"chunks": 0, "silent": 0}
+
+
+def record_gate(silent: bool):
+    with _gate_lock:
+        _gate_stats["chunks"] += 1
+        if silent:
+            _gate_stats["silent"] += 1
+
+
+def vocal_gate_stats() -> dict:
+    with _gate_lock:
+        stats = dict(_gate_stats)
+    stats["silent_ratio"] = round(stats["silent"] / stats["chunks"], 3) if stats["chunks"] else 0.0
+    stats["gate_db"] = ENERGY_GATE_DB
+    return stats
+
+
+def is_silent(loudness_db, gate_db=ENERGY_GATE_DB) -> bool:
+    return gate_db is not None and loudness_db < gate_db
+
+
+def score_confidence(loudness_db, pitch_hz, words_per_minute) -> float:
+    """Vocal confidence (0-100) from loudness, pitch and speaking rate."""
+    # Ideal Loudness: -20 to -10 dB
+    vol_score = 1.0 if -25 <= loudness_db <= -5 else 0.6
+    
+    # Ideal Pitch: Human voice 85-255 Hz. 
+    # Any detected pitch counts as "is speaking" (unvoiced chunks report 0).
+    pitch_score = 1.0 if pitch_hz > 50 else 0.5 
+    
+    # Ideal Rate: 100-160 wpm.
+    rate_score = 1.0 if 100 <= words_per_minute <= 180 else 0.7
+
+    return (vol_score * 0.4 + pitch_score * 0.3 + rate_score * 0.3) * 100
+
 class VocalAnalyzer:
-    def __init__(self, sample_rate=16000):
+    def __init__(self, sample_rate=16000, pitch_backend=None, energy_gate_db=ENERGY_GATE_DB):
         self.sample_rate = sample_rate
+        self.energy_gate_db = energy_gate_db
+        self.pitch_backend = (pitch_backend or DEFAULT_PITCH_BACKEND).lower()
+        if self.pitch_backend not in PITCH_BACKENDS:
+            raise ValueError(f"Unknown pitch backend: {self.pitch_backend} (expected one of {PITCH_BACKENDS})")
 
     def analyze_audio(self, audio_data) -> dict:
         """
@@ -16,6 +68,10 @@ class VocalAnalyzer:
         Args:
             audio_data: Can be raw bytes (file content) OR numpy array (PCM data).
         Returns: Pitch, Loudness, Confidence Score (0-100)
+
+        Tiered: a cheap RMS gate runs first. Chunks below the gate are returned
+        with 'silent': True and confidence_score None, without pitch or onset
+        analysis, so they can be kept out of the confidence statistics.
         """
         try:
             y = None
@@ -28,9 +84,10 @@ class VocalAnalyzer:
                 # or we could require sr to be passed, but server uses 16000 uniformly.
             elif isinstance(audio_data, bytes):
                 # Load from bytes (legacy behavior / fallback)
+                import soundfile as sf
                 y, file_sr = sf.read(io.BytesIO(audio_data))
                 if file_sr != self.sample_rate:
-                    y = librosa.resample(y, orig_sr=file_sr, target_sr=self.sample_rate)
+                    y = features.resample(y, orig_sr=file_sr, target_sr=self.sample_rate)
             else:
                 return self._empty_response()
 
@@ -42,36 +99,26 @@ class VocalAnalyzer:
                 y = y.astype(np.float32)
 
             # 1. Loudness in dB (RMS)
-            rms = np.sqrt(np.mean(y**2))
-            loudness_db = 20 * np.log10(rms) if rms > 1e-9 else -80.0
+            loudness_db = features.rms_db(y)
+
+            silent = is_silent(loudness_db, self.energy_gate_db)
+            record_gate(silent)
+            if silent:
+                return self._silent_response(loudness_db)
 
-            
             # Stability (Standard Deviation of Amplitude)
             loudness_stability = 1.0 - min(1.0, np.std(y) * 5) # Heuristic
 
-            # 2. Pitch (Zero Crossing Rate as proxy for simple realtime, or PyIN)
-            # Using Zero Crossing Rate for speed, PyIN is slow for chunks
-            zcr = librosa.feature.zero_crossing_rate(y)
-            avg_zcr = np.mean(zcr)
-            # Estimate Pitch Hz roughly from ZCR (very rough)
-            pitch_hz = avg_zcr * self.sample_rate / 2 
+            # 2. Pitch, voicing, jitter and shimmer
+            prosody = self._estimate_pitch(y)
+            pitch_hz = prosody['pitch_hz']
 
             # 3. Speech Rate (approx via Onset detection)
-            onsets = librosa.onset.onset_detect(y=y, sr=self.sample_rate)
+            onsets = features.onset_detect(y, self.sample_rate)
             words_per_minute = (len(onsets) / (len(y)/self.sample_rate)) * 60
             
             # 4. Confidence Score Calculation
-            # Ideal Loudness: -20 to -10 dB
-            vol_score = 1.0 if -25 <= loudness_db <= -5 else 0.6
-            
-            # Ideal Pitch: Human voice 85-255 Hz. 
-            # ZCR is a poor proxy but usable for "is speaking".
-            pitch_score = 1.0 if pitch_hz > 50 else 0.5 
-            
-            # Ideal Rate: 100-160 wpm.
-            rate_score = 1.0 if 100 <= words_per_minute <= 180 else 0.7
-
-            confidence_raw = (vol_score * 0.4 + pitch_score * 0.3 + rate_score * 0.3) * 100
+            confidence_raw = score_confidence(loudness_db, pitch_hz, words_per_minute)
             
             return {
                 'pitch_hz': float(round(pitch_hz, 1)),
@@ -79,6 +126,10 @@ class VocalAnalyzer:
                 'loudness_stability': float(round(loudness_stability, 2)),
                 'speech_rate': float(round(words_per_minute, 0)),
                 'confidence_score': float(round(confidence_raw, 1)),
+                'voiced_ratio': float(round(prosody['voiced_ratio'], 2)),
+                'jitter': float(round(prosody['jitter'], 2)),
+                'shimmer': float(round(prosody['shimmer'], 2)),
+                'silent': False,
                 'success': True
             }
 
@@ -86,6 +137,22 @@ class VocalAnalyzer:
             logger.error(f"Vocal analysis error: {e}")
             return self._empty_response()
 
+    def _estimate_pitch(self, y) -> dict:
+        if self.pitch_backend == "batched":
+            return pitch.get_pitch_batcher().estimate(y)
+        if self.pitch_backend == "yin":
+            return pitch.estimate(y, sample_rate=self.sample_rate)
+        # Zero Crossing Rate as a (very rough) pitch proxy; no voicing information
+        zcr = features.zero_crossing_rate(y)
+        avg_zcr = np.mean(zcr)
+        return {'pitch_hz': avg_zcr * self.sample_rate / 2, 'voiced_ratio': 0.0, 'jitter': 0.0, 'shimmer': 0.0}
+
+    def _silent_response(self, loudness_db):
+        response = self._empty_response()
+        response.update({'loudness_db': float(round(loudness_db, 1)), 'confidence_score': None,
+                         'silent': True, 'success': True})
+        return response
+
     def _empty_response(self):
         return {
             'pitch_hz': 0.0,
@@ -93,6 +160,10 @@ class VocalAnalyzer:
             'loudness_stability': 0.0,
             'speech_rate': 0.0,
             'confidence_score': 50.0, # Neutral fallback
+            'voiced_ratio': 0.0,
+            'jitter': 0.0,
+            'shimmer': 0.0,
+            'silent': False,
             'success': False
         }
 
@@ -1,6 +1,29 @@
 import React, { useRef, useEffect, useState, useCallback } from 'react';
 import '../styles/InterviewPage.css';
 
+// ============ AI SPEECH PLAYBACK ============
+// Binary audio frames start with a tag byte (see backend/tts_agent/audio_codec.py)
+const FRAME_OPUS = 1;
+const FRAME_MULAW = 2;
+const MULAW_SAMPLE_RATE = 8000;
+
+// G.711 μ-law -> float lookup table
+const MULAW_TABLE = (() => {
+    const table = new Float32Array(256);
+    for (let i = 0; i < 256; i++) {
+        const u = ~i & 0xFF;
+        const exponent = (u >> 4) & 0x07;
+        const magnitude = ((((u & 0x0F) << 3) + 0x84) << exponent) - 0x84;
+        table[i] = ((u & 0x80) ? -magnitude : magnitude) / 32768;
+    }
+    return table;
+})();
+
+// Formats we ask the server for, best first (Opus where the browser can decode Ogg/Opus)
+const SPEECH_FORMATS = (typeof Audio !== 'undefined' && new Audio().canPlayType('audio/ogg; codecs=opus'))
+    ? 'opus,mulaw'
+    : 'mulaw';
+
 const InterviewPage = () => {
     // ============ REFS ============
     const videoRef = useRef(null);
@@ -8,6 +31,9 @@ const InterviewPage = () => {
     const audioContextRef = useRef(null);
     const mediaRecorderRef = useRef(null);
     const wsRef = useRef(null);
+    const playbackContextRef = useRef(null);
+    const playbackTimeRef = useRef(0);
+    const playbackChainRef = useRef(Promise.resolve());
 
     // ============ STATE ============
     const [isRecording, setIsRecording] = useState(false);
@@ -40,6 +66,47 @@ const InterviewPage = () => {
         setInputText('');
     };
 
+    /**
+     * Decode one binary speech frame and queue it right after the previous one,
+     * so playback starts with the first frame instead of the whole reply.
+     */
+    const playAudioFrame = useCallback((buffer) => {
+        if (!playbackContextRef.current) {
+            const AudioContextClass = window.AudioContext || window.webkitAudioContext;
+            playbackContextRef.current = new AudioContextClass();
+        }
+        const ctx = playbackContextRef.current;
+        const tag = new Uint8Array(buffer, 0, 1)[0];
+        const payload = buffer.slice(1);
+
+        let decoded;
+        if (tag === FRAME_MULAW) {
+            const bytes = new Uint8Array(payload);
+            const audioBuffer = ctx.createBuffer(1, bytes.length, MULAW_SAMPLE_RATE);
+            const channel = audioBuffer.getChannelData(0);
+            for (let i = 0; i < bytes.length; i++) channel[i] = MULAW_TABLE[bytes[i]];
+            decoded = Promise.resolve(audioBuffer);
+        } else if (tag === FRAME_OPUS) {
+            decoded = ctx.decodeAudioData(payload);
+        } else {
+            console.warn('Unknown audio frame tag:', tag);
+            return;
+        }
+
+        // decodeAudioData is async; chain so frames play in arrival order
+        playbackChainRef.current = playbackChainRef.current
+            .then(() => decoded)
+            .then((audioBuffer) => {
+                const source = ctx.createBufferSource();
+                source.buffer = audioBuffer;
+                source.connect(ctx.destination);
+                const startAt = Math.max(ctx.currentTime, playbackTimeRef.current);
+                source.start(startAt);
+                playbackTimeRef.current = startAt + audioBuffer.duration;
+            })
+            .catch((e) => console.error("Error playing audio:", e));
+    }, []);
+
     // ============ VIDEO FRAME CAPTURE & STREAMING ============
 
     /**
@@ -49,9 +116,10 @@ const InterviewPage = () => {
         try {
             const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
             const candidateId = localStorage.getItem('candidate_id');
-            const wsUrl = `${protocol}//${window.location.hostname}:8000/ws/interview?candidate_id=${candidateId || ''}`;
+            const wsUrl = `${protocol}//${window.location.hostname}:8000/ws/interview?candidate_id=${candidateId || ''}&audio=${SPEECH_FORMATS}`;
 
             wsRef.current = new WebSocket(wsUrl);
+            wsRef.current.binaryType = 'arraybuffer';
 
             wsRef.current.onopen = () => {
                 console.log('✅ WebSocket connected');
@@ -59,6 +127,12 @@ const InterviewPage = () => {
             };
 
             wsRef.current.onmessage = (event) => {
+                // Binary frames carry compressed AI speech
+                if (event.data instanceof ArrayBuffer) {
+                    playAudioFrame(event.data);
+                    return;
+                }
+
                 const data = JSON.parse(event.data);
 
                 // Handle different message types
@@ -115,6 +189,15 @@ const InterviewPage = () => {
                         }
                         break;
 
+                    case 'audio_start':
+                    case 'audio_end':
+                        // Frames in between are played as they arrive
+                        break;
+
+                    case 'audio_config':
+                        console.log("Speech format:", data.format);
+                        break;
+
                     case 'final_score':
                         setLiveScores(data.scores);
                         break;
@@ -145,7 +228,7 @@ const InterviewPage = () => {
             console.error('Failed to initialize WebSocket:', error);
             setConnectionStatus('error');
         }
-    }, []);
+    }, [playAudioFrame]);
 
     /**
      * Initialize camera and start video streaming